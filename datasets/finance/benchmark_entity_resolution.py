@@ -0,0 +1,209 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Compares the latency and recall of entity resolution by full text search
+# and by vector search over the `Person` names of the finance dataset.
+#
+# Run bootstrap_and_eval.py first to load the dataset. The search and vector
+# indexes are created on `Person` if missing. References are perturbed names,
+# e.g. with typos or swapped words, and a reference is recalled if the
+# resolved canonical references include its person.
+#
+# By default names are embedded by a deterministic `HashingEmbedding`. Set
+# BENCHMARK_EMBEDDING_MODEL, e.g. to text-embedding-004, to use a model.
+
+import asyncio
+import os
+import random
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+from dotenv import load_dotenv
+from google.cloud import spanner
+
+from graph_agents.tools import (
+    HashingEmbedding,
+    SpannerFullTextSearchTool,
+    SpannerGraphQueryQATool,
+    SpannerVectorSearchTool,
+)
+from graph_agents.utils.information_schema import InformationSchema
+
+# Load environment variables from .env
+load_dotenv()
+
+instance, database, project = (
+    os.environ["GOOGLE_SPANNER_INSTANCE"],
+    os.environ["GOOGLE_SPANNER_DATABASE"],
+    os.environ.get("GOOGLE_CLOUD_PROJECT", None),
+)
+embedding_model = os.environ.get("BENCHMARK_EMBEDDING_MODEL", None)
+num_references = int(os.environ.get("BENCHMARK_NUM_REFERENCES", "200"))
+top_k = 10
+
+spanner_db = spanner.Client(project=project).instance(instance).database(database)
+
+if embedding_model:
+    embedding = SpannerGraphQueryQATool.get_embedding_service(
+        {"embedding_model": embedding_model}
+    )
+    dimension = len(embedding.embed_query("dimension"))
+else:
+    embedding = HashingEmbedding(dimension=64)
+    dimension = embedding.dimension
+
+search_index_name, vector_index_name = "PersonNameSearch", "PersonNameVector"
+
+
+def query(db, q):
+    with db.snapshot() as snapshot:
+        rows = snapshot.execute_sql(q)
+        return [
+            {
+                column: value
+                for column, value in zip([column.name for column in rows.fields], row)
+            }
+            for row in rows
+        ]
+
+
+def update_ddl(statements: List[str]):
+    print(f"Updating schema: {statements}")
+    spanner_db.update_ddl(statements).result()
+
+
+def prepare_indexes():
+    update_ddl(
+        [
+            "ALTER TABLE Person ADD COLUMN IF NOT EXISTS name_token TOKENLIST"
+            " AS (TOKENIZE_FULLTEXT(name)) HIDDEN",
+            f"CREATE SEARCH INDEX IF NOT EXISTS {search_index_name}"
+            " ON Person(name_token)",
+            "ALTER TABLE Person ADD COLUMN IF NOT EXISTS name_embedding"
+            f" ARRAY<FLOAT32>(vector_length=>{dimension})",
+        ]
+    )
+    rows = query(
+        spanner_db,
+        "SELECT id, name FROM Person"
+        " WHERE name IS NOT NULL AND name_embedding IS NULL",
+    )
+    for start in range(0, len(rows), 500):
+        batch = rows[start : start + 500]
+        vectors = embedding.embed_documents([row["name"] for row in batch])
+        with spanner_db.batch() as mutations:
+            mutations.update(
+                table="Person",
+                columns=("id", "name_embedding"),
+                values=[(row["id"], vector) for row, vector in zip(batch, vectors)],
+            )
+    print(f"Embedded {len(rows)} names")
+    update_ddl(
+        [
+            f"CREATE VECTOR INDEX IF NOT EXISTS {vector_index_name}"
+            " ON Person(name_embedding) WHERE name_embedding IS NOT NULL"
+            " OPTIONS (distance_type = 'COSINE')",
+        ]
+    )
+
+
+def perturb(name: str, rng: random.Random) -> str:
+    words = name.split()
+    kind = rng.choice(["exact", "typo", "casing", "swap", "partial"])
+    if kind == "typo" and len(name) > 3:
+        i = rng.randrange(1, len(name) - 1)
+        return name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+    if kind == "casing":
+        return name.casefold()
+    if kind == "swap" and len(words) > 1:
+        return " ".join(words[::-1])
+    if kind == "partial" and len(words) > 1:
+        return words[-1]
+    return name
+
+
+def build_references() -> List[Tuple[str, Any]]:
+    rng = random.Random(0)
+    people = query(spanner_db, "SELECT id, name FROM Person WHERE name IS NOT NULL")
+    people = rng.sample(people, min(num_references, len(people)))
+    return [(perturb(person["name"], rng), person["id"]) for person in people]
+
+
+async def benchmark(tool, references: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    latencies = []
+    recalled_at_1, recalled_at_k = 0, 0
+    for reference, person_id in references:
+        start = time.perf_counter()
+        [scored_refs] = await tool.resolve_async([{"name": reference}])
+        latencies.append(time.perf_counter() - start)
+        ids = [ref.id for ref, _ in scored_refs or []]
+        recalled_at_1 += int(ids[:1] == [person_id])
+        recalled_at_k += int(person_id in ids)
+
+    # Resolves all references at once, e.g. as the unified tool does.
+    start = time.perf_counter()
+    await tool.resolve_async([{"name": reference} for reference, _ in references])
+    batch_latency = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))],
+        "batch_ms": 1000 * batch_latency,
+        "recall@1": recalled_at_1 / len(references),
+        f"recall@{top_k}": recalled_at_k / len(references),
+    }
+
+
+async def main():
+    prepare_indexes()
+    indexes = {
+        index.name: index
+        for index in InformationSchema(spanner_db).get_indexes(
+            enabled_indexes=[search_index_name, vector_index_name]
+        )
+    }
+    # No cache nor score cutoff, so that every lookup reads Spanner.
+    tools = {
+        "full_text": SpannerFullTextSearchTool.build_from_index(
+            spanner_db,
+            indexes[search_index_name],
+            include_examples=False,
+            top_k=top_k,
+            table_alias="Person",
+        ),
+        "vector": SpannerVectorSearchTool.build_from_index(
+            spanner_db,
+            indexes[vector_index_name],
+            embedding=embedding,
+            include_examples=False,
+            top_k=top_k,
+            table_alias="Person",
+        ),
+    }
+    references = build_references()
+    print(f"Benchmarking {len(references)} references")
+    for name, tool in tools.items():
+        if tool is None:
+            print(f"{name}: failed to build the tool")
+            continue
+        results = await benchmark(tool, references)
+        print(
+            f"{name}: "
+            + ", ".join(f"{metric}={value:.3f}" for metric, value in results.items())
+        )
+
+
+asyncio.run(main())
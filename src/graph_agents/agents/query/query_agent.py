@@ -16,10 +16,12 @@ import asyncio
 import functools
 import json
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Thread
 from typing import Any, Dict, List, Optional, Tuple
 
 from google.adk.agents import LlmAgent
-from google.adk.tools import FunctionTool
+from google.adk.tools import BaseTool, FunctionTool
 from google.cloud import spanner
 from google.cloud.spanner_v1.database import Database
 from pydantic import BaseModel, Field
@@ -30,13 +32,25 @@ from graph_agents.instructions.query.prompts import (
     SPANNER_GRAPH_QUERY_QA_TOOL_DEFAULT_DESCRIPTION_TEMPLATE,
 )
 from graph_agents.tools import (
+    AsyncSpannerFullTextSearchTool,
+    AsyncSpannerVectorSearchTool,
     SpannerFullTextSearchTool,
     SpannerGraphQueryQATool,
     SpannerGraphVisualizationTool,
+    SpannerVectorSearchTool,
     build_schema_inspection_tools,
+    build_unified_entity_resolution_tool,
 )
+from graph_agents.utils.cache import TTLCache
+from graph_agents.utils.compact_schema import CompactPropertyGraph
 from graph_agents.utils.database_context import Index, PropertyGraph
 from graph_agents.utils.information_schema import InformationSchema
+from graph_agents.utils.schema_snapshot import (
+    JsonStore,
+    SchemaSnapshot,
+    SchemaSnapshotStore,
+)
+from graph_agents.utils.staleness import get_snapshot_options
 
 logger = logging.getLogger("graph_agents." + __name__)
 
@@ -52,12 +66,189 @@ class QueryAgentConfig(BaseModel):
     embedding_model: Optional[str] = Field(
         default="text-embedding-004", description="Embedding model to get gql examples"
     )
+    example_mirror_max_rows: int = Field(
+        default=0,
+        description=(
+            "Mirror the gql examples in memory to select them locally if the"
+            " table has at most this many rows, 0 reads Spanner per question"
+        ),
+    )
+    example_mirror_refresh_interval: Optional[float] = Field(
+        default=600,
+        description="Seconds before the mirrored gql examples are reloaded",
+    )
     enabled_indexes: Optional[List[str]] = Field(
         default=None, description="Enabled indexes"
     )
     enabled_index_types: Optional[List[str]] = Field(
         default=["SEARCH"], description="Enabled index types"
     )
+    schema_snapshot_dir: Optional[str] = Field(
+        default=None,
+        description=(
+            "Local directory to persist schema snapshots, which are reused"
+            " across restarts until the schema changes"
+        ),
+    )
+    compact_schema: bool = Field(
+        default=False,
+        description=(
+            "Keep the property graph in a compact, immutable representation to"
+            " reduce memory on very large graphs"
+        ),
+    )
+    json_schema_cache_ttl: Optional[float] = Field(
+        default=3600,
+        description="Seconds before a cached json property schema expires",
+    )
+    json_schema_cache_size: int = Field(
+        default=1024, description="Max number of cached json property schemas"
+    )
+    warm_up_json_schemas: bool = Field(
+        default=False,
+        description="Sample all json property schemas in background on reload",
+    )
+    async_entity_resolution: bool = Field(
+        default=True,
+        description=(
+            "Resolve entities without blocking the event loop, running the"
+            " Spanner reads in a bounded thread pool"
+        ),
+    )
+    max_concurrent_queries: int = Field(
+        default=8,
+        description="Max number of concurrent Spanner reads of async tools",
+    )
+    entity_resolution_cache_size: int = Field(
+        default=4096,
+        description=(
+            "Max number of cached entity resolution results, 0 disables the" " cache"
+        ),
+    )
+    entity_resolution_cache_ttl: Optional[float] = Field(
+        default=600,
+        description="Seconds before a cached entity resolution result expires",
+    )
+    local_index_max_rows: int = Field(
+        default=0,
+        description=(
+            "Resolve entities in memory for search indexes whose table has at"
+            " most this many rows, 0 disables local resolution"
+        ),
+    )
+    local_index_refresh_interval: Optional[float] = Field(
+        default=600,
+        description="Seconds before an in-memory search index is reloaded",
+    )
+    entity_resolution_min_score: Optional[float] = Field(
+        default=None,
+        description="Drop resolved entities scored below this score",
+    )
+    entity_resolution_relative_score_cutoff: Optional[float] = Field(
+        default=0.5,
+        description=(
+            "Drop resolved entities scored below this fraction of the best"
+            " score of the same reference"
+        ),
+    )
+    unified_entity_resolution: bool = Field(
+        default=False,
+        description=(
+            "Add a tool resolving references across all search indexes in one"
+            " call, for references whose type is unclear"
+        ),
+    )
+    max_session_reference_mappings: int = Field(
+        default=256,
+        description=(
+            "Max number of resolved references kept in a session, which are"
+            " not resolved again"
+        ),
+    )
+    vector_search_embedding_model: Optional[str] = Field(
+        default=None,
+        description=(
+            "Embedding model of the vector indexes enabled by"
+            " `enabled_index_types`, `embedding_model` if unset"
+        ),
+    )
+    vector_search_distance_type: str = Field(
+        default="COSINE",
+        description="Distance type of the vector indexes",
+    )
+    vector_search_num_leaves: Optional[int] = Field(
+        default=None,
+        description="Leaves of a vector index to search, the Spanner default if unset",
+    )
+    vector_search_top_k: int = Field(
+        default=10,
+        description="Max number of nearest neighbors of each resolved entity",
+    )
+    vector_search_min_score: Optional[float] = Field(
+        default=None,
+        description=(
+            "Drop entities resolved by vector indexes scored below this score,"
+            " i.e. the similarity plus 1 for an exact match"
+        ),
+    )
+    gql_cache_size: int = Field(
+        default=0,
+        description=(
+            "Max number of questions whose generated GQL is cached and reused"
+            " for the same normalized question, 0 disables the cache"
+        ),
+    )
+    gql_cache_ttl: Optional[float] = Field(
+        default=3600,
+        description="Seconds before a cached GQL expires",
+    )
+    semantic_cache_size: int = Field(
+        default=0,
+        description=(
+            "Max number of answered questions whose GQL is reused for similar"
+            " questions, e.g. paraphrases, 0 disables the semantic cache"
+        ),
+    )
+    semantic_cache_threshold: float = Field(
+        default=0.95,
+        description="Min cosine similarity of questions sharing a cached GQL",
+    )
+    semantic_cache_embedding_model: Optional[str] = Field(
+        default=None,
+        description="Embedding model of the semantic cache, `embedding_model` if unset",
+    )
+    gql_result_cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        description=(
+            "Max estimated bytes of cached GQL results, reused by identical"
+            " queries with the same params, 0 disables the result cache"
+        ),
+    )
+    gql_result_cache_size: int = Field(
+        default=1024, description="Max number of cached GQL results"
+    )
+    gql_result_cache_ttl: Optional[float] = Field(
+        default=None,
+        description=(
+            "Seconds before a cached GQL result expires, the read staleness if"
+            " unset. Results are not cached if both are unset"
+        ),
+    )
+    exact_staleness: Optional[float] = Field(
+        default=None,
+        description=(
+            "Seconds of staleness of all reads, e.g. 15, so that reads can be"
+            " served by the nearest replica. Reads are strong if unset"
+        ),
+    )
+    max_staleness: Optional[float] = Field(
+        default=None,
+        description=(
+            "Max seconds of staleness of reads, used if `exact_staleness` is"
+            " unset. Multi-use snapshots, e.g. of introspection, read at"
+            " exactly this staleness"
+        ),
+    )
     log_level: str = Field(default="INFO", description="Log level.")
 
 
@@ -66,6 +257,26 @@ class SpannerGraphQueryAgent(LlmAgent):
     identifier: Tuple[Optional[str], str, str, str]
     agent_config: QueryAgentConfig
     gql_query_tool: Optional[SpannerGraphQueryQATool] = None
+    json_schema_cache: Optional[TTLCache] = None
+    # Shared by the entity resolution tools.
+    entity_resolution_cache: Optional[TTLCache] = None
+    # State kept across `reload_tools` to only rebuild the affected tools.
+    database: Optional[Database] = None
+    schema_snapshot: Optional[SchemaSnapshot] = None
+    # (index name, label name) => (index, column aliases, tool)
+    index_tools: Dict[
+        Tuple[str, str], Tuple[Index, Dict[str, str], Optional[BaseTool]]
+    ] = {}
+    visualization_tool: Optional[SpannerGraphVisualizationTool] = None
+    schema_tools: List[FunctionTool] = []
+    # Shared by the async tools to bound concurrent Spanner reads.
+    query_executor: Optional[ThreadPoolExecutor] = None
+    # Embeds references resolved by vector indexes, built from
+    # `vector_search_embedding_model` unless given.
+    vector_search_embedding: Optional[Any] = None
+    # Embeds questions of the semantic cache, built from
+    # `semantic_cache_embedding_model` unless given.
+    semantic_cache_embedding: Optional[Any] = None
 
     def __init__(
         self,
@@ -128,7 +339,10 @@ class SpannerGraphQueryAgent(LlmAgent):
             property_graph.name,
             model,
             gql_query_tool_description,
-            agent_config.model_dump(),
+            {
+                **agent_config.model_dump(),
+                "semantic_cache_embedding": self.semantic_cache_embedding,
+            },
         )
 
     def _config_log_level(self, agent_config: QueryAgentConfig):
@@ -152,41 +366,150 @@ class SpannerGraphQueryAgent(LlmAgent):
         information_schema: InformationSchema,
         property_graph: PropertyGraph,
         agent_config: QueryAgentConfig,
+        indexes: Optional[List[Index]] = None,
     ):
-        enabled_indexes = agent_config.enabled_indexes
-        enabled_types = agent_config.enabled_index_types
-        all_indexes = information_schema.get_indexes(
-            enabled_indexes=enabled_indexes,
-            enabled_types=enabled_types,
+        all_indexes = indexes
+        if all_indexes is None:
+            all_indexes = information_schema.get_indexes(
+                enabled_indexes=agent_config.enabled_indexes,
+                enabled_types=agent_config.enabled_index_types,
+            )
+        example_store = (
+            JsonStore(agent_config.schema_snapshot_dir, prefix="example")
+            if agent_config.schema_snapshot_dir
+            else None
         )
+        # (index name, label name) => (index, column aliases, tool or future)
+        pending: Dict[Tuple[str, str], Tuple[Index, Dict[str, str], Any]] = {}
+        # Build new tools in parallel, as each may sample an example. The
+        # multi-use snapshot of `information_schema` is not thread-safe, so
+        # each tool reads in its own snapshots instead.
+        with ThreadPoolExecutor(
+            max_workers=max(agent_config.max_concurrent_queries, 1),
+            thread_name_prefix="graph_agents_tool_builder",
+        ) as executor:
+            for index in all_indexes:
+                label_with_aliases = property_graph.get_label_and_properties(
+                    index.table.name
+                )
+                if not label_with_aliases:
+                    logger.debug(f"Skipped index: {index.name}")
+                    continue
+                for label_name, column_aliases in label_with_aliases:
+                    # A built tool, or the future of a tool being built.
+                    tool: Any = None
+                    key = (index.name, label_name)
+                    cached = self.index_tools.get(key)
+                    if (
+                        cached is not None
+                        and cached[2] is not None
+                        and cached[:2] == (index, column_aliases)
+                    ):
+                        # Neither the index, its table nor the label changed.
+                        # Tools that failed to build are built again.
+                        tool = cached[2]
+                    elif index.type == "SEARCH":
+                        tool = executor.submit(
+                            self.get_full_text_search_tool_class().build_from_index,
+                            database,
+                            index,
+                            table_alias=label_name,
+                            column_aliases=column_aliases,
+                            executor=self.query_executor,
+                            result_cache=self.entity_resolution_cache,
+                            local_index_max_rows=agent_config.local_index_max_rows,
+                            local_index_refresh_interval=(
+                                agent_config.local_index_refresh_interval
+                            ),
+                            min_score=agent_config.entity_resolution_min_score,
+                            relative_score_cutoff=(
+                                agent_config.entity_resolution_relative_score_cutoff
+                            ),
+                            example_store=example_store,
+                            max_session_mappings=(
+                                agent_config.max_session_reference_mappings
+                            ),
+                            snapshot_options=self.get_snapshot_options(),
+                        )
+                    elif index.type == "VECTOR":
+                        tool = executor.submit(
+                            self.get_vector_search_tool_class().build_from_index,
+                            database,
+                            index,
+                            embedding=self.get_vector_search_embedding(),
+                            distance_type=agent_config.vector_search_distance_type,
+                            num_leaves_to_search=(
+                                agent_config.vector_search_num_leaves
+                            ),
+                            top_k=agent_config.vector_search_top_k,
+                            table_alias=label_name,
+                            column_aliases=column_aliases,
+                            executor=self.query_executor,
+                            result_cache=self.entity_resolution_cache,
+                            min_score=agent_config.vector_search_min_score,
+                            relative_score_cutoff=(
+                                agent_config.entity_resolution_relative_score_cutoff
+                            ),
+                            example_store=example_store,
+                            max_session_mappings=(
+                                agent_config.max_session_reference_mappings
+                            ),
+                            snapshot_options=self.get_snapshot_options(),
+                        )
+                    pending[key] = (index, column_aliases, tool)
+
         tools = []
-        for index in all_indexes:
-            label_with_aliases = property_graph.get_label_and_properties(
-                index.table.name
-            )
-            if not label_with_aliases:
-                logger.debug(f"Skipped index: {index.name}")
-                continue
-            for label_name, column_aliases in label_with_aliases:
-                tool = None
-                if index.type == "SEARCH":
-                    tool = SpannerFullTextSearchTool.build_from_index(
-                        database,
-                        index,
-                        table_alias=label_name,
-                        column_aliases=column_aliases,
-                    )
-                if not tool:
-                    logger.info(f"Skipped index for label `{label_name}`: {index.name}")
+        index_tools = {}
+        for key, (index, column_aliases, tool) in pending.items():
+            index_name, label_name = key
+            if isinstance(tool, Future):
+                try:
+                    tool = tool.result()
+                except Exception as e:
+                    logger.error(f"Failed to build a tool from `{index_name}`: {e}")
                     continue
+            index_tools[key] = (index, column_aliases, tool)
+            if not tool:
+                logger.info(f"Skipped index for label `{label_name}`: {index_name}")
+                continue
 
-                logger.info(
-                    f"Added a tool built for label `{label_name}` from the index:"
-                    f" {index.name}"
-                )
-                tools.append(tool)
+            logger.info(
+                f"Added a tool built for label `{label_name}` from the index:"
+                f" {index_name}"
+            )
+            tools.append(tool)
+        self.index_tools = index_tools
         return tools
 
+    def get_full_text_search_tool_class(self):
+        if self.agent_config.async_entity_resolution:
+            return AsyncSpannerFullTextSearchTool
+        return SpannerFullTextSearchTool
+
+    def get_snapshot_options(self) -> Dict[str, Any]:
+        return get_snapshot_options(
+            self.agent_config.exact_staleness, self.agent_config.max_staleness
+        )
+
+    def get_vector_search_tool_class(self):
+        if self.agent_config.async_entity_resolution:
+            return AsyncSpannerVectorSearchTool
+        return SpannerVectorSearchTool
+
+    def get_vector_search_embedding(self):
+        if self.vector_search_embedding is None:
+            self.vector_search_embedding = (
+                SpannerGraphQueryQATool.get_embedding_service(
+                    {
+                        "embedding_model": (
+                            self.agent_config.vector_search_embedding_model
+                            or self.agent_config.embedding_model
+                        )
+                    }
+                )
+            )
+        return self.vector_search_embedding
+
     def build_schema_tools(
         self, information_schema: InformationSchema, property_graph: PropertyGraph
     ):
@@ -197,34 +520,167 @@ class SpannerGraphQueryAgent(LlmAgent):
             )
         ]
 
+    def get_database(self) -> Database:
+        if self.database is None:
+            project_id, instance_id, database_id, _ = self.identifier
+            client = spanner.Client(project=project_id)
+            self.database = client.instance(instance_id).database(database_id)
+        return self.database
+
+    def load_schema(
+        self, information_schema: InformationSchema, graph_id: str
+    ) -> SchemaSnapshot:
+        """Loads the property graph and the enabled indexes.
+
+        The schema is only introspected when its fingerprint differs from the
+        currently loaded one. When `schema_snapshot_dir` is configured, the
+        schema is also served from a local snapshot as long as its fingerprint
+        matches the database, and the snapshot is refreshed otherwise.
+        """
+        agent_config = self.agent_config
+        fingerprint = information_schema.get_schema_fingerprint(
+            graph_id,
+            enabled_indexes=agent_config.enabled_indexes,
+            enabled_types=agent_config.enabled_index_types,
+        )
+        if fingerprint is None:
+            raise ValueError(f"No graph with name `{graph_id}` found")
+        if (
+            self.schema_snapshot is not None
+            and self.schema_snapshot.fingerprint == fingerprint
+        ):
+            logger.info(f"Schema of `{graph_id}` is unchanged")
+            return self.schema_snapshot
+
+        snapshot_store, snapshot_key = None, ""
+        if agent_config.schema_snapshot_dir:
+            snapshot_store = SchemaSnapshotStore(agent_config.schema_snapshot_dir)
+            snapshot_key = json.dumps(
+                [
+                    *self.identifier,
+                    agent_config.enabled_indexes,
+                    agent_config.enabled_index_types,
+                ]
+            )
+            snapshot = snapshot_store.load(snapshot_key, fingerprint)
+            if snapshot is not None:
+                logger.info(f"Loaded schema of `{graph_id}` from snapshot")
+                if agent_config.compact_schema and isinstance(
+                    snapshot.property_graph, PropertyGraph
+                ):
+                    snapshot.property_graph = CompactPropertyGraph.from_property_graph(
+                        snapshot.property_graph
+                    )
+                return snapshot
+
+        property_graph = information_schema.get_property_graph(
+            graph_id, compact=agent_config.compact_schema
+        )
+        if property_graph is None:
+            raise ValueError(f"No graph with name `{graph_id}` found")
+        indexes = information_schema.get_indexes(
+            enabled_indexes=agent_config.enabled_indexes,
+            enabled_types=agent_config.enabled_index_types,
+        )
+        snapshot = SchemaSnapshot(
+            fingerprint=fingerprint,
+            property_graph=property_graph,
+            indexes=indexes,
+        )
+        if snapshot_store is not None:
+            snapshot_store.save(snapshot_key, snapshot)
+        return snapshot
+
     def reload_tools(self):
         """Reload the agent tools.
 
-        This is useful when the underlying schema changes.
+        This is useful when the underlying schema changes. Only the tools
+        affected by the schema change are rebuilt.
         """
         # When model unspecified, we use the canonical model which can be
         # inferred from the parent or ancestor agent.
         self.model = self.model or self.canonical_model.model
-        project_id, instance_id, database_id, graph_id = self.identifier
-        client = spanner.Client(project=project_id)
-        database = client.instance(instance_id).database(database_id)
-        information_schema = InformationSchema(database)
-        property_graph = information_schema.get_property_graph(graph_id)
-        if property_graph is None:
-            raise ValueError(f"No graph with name `{graph_id}` found")
-
-        tools = self.infer_tools_from_indexes(
-            database, information_schema, property_graph, self.agent_config
+        graph_id = self.identifier[3]
+        database = self.get_database()
+        if self.json_schema_cache is None:
+            self.json_schema_cache = TTLCache(
+                max_size=self.agent_config.json_schema_cache_size,
+                ttl=self.agent_config.json_schema_cache_ttl,
+            )
+        if (
+            self.agent_config.entity_resolution_cache_size > 0
+            and self.entity_resolution_cache is None
+        ):
+            self.entity_resolution_cache = TTLCache(
+                max_size=self.agent_config.entity_resolution_cache_size,
+                ttl=self.agent_config.entity_resolution_cache_ttl,
+            )
+        if self.agent_config.async_entity_resolution and self.query_executor is None:
+            self.query_executor = ThreadPoolExecutor(
+                max_workers=max(self.agent_config.max_concurrent_queries, 1),
+                thread_name_prefix="graph_agents_query",
+            )
+        information_schema = InformationSchema(
+            database,
+            json_schema_cache=self.json_schema_cache,
+            snapshot_options=self.get_snapshot_options(),
         )
-        self.gql_query_tool = self.build_graph_query_tool(
-            database, property_graph, self.model, self.agent_config
+        # Run all introspection within one consistent read-only snapshot.
+        with information_schema.read_only_snapshot() as snapshot_schema:
+            schema_snapshot = self.load_schema(snapshot_schema, graph_id)
+            tools = self.infer_tools_from_indexes(
+                database,
+                snapshot_schema,
+                schema_snapshot.property_graph,
+                self.agent_config,
+                indexes=schema_snapshot.indexes,
+            )
+
+        if self.agent_config.unified_entity_resolution:
+            unified_tool = build_unified_entity_resolution_tool(
+                # Vector distances are not comparable with full text scores.
+                [
+                    tool
+                    for index, _, tool in self.index_tools.values()
+                    if tool and index.type == "SEARCH"
+                ],
+                max_session_mappings=self.agent_config.max_session_reference_mappings,
+            )
+            if unified_tool is not None:
+                tools.append(unified_tool)
+
+        property_graph = schema_snapshot.property_graph
+        graph_changed = (
+            self.schema_snapshot is None
+            or self.schema_snapshot.property_graph != property_graph
         )
+        if graph_changed or self.gql_query_tool is None:
+            self.gql_query_tool = self.build_graph_query_tool(
+                database, property_graph, self.model, self.agent_config
+            )
+        if graph_changed or not self.schema_tools:
+            self.json_schema_cache.clear()
+            self.schema_tools = self.build_schema_tools(
+                information_schema, property_graph
+            )
+        if self.visualization_tool is None:
+            self.visualization_tool = SpannerGraphVisualizationTool(
+                database, property_graph.name
+            )
         tools.append(self.gql_query_tool)
-        tools.append(SpannerGraphVisualizationTool(database, property_graph.name))
-        tools.extend(self.build_schema_tools(information_schema, property_graph))
+        tools.append(self.visualization_tool)
+        tools.extend(self.schema_tools)
         tools.append(FunctionTool(self.reload_tools))
         for tool in tools:
             logger.debug(
                 f"Tool: {tool.name}\n" + f"Description: {tool.description}\n\n"
             )
         self.tools = tools
+        self.schema_snapshot = schema_snapshot
+
+        if graph_changed and self.agent_config.warm_up_json_schemas:
+            Thread(
+                target=information_schema.warm_up_json_property_schemas,
+                args=(property_graph,),
+                daemon=True,
+            ).start()
@@ -12,7 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from graph_agents.tools.entity_resolution import SpannerFullTextSearchTool
+from graph_agents.tools.entity_resolution import (
+    AsyncSpannerFullTextSearchTool,
+    AsyncSpannerVectorSearchTool,
+    HashingEmbedding,
+    SpannerFullTextSearchTool,
+    SpannerVectorSearchTool,
+    build_unified_entity_resolution_tool,
+)
 from graph_agents.tools.nl2gql import SpannerGraphQueryQATool
 from graph_agents.tools.schema_management import build_schema_inspection_tools
 from graph_agents.tools.visualization import SpannerGraphVisualizationTool
@@ -13,5 +13,14 @@
 # limitations under the License.
 
 from graph_agents.tools.entity_resolution.full_text_search import (
+    AsyncSpannerFullTextSearchTool,
     SpannerFullTextSearchTool,
 )
+from graph_agents.tools.entity_resolution.unified_resolution import (
+    build_unified_entity_resolution_tool,
+)
+from graph_agents.tools.entity_resolution.vector_search import (
+    AsyncSpannerVectorSearchTool,
+    HashingEmbedding,
+    SpannerVectorSearchTool,
+)
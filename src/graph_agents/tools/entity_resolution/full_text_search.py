@@ -12,18 +12,28 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import functools
+import json
 import logging
 import re
-from typing import Any, Callable, Dict, List, Optional, Type, Union
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
 
 from google.adk.tools import FunctionTool, ToolContext
 from google.cloud import spanner
 from google.cloud.spanner_v1.database import Database
+from google.cloud.spanner_v1.snapshot import Snapshot
 from google.genai import types
 from pydantic import BaseModel, Field, create_model
 from typing_extensions import override
 
+from graph_agents.tools.entity_resolution.local_index import LocalSearchIndex
+from graph_agents.tools.entity_resolution.session_store import ReferenceMappingStore
+from graph_agents.utils.cache import TTLCache
 from graph_agents.utils.database_context import Column, Index
+from graph_agents.utils.schema_snapshot import JsonStore
+from graph_agents.utils.single_flight import SingleFlight
 
 logger = logging.getLogger("graph_agents." + __name__)
 
@@ -46,20 +56,20 @@ class SearchCriteria(BaseModel):
     search_function: str
     score_function: str
 
-    def build_search_expr(self):
+    def build_search_expr(self, param_prefix: str = ""):
         search_func, tokenlist_name, tokenized_alias = (
             self.search_function,
             self.tokenlist_column.name,
             self.tokenized_column.alias,
         )
         # E.g. SEARCH(name_token, @name)
-        return f"{search_func}({tokenlist_name}, @{tokenized_alias})"
+        return f"{search_func}({tokenlist_name}, @{param_prefix}{tokenized_alias})"
 
-    def build_score_expr(self):
+    def build_score_expr(self, param_prefix: str = ""):
         score_func, tokenlist_name, tokenized_alias, tokenized_name = (
             self.score_function,
             self.tokenlist_column.name,
-            self.tokenized_column.alias,
+            param_prefix + self.tokenized_column.alias,
             self.tokenized_column.column.name,
         )
         # E.g. SCORE(name_token, @name) + IF(name = @name, 1, 0)
@@ -67,6 +77,14 @@ class SearchCriteria(BaseModel):
         return f"{score_func}({tokenlist_name}, @{tokenized_alias}) + IF({tokenized_name} = @{tokenized_alias}, 1., 0.)"
 
 
+# Maximum number of references resolved by a single query.
+_MAX_REFERENCES_PER_QUERY = 16
+
+
+def _get_reference_param_prefix(i: int) -> str:
+    return f"r{i}_"
+
+
 def _build_full_text_search_query(
     table_name: str,
     search_criterias: List[SearchCriteria],
@@ -74,28 +92,59 @@ def _build_full_text_search_query(
     index_filter_expr: Optional[str],
     canonical_reference_columns: List[ColumnWithAlias],
     top_k: int,
+    num_references: int = 1,
 ) -> str:
+    """Builds a query that resolves `num_references` references at once.
+
+    Params of the i-th reference are prefixed, e.g. `@r0_name`, `@r1_name`.
+    Each reference gets its own top k, and the results are ordered by
+    `_reference_index` and then by the scores of each search criteria.
+    """
     canonical_reference_aliases = ", ".join(
         (col.build() for col in canonical_reference_columns)
     )
-    filter_conditions = [criteria.build_search_expr() for criteria in search_criterias]
-    filter_conditions.extend(
-        # E.g. name = @name
-        [f"{col.column.name} = @{col.alias}" for col in partition_columns]
-    )
-    if index_filter_expr:
-        filter_conditions.append(index_filter_expr)
+    score_aliases = [f"_score_{i}" for i in range(len(search_criterias))]
+    score_order_expr = ", ".join([f"{alias} DESC" for alias in score_aliases])
+    pieces = []
+    for i in range(num_references):
+        param_prefix = _get_reference_param_prefix(i)
+        filter_conditions = [
+            criteria.build_search_expr(param_prefix) for criteria in search_criterias
+        ]
+        filter_conditions.extend(
+            # E.g. name = @r0_name
+            [
+                f"{col.column.name} = @{param_prefix}{col.alias}"
+                for col in partition_columns
+            ]
+        )
+        if index_filter_expr:
+            filter_conditions.append(index_filter_expr)
 
-    score_expr = ", ".join(
-        [criteria.build_score_expr() for criteria in search_criterias]
-    )
-    filter_expr = " AND ".join(filter_conditions)
+        score_expr = ", ".join(
+            [
+                f"{criteria.build_score_expr(param_prefix)} AS {alias}"
+                for criteria, alias in zip(search_criterias, score_aliases)
+            ]
+        )
+        filter_expr = " AND ".join(filter_conditions)
+        pieces.append(
+            f"""
+      SELECT {i} AS _reference_index, *
+      FROM (
+        SELECT {canonical_reference_aliases}, {score_expr}
+        FROM {table_name}
+        WHERE {filter_expr}
+        ORDER BY {score_order_expr}
+        LIMIT {top_k}
+      )"""
+        )
+    union_expr = "\n      UNION ALL".join(pieces)
     return f"""
-    SELECT {canonical_reference_aliases}
-    FROM {table_name}
-    WHERE {filter_expr}
-    ORDER BY {score_expr} DESC
-    LIMIT {top_k}
+    SELECT *
+    FROM ({union_expr}
+    )
+    ORDER BY _reference_index, {score_order_expr}
   """
 
 
@@ -131,6 +180,33 @@ def _build_example_query(
   """
 
 
+def _build_local_index_query(
+    table_name: str,
+    search_criterias: List[SearchCriteria],
+    partition_columns: List[ColumnWithAlias],
+    index_filter_expr: Optional[str],
+    canonical_reference_columns: List[ColumnWithAlias],
+    max_rows: int,
+) -> str:
+    # One more row than `max_rows` is read to tell whether the table is larger.
+    columns = {
+        col.alias: col
+        for col in (
+            canonical_reference_columns
+            + partition_columns
+            + [criteria.tokenized_column for criteria in search_criterias]
+        )
+    }
+    aliases = ", ".join([col.build() for col in columns.values()])
+    filter_expr = f"WHERE {index_filter_expr}" if index_filter_expr else ""
+    return f"""
+    SELECT {aliases}
+    FROM {table_name}
+    {filter_expr}
+    LIMIT {max_rows + 1}
+  """
+
+
 def _get_python_type_from_spanner_type(spanner_type: str):
     if spanner_type.startswith("STRING"):
         return str
@@ -187,8 +263,8 @@ def _get_alias(name: str, aliases: Optional[Dict[str, str]] = None) -> Optional[
     return aliases.get(name.casefold())
 
 
-def _query(database, query, params=None):
-    param_types = (
+def _get_param_types(params=None):
+    return (
         {
             field_name: _get_spanner_param_type_from_value(val)
             for field_name, val in params.items()
@@ -196,31 +272,365 @@ def _query(database, query, params=None):
         if params
         else None
     )
+
+
+# Shares identical concurrent reads, e.g. the same names resolved by many
+# sessions at once.
+_single_flight = SingleFlight()
+
+
+def _query(
+    database,
+    query,
+    params=None,
+    snapshot: Optional[Snapshot] = None,
+    snapshot_options: Optional[Dict[str, Any]] = None,
+):
     try:
-        with database.snapshot() as snapshot:
-            rows = snapshot.execute_sql(query, params=params, param_types=param_types)
-            return [
-                {
-                    column: value
-                    for column, value in zip(
-                        [column.name for column in rows.fields], row
-                    )
-                }
-                for row in rows
-            ]
+        if snapshot is not None:
+            return _execute_sql(snapshot, query, params, _get_param_types(params))
+        return _read(database, query, params, snapshot_options=snapshot_options)
     except Exception as e:
         logger.error(f"Query failed: `{e}`")
     return []
 
 
-def _get_example_reference(database, query, reference_model, canonical_reference_model):
+def _read(database, query, params=None, param_types=None, snapshot_options=None):
+    # Reads in a new snapshot, coalesced with identical reads in flight.
+    key = (
+        id(database),
+        tuple(sorted(snapshot_options.items())) if snapshot_options else None,
+        query,
+        (
+            tuple(
+                sorted(
+                    (name, tuple(value) if isinstance(value, list) else value)
+                    for name, value in params.items()
+                )
+            )
+            if params
+            else None
+        ),
+    )
+    return _single_flight.do(
+        key, _read_in_snapshot, database, query, params, param_types, snapshot_options
+    )
+
+
+def _read_in_snapshot(
+    database, query, params=None, param_types=None, snapshot_options=None
+):
+    # Param types are inferred from the values unless given.
+    with database.snapshot(**(snapshot_options or {})) as snapshot:
+        return _execute_sql(
+            snapshot, query, params, param_types or _get_param_types(params)
+        )
+
+
+def _execute_sql(snapshot: Snapshot, query, params, param_types):
+    rows = snapshot.execute_sql(query, params=params, param_types=param_types)
+    return [
+        {
+            column: value
+            for column, value in zip([column.name for column in rows.fields], row)
+        }
+        for row in rows
+    ]
+
+
+def _load_rows(
+    database: Database,
+    query: str,
+    snapshot: Optional[Snapshot] = None,
+    snapshot_options: Optional[Dict[str, Any]] = None,
+):
+    if snapshot is not None:
+        return _execute_sql(snapshot, query, None, None)
+    return _read(database, query, snapshot_options=snapshot_options)
+
+
+def _normalize_reference(reference: Dict[str, Any]) -> Dict[str, Any]:
+    # Collapses whitespaces so that e.g. " Alex  Smith" and "Alex Smith" share
+    # the same cached results. Case is kept as exact matches are preferred.
+    # Only used in cache keys, searches use the original reference so that
+    # exact matches keep their bonus.
+    return {
+        name: " ".join(value.split()) if isinstance(value, str) else value
+        for name, value in reference.items()
+    }
+
+
+class _FullTextSearcher(object):
+    """Resolves a batch of references with as few queries as possible.
+
+    References are searched `_MAX_REFERENCES_PER_QUERY` at a time, each chunk
+    in a single query. Queries are built once per chunk size. When a
+    `result_cache` is given, the results of each reference are cached by the
+    search query and the normalized reference. When a `local_index` is given
+    and available, it serves the searches instead of Spanner. Spanner reads
+    use `snapshot_options`, e.g. a staleness.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        table_name: str,
+        search_criterias: List[SearchCriteria],
+        partition_columns: List[ColumnWithAlias],
+        index_filter_expr: Optional[str],
+        canonical_reference_columns: List[ColumnWithAlias],
+        top_k: int,
+        result_cache: Optional[TTLCache] = None,
+        local_index: Optional[LocalSearchIndex] = None,
+        snapshot_options: Optional[Dict[str, Any]] = None,
+    ):
+        self.database = database
+        self.table_name = table_name
+        self.search_criterias = search_criterias
+        self.partition_columns = partition_columns
+        self.index_filter_expr = index_filter_expr
+        self.canonical_reference_columns = canonical_reference_columns
+        self.top_k = top_k
+        self.result_cache = result_cache
+        self.local_index = local_index
+        self.snapshot_options = snapshot_options
+        self._search_queries: Dict[int, str] = {}
+
+    @property
+    def num_scores(self) -> int:
+        """Number of `_score_{i}` columns of each matching row."""
+        return len(self.search_criterias)
+
+    def get_search_query(self, num_references: int) -> str:
+        search_query = self._search_queries.get(num_references)
+        if search_query is None:
+            search_query = _build_full_text_search_query(
+                table_name=self.table_name,
+                search_criterias=self.search_criterias,
+                partition_columns=self.partition_columns,
+                index_filter_expr=self.index_filter_expr,
+                canonical_reference_columns=self.canonical_reference_columns,
+                top_k=self.top_k,
+                num_references=num_references,
+            )
+            logger.debug(f"Built search query:\n\n{search_query}\n\n")
+            self._search_queries[num_references] = search_query
+        return search_query
+
+    def search(
+        self, references: List[Dict[str, Any]]
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """Returns the matching rows of each reference, best match first.
+
+        The rows of a reference are None if its search failed.
+        """
+        results = self._get_cached_results(references)
+        missed = [i for i, values in enumerate(results) if values is None]
+        values_by_chunk = [
+            self._search_chunk(chunk)
+            for chunk in self._get_chunks([references[i] for i in missed])
+        ]
+        return self._merge(references, results, missed, values_by_chunk)
+
+    async def search_async(
+        self,
+        references: List[Dict[str, Any]],
+        executor: Optional[Executor] = None,
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        """Same as `search`, but the chunks are searched concurrently.
+
+        The blocking reads run in `executor`, or in the default executor of the
+        event loop if none is given.
+        """
+        results = self._get_cached_results(references)
+        missed = [i for i, values in enumerate(results) if values is None]
+        loop = asyncio.get_running_loop()
+        values_by_chunk = await asyncio.gather(
+            *[
+                loop.run_in_executor(executor, self._search_chunk, chunk)
+                for chunk in self._get_chunks([references[i] for i in missed])
+            ]
+        )
+        return self._merge(references, results, missed, values_by_chunk)
+
+    def _get_cache_key(self, reference: Dict[str, Any]):
+        return (
+            self.get_search_query(1),
+            tuple(sorted(_normalize_reference(reference).items())),
+        )
+
+    def _get_cached_results(
+        self, references: List[Dict[str, Any]]
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(references)
+        if self.result_cache is None:
+            return results
+        for i, reference in enumerate(references):
+            values = self.result_cache.get(self._get_cache_key(reference))
+            if values is not None:
+                results[i] = [dict(value) for value in values]
+        return results
+
+    def _get_chunks(
+        self, references: List[Dict[str, Any]]
+    ) -> List[List[Dict[str, Any]]]:
+        return [
+            references[start : start + _MAX_REFERENCES_PER_QUERY]
+            for start in range(0, len(references), _MAX_REFERENCES_PER_QUERY)
+        ]
+
+    def _search_chunk(
+        self, chunk: List[Dict[str, Any]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        # Returns None on failures, which are not cached.
+        if self.local_index is not None:
+            values = self.local_index.search(chunk)
+            if values is not None:
+                return values
+        params = {}
+        for i, reference in enumerate(chunk):
+            param_prefix = _get_reference_param_prefix(i)
+            params.update(
+                {param_prefix + name: value for name, value in reference.items()}
+            )
+        try:
+            return _read(
+                self.database,
+                self.get_search_query(len(chunk)),
+                params,
+                snapshot_options=self.snapshot_options,
+            )
+        except Exception as e:
+            logger.error(f"Query failed: `{e}`")
+        return None
+
+    def _merge(
+        self,
+        references: List[Dict[str, Any]],
+        results: List[Optional[List[Dict[str, Any]]]],
+        missed: List[int],
+        values_by_chunk: List[Optional[List[Dict[str, Any]]]],
+    ) -> List[Optional[List[Dict[str, Any]]]]:
+        for start, values in zip(
+            range(0, len(missed), _MAX_REFERENCES_PER_QUERY), values_by_chunk
+        ):
+            if values is None:
+                continue
+            chunk = missed[start : start + _MAX_REFERENCES_PER_QUERY]
+            values_by_reference: List[List[Dict[str, Any]]] = [[] for _ in chunk]
+            for value in values:
+                values_by_reference[value.pop("_reference_index")].append(value)
+            for i, reference_values in zip(chunk, values_by_reference):
+                results[i] = reference_values
+                if self.result_cache is not None:
+                    self.result_cache.put(
+                        self._get_cache_key(references[i]),
+                        [dict(value) for value in reference_values],
+                    )
+        return results
+
+
+class _FullTextResolver(object):
+    """Resolves references to canonical references and their scores."""
+
+    def __init__(
+        self,
+        searcher: _FullTextSearcher,
+        label: str,
+        reference_model: Type[BaseModel],
+        canonical_reference_model: Type[BaseModel],
+        min_score: Optional[float] = None,
+        relative_score_cutoff: Optional[float] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.searcher = searcher
+        self.label = label
+        self.reference_model = reference_model
+        self.canonical_reference_model = canonical_reference_model
+        self.min_score = min_score
+        self.relative_score_cutoff = relative_score_cutoff
+        self.executor = executor
+
+    def resolve(
+        self, references: List[Dict[str, Any]]
+    ) -> List[Optional[List[Tuple[BaseModel, float]]]]:
+        return self._build(self.searcher.search(references))
+
+    async def resolve_async(
+        self, references: List[Dict[str, Any]]
+    ) -> List[Optional[List[Tuple[BaseModel, float]]]]:
+        return self._build(await self.searcher.search_async(references, self.executor))
+
+    def _build(
+        self, values_by_reference: List[Optional[List[Dict[str, Any]]]]
+    ) -> List[Optional[List[Tuple[BaseModel, float]]]]:
+        return [
+            (
+                [
+                    (self.canonical_reference_model(**value), score)
+                    for value, score in _filter_by_score(
+                        values,
+                        self.searcher.num_scores,
+                        self.min_score,
+                        self.relative_score_cutoff,
+                    )
+                ]
+                if values is not None
+                else None
+            )
+            for values in values_by_reference
+        ]
+
+
+def _filter_by_score(
+    values: List[Dict[str, Any]],
+    num_scores: int,
+    min_score: Optional[float] = None,
+    relative_score_cutoff: Optional[float] = None,
+) -> List[Tuple[Dict[str, Any], float]]:
+    """Returns the values with their total score, dropping low scored ones.
+
+    Values scored below `min_score`, or below `relative_score_cutoff` times
+    the best score, are dropped. The relative cutoff only applies to a
+    positive best score, e.g. not to negative dot products.
+    """
+    scored_values = [
+        (value, sum(value[f"_score_{i}"] for i in range(num_scores)))
+        for value in values
+    ]
+    if not scored_values:
+        return []
+    threshold = min_score if min_score is not None else float("-inf")
+    best_score = max(score for _, score in scored_values)
+    if relative_score_cutoff is not None and best_score > 0:
+        threshold = max(threshold, best_score * relative_score_cutoff)
+    return [(value, score) for value, score in scored_values if score >= threshold]
+
+
+def _get_example_reference(
+    database,
+    query,
+    reference_model,
+    canonical_reference_model,
+    snapshot: Optional[Snapshot] = None,
+    example_store: Optional[JsonStore] = None,
+    snapshot_options: Optional[Dict[str, Any]] = None,
+):
     example_reference, example_canonical_reference = None, None
-    values = _query(database, query)
-    if not values:
-        logger.error("No example found by the query")
-        return None, None
+    # The example query identifies the table, columns and aliases.
+    example_key = json.dumps([getattr(database, "name", None), query])
+    value = example_store.load(example_key) if example_store is not None else None
+    if value is None:
+        values = _query(
+            database, query, snapshot=snapshot, snapshot_options=snapshot_options
+        )
+        if not values:
+            logger.error("No example found by the query")
+            return None, None
+        value = values[0]
+        if example_store is not None:
+            example_store.save(example_key, value)
 
-    value = values[0]
     try:
         example_reference, example_canonical_reference = (
             reference_model(
@@ -355,7 +765,7 @@ def _build_search_criterias(
 
 def _build_column_with_aliases(
     table_alias: str,
-    columns: Optional[List[Union[str, Column]]],
+    columns: Optional[Sequence[Union[str, Column]]],
     table_cols: Dict[str, Column],
     column_aliases: Optional[Dict[str, str]] = None,
 ) -> Optional[List[ColumnWithAlias]]:
@@ -386,7 +796,18 @@ def _build_full_text_search_function(
     include_examples: bool = False,
     table_alias: Optional[str] = None,
     column_aliases: Optional[Dict[str, str]] = None,
-) -> Optional[Callable[..., BaseModel]]:
+    snapshot: Optional[Snapshot] = None,
+    is_async: bool = False,
+    executor: Optional[Executor] = None,
+    result_cache: Optional[TTLCache] = None,
+    local_index_max_rows: int = 0,
+    local_index_refresh_interval: Optional[float] = None,
+    min_score: Optional[float] = None,
+    relative_score_cutoff: Optional[float] = None,
+    example_store: Optional[JsonStore] = None,
+    max_session_mappings: int = 256,
+    snapshot_options: Optional[Dict[str, Any]] = None,
+) -> Optional[Tuple[Callable[..., Any], "_FullTextResolver"]]:
 
     table_alias = table_alias or index.table.name
     tokenlist_cols = [col for col in index.columns if col.type == "TOKENLIST"]
@@ -455,62 +876,62 @@ def _build_full_text_search_function(
         + "\n"
     )
 
-    class ReferenceMapping(BaseModel):
-
-        reference_in_user_query: Any = Field(
-            description=f"A reference of {table_alias} from user input query"
+    local_index = None
+    if local_index_max_rows > 0:
+        local_index_query = _build_local_index_query(
+            table_name=index.table.name,
+            search_criterias=search_criterias,
+            partition_columns=partition_columns_with_aliases,
+            index_filter_expr=index.filter,
+            canonical_reference_columns=canonical_reference_fields,
+            max_rows=local_index_max_rows,
         )
-        canonical_references: List[Any] = Field(
-            description=(
-                f"A list of possible canonical references of {table_alias} in the"
-                " knowledge graph"
-            )
+        logger.debug(f"Built local index query:\n\n{local_index_query}\n\n")
+        local_index = LocalSearchIndex(
+            functools.partial(
+                _load_rows,
+                database,
+                local_index_query,
+                snapshot_options=snapshot_options,
+            ),
+            search_criterias=[
+                (criteria.tokenized_column.alias, criteria.search_function)
+                for criteria in search_criterias
+            ],
+            partition_aliases=[col.alias for col in partition_columns_with_aliases],
+            canonical_aliases=[col.alias for col in canonical_reference_fields],
+            max_rows=local_index_max_rows,
+            top_k=max(top_k, 1),
+            refresh_interval=local_index_refresh_interval,
         )
+        if not local_index.load(snapshot):
+            local_index = None
 
-    top_k = max(top_k, 1)
-    search_query = _build_full_text_search_query(
+    searcher = _FullTextSearcher(
+        database,
         table_name=index.table.name,
         search_criterias=search_criterias,
         partition_columns=partition_columns_with_aliases,
         index_filter_expr=index.filter,
         canonical_reference_columns=canonical_reference_fields,
-        top_k=top_k,
+        top_k=max(top_k, 1),
+        # Local searches are cheap, and the local index is refreshed anyway.
+        result_cache=result_cache if local_index is None else None,
+        local_index=local_index,
+        snapshot_options=snapshot_options,
     )
-    logger.debug(f"Built search query:\n\n{search_query}\n\n")
-
-    def resolve_canonical_reference(
-        references: List[Reference],  # type: ignore[valid-type]
-        tool_context: ToolContext,
-    ) -> List[ReferenceMapping]:
-        try:
-            for i in range(len(references)):
-                if isinstance(references[i], dict):
-                    references[i] = Reference(**references[i])
-            logger.debug(f"Resolving: {references}...")
 
-            results = []
-            for reference in references:
-                params = {field_name: ref for field_name, ref in reference}  # type: ignore[attr-defined]
-                values = _query(database, search_query, params=params)
-                if values:
-                    canonical_refs = [CanonicalReference(**value) for value in values]
-                    results.append(
-                        ReferenceMapping(
-                            reference_in_user_query=reference,
-                            canonical_references=canonical_refs,
-                        )
-                    )
-        except Exception as e:
-            logger.error("Failed to find relevant entities: %s" % e)
-            results = []
+    resolver = _FullTextResolver(
+        searcher,
+        label=table_alias,
+        reference_model=Reference,
+        canonical_reference_model=CanonicalReference,
+        min_score=min_score,
+        relative_score_cutoff=relative_score_cutoff,
+        executor=executor,
+    )
 
-        key = "temp:reference_mappings"
-        if key in tool_context.state:
-            tool_context.state[key].extend(results)
-        else:
-            tool_context.state[key] = results
-        logger.debug(f"Resolved reference_mappings: {results}")
-        return results
+    function = _build_resolve_function(resolver, is_async, max_session_mappings)
 
     example_reference, example_canonical_references = None, None
     if include_examples:
@@ -523,27 +944,167 @@ def _build_full_text_search_function(
         )
         logger.debug(f"Built example query:\n\n{example_query}\n\n")
         example_reference, example_canonical_references = _get_example_reference(
-            database, example_query, Reference, CanonicalReference
-        )
-    fields = "_".join(Reference.model_fields)
-    resolve_canonical_reference.__name__, resolve_canonical_reference.__doc__ = (
-        _build_full_text_search_function_description(
-            table_alias,
+            database,
+            example_query,
             Reference,
             CanonicalReference,
-            example_reference,
-            example_canonical_references,
+            snapshot=snapshot,
+            example_store=example_store,
+            snapshot_options=snapshot_options,
         )
+    fields = "_".join(Reference.model_fields)
+    function.__name__, function.__doc__ = _build_full_text_search_function_description(
+        table_alias,
+        Reference,
+        CanonicalReference,
+        example_reference,
+        example_canonical_references,
     )
 
-    return resolve_canonical_reference
+    return function, resolver
+
+
+def _build_resolve_function(
+    resolver: Any,
+    is_async: bool = False,
+    max_session_mappings: int = 256,
+) -> Callable[..., Any]:
+    """Builds the function of a resolution tool, named by the caller.
+
+    `resolver` provides `label`, `reference_model`, `canonical_reference_model`
+    and `resolve` or `resolve_async`, e.g. `_FullTextResolver`.
+    """
+    table_alias = resolver.label
+    Reference: Type[BaseModel] = resolver.reference_model
+    CanonicalReference: Type[BaseModel] = resolver.canonical_reference_model
+
+    class ReferenceMapping(BaseModel):
+
+        reference_in_user_query: Any = Field(
+            description=f"A reference of {table_alias} from user input query"
+        )
+        canonical_references: List[Any] = Field(
+            description=(
+                f"A list of possible canonical references of {table_alias} in the"
+                " knowledge graph"
+            )
+        )
+        scores: List[float] = Field(
+            default=[],
+            description=(
+                "Match score of each canonical reference, higher is better. An"
+                " exact match scores at least 1 more than a partial match"
+            ),
+        )
+
+    def parse_references(references: List[Any]) -> List[Reference]:  # type: ignore[valid-type]
+        for i in range(len(references)):
+            if isinstance(references[i], dict):
+                references[i] = Reference(**references[i])
+        logger.debug(f"Resolving: {references}...")
+        return references
+
+    def get_params(references: List[Reference]) -> List[Dict[str, Any]]:  # type: ignore[valid-type]
+        return [
+            {field_name: ref for field_name, ref in reference}  # type: ignore[attr-defined]
+            for reference in references
+        ]
+
+    def get_stored_mappings(
+        store: ReferenceMappingStore, params: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        return [store.get(function.__name__, reference) for reference in params]
+
+    def store_mappings(
+        store: ReferenceMappingStore,
+        params: List[Dict[str, Any]],
+        mappings: List[Optional[Dict[str, Any]]],
+        missed: List[int],
+        canonical_references: List[Optional[List[Tuple[BaseModel, float]]]],
+    ):
+        for i, scored_refs in zip(missed, canonical_references):
+            if scored_refs is None:
+                continue
+            mapping = {
+                "reference_in_user_query": params[i],
+                "canonical_references": [
+                    ref.model_dump(mode="json") for ref, _ in scored_refs
+                ],
+                "scores": [score for _, score in scored_refs],
+            }
+            mappings[i] = mapping
+            store.put(function.__name__, params[i], mapping)
+
+    def build_reference_mappings(
+        mappings: List[Optional[Dict[str, Any]]],
+    ) -> List[ReferenceMapping]:
+        return [
+            ReferenceMapping(
+                reference_in_user_query=Reference(**mapping["reference_in_user_query"]),
+                canonical_references=[
+                    CanonicalReference(**ref) for ref in mapping["canonical_references"]
+                ],
+                scores=mapping["scores"],
+            )
+            for mapping in mappings
+            if mapping and mapping["canonical_references"]
+        ]
+
+    def resolve_canonical_reference(
+        references: List[Reference],  # type: ignore[valid-type]
+        tool_context: ToolContext,
+    ) -> List[ReferenceMapping]:
+        store = ReferenceMappingStore(tool_context.state, max_session_mappings)
+        try:
+            params = get_params(parse_references(references))
+            # References resolved earlier in the session are not searched again.
+            mappings = get_stored_mappings(store, params)
+            missed = [i for i, mapping in enumerate(mappings) if mapping is None]
+            canonical_references = resolver.resolve([params[i] for i in missed])
+            store_mappings(store, params, mappings, missed, canonical_references)
+            results = build_reference_mappings(mappings)
+        except Exception as e:
+            logger.error("Failed to find relevant entities: %s" % e)
+            results = []
+        store.save()
+        logger.debug(f"Resolved reference_mappings: {results}")
+        return results
+
+    async def resolve_canonical_reference_async(
+        references: List[Reference],  # type: ignore[valid-type]
+        tool_context: ToolContext,
+    ) -> List[ReferenceMapping]:
+        store = ReferenceMappingStore(tool_context.state, max_session_mappings)
+        try:
+            params = get_params(parse_references(references))
+            mappings = get_stored_mappings(store, params)
+            missed = [i for i, mapping in enumerate(mappings) if mapping is None]
+            canonical_references = await resolver.resolve_async(
+                [params[i] for i in missed]
+            )
+            store_mappings(store, params, mappings, missed, canonical_references)
+            results = build_reference_mappings(mappings)
+        except Exception as e:
+            logger.error("Failed to find relevant entities: %s" % e)
+            results = []
+        store.save()
+        logger.debug(f"Resolved reference_mappings: {results}")
+        return results
+
+    function: Callable[..., Any] = (
+        resolve_canonical_reference_async if is_async else resolve_canonical_reference
+    )
+    return function
 
 
 class SpannerFullTextSearchTool(FunctionTool):
 
-    # TODO(mtyin): Consider add score-based filtering.
-    @staticmethod
+    # Whether the built function is a coroutine function.
+    is_async: bool = False
+
+    @classmethod
     def build_from_index(
+        cls,
         database: Database,
         index: Index,
         include_all_index_fields: bool = False,
@@ -553,8 +1114,31 @@ class SpannerFullTextSearchTool(FunctionTool):
         table_alias: Optional[str] = None,
         # Alias column name to `column_aliases[column_name]`.
         column_aliases: Optional[Dict[str, str]] = None,
+        # Read-only snapshot to sample examples from, if any.
+        snapshot: Optional[Snapshot] = None,
+        # Executor to run blocking reads of the async variant.
+        executor: Optional[Executor] = None,
+        # Cache of lookup results, which may be shared by tools.
+        result_cache: Optional[TTLCache] = None,
+        # Serve searches from memory if the table has at most this many rows,
+        # 0 disables the local index.
+        local_index_max_rows: int = 0,
+        # Seconds before the local index is reloaded, never if None.
+        local_index_refresh_interval: Optional[float] = None,
+        # Drop canonical references scored below `min_score`.
+        min_score: Optional[float] = None,
+        # Drop canonical references scored below `relative_score_cutoff` times
+        # the best score of the same reference, e.g. 0.5.
+        relative_score_cutoff: Optional[float] = None,
+        # Persists sampled examples across restarts.
+        example_store: Optional[JsonStore] = None,
+        # Max number of reference mappings kept in the session state.
+        max_session_mappings: int = 256,
+        # Keyword arguments of `Database.snapshot` for reads, e.g.
+        # `{"max_staleness": timedelta(seconds=10)}`, strong reads if None.
+        snapshot_options: Optional[Dict[str, Any]] = None,
     ) -> Optional[FunctionTool]:
-        function = _build_full_text_search_function(
+        built = _build_full_text_search_function(
             database,
             index,
             top_k=top_k,
@@ -562,15 +1146,72 @@ class SpannerFullTextSearchTool(FunctionTool):
             include_examples=include_examples,
             table_alias=table_alias,
             column_aliases=column_aliases,
+            snapshot=snapshot,
+            is_async=cls.is_async,
+            executor=executor,
+            result_cache=result_cache,
+            local_index_max_rows=local_index_max_rows,
+            local_index_refresh_interval=local_index_refresh_interval,
+            min_score=min_score,
+            relative_score_cutoff=relative_score_cutoff,
+            example_store=example_store,
+            max_session_mappings=max_session_mappings,
+            snapshot_options=snapshot_options,
         )
-        if function is None:
+        if built is None:
             return None
-        return SpannerFullTextSearchTool(database, index, function)
+        function, resolver = built
+        return cls(
+            database, index, function, result_cache=result_cache, resolver=resolver
+        )
 
-    def __init__(self, database: Database, index: Index, function: Callable):
+    def __init__(
+        self,
+        database: Database,
+        index: Index,
+        function: Callable,
+        result_cache: Optional[TTLCache] = None,
+        resolver: Optional[_FullTextResolver] = None,
+    ):
         super().__init__(function)
         self.database = database
         self.index = index
+        self.result_cache = result_cache
+        self.resolver = resolver
+
+    @property
+    def label(self) -> Optional[str]:
+        return self.resolver.label if self.resolver is not None else None
+
+    @property
+    def reference_model(self) -> Optional[Type[BaseModel]]:
+        return self.resolver.reference_model if self.resolver is not None else None
+
+    async def resolve_async(
+        self, references: List[Dict[str, Any]]
+    ) -> List[Optional[List[Tuple[BaseModel, float]]]]:
+        """Resolves references programmatically, e.g. `[{"name": "Acme"}]`.
+
+        Returns the canonical references of each reference with their scores,
+        best first, after the score cutoffs, or None if the search failed.
+        """
+        if self.resolver is None:
+            return [None for _ in references]
+        return await self.resolver.resolve_async(references)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the counters of the result cache, e.g. hits and misses.
+
+        Also returns the `single_flight_*` counters of reads coalesced with
+        identical reads in flight, which are shared by all tools.
+        """
+        stats = {
+            f"single_flight_{name}": value
+            for name, value in _single_flight.stats().items()
+        }
+        if self.result_cache is not None:
+            stats.update(self.result_cache.stats())
+        return stats
 
     def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
         function_decl = super()._get_declaration()
@@ -578,3 +1219,13 @@ class SpannerFullTextSearchTool(FunctionTool):
             return None
         function_decl.description = self.description
         return function_decl
+
+
+class AsyncSpannerFullTextSearchTool(SpannerFullTextSearchTool):
+    """A `SpannerFullTextSearchTool` that does not block the event loop.
+
+    Spanner reads run in an executor, and the chunks of a call with many
+    references are searched concurrently.
+    """
+
+    is_async: bool = True
@@ -0,0 +1,248 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from google.cloud.spanner_v1.snapshot import Snapshot
+
+logger = logging.getLogger("graph_agents." + __name__)
+
+_WORD_PATTERN = re.compile(r"\w+")
+_NGRAM_SIZE = 3
+
+
+def _tokenize_fulltext(text: str) -> List[str]:
+    return _WORD_PATTERN.findall(text.casefold())
+
+
+def _tokenize_ngrams(text: str) -> Set[str]:
+    text = " ".join(_tokenize_fulltext(text))
+    if len(text) <= _NGRAM_SIZE:
+        return {text} if text else set()
+    return {text[i : i + _NGRAM_SIZE] for i in range(len(text) - _NGRAM_SIZE + 1)}
+
+
+class _InvertedIndex(object):
+    """Inverted index of one tokenized column.
+
+    Mirrors the `SEARCH`, `SEARCH_NGRAMS` and `SEARCH_SUBSTRING` functions:
+    full text search requires every word to match, while n-gram and substring
+    searches are served from trigrams. Scores are the jaccard similarity of the
+    tokens plus 1 for exact matches, an approximation of the Spanner scores.
+    """
+
+    def __init__(self, search_function: str, texts: List[Optional[str]]):
+        self.search_function = search_function.casefold()
+        self.texts = texts
+        postings: Dict[str, array] = defaultdict(lambda: array("I"))
+        self.num_tokens = array("I")
+        for row_id, text in enumerate(texts):
+            tokens = self._tokenize(text) if text else set()
+            self.num_tokens.append(len(tokens))
+            for token in tokens:
+                postings[sys.intern(token)].append(row_id)
+        self.postings = dict(postings)
+
+    def search(self, text: Optional[str]) -> Dict[int, float]:
+        """Returns the score of each matching row."""
+        if not text:
+            return {}
+        tokens = self._tokenize(text)
+        if not tokens:
+            return {}
+        counter: Counter = Counter()
+        for token in tokens:
+            counter.update(self.postings.get(token, ()))
+        scores = {}
+        for row_id, num_matched in counter.items():
+            if not self._is_match(text, tokens, row_id, num_matched):
+                continue
+            score = num_matched / (len(tokens) + self.num_tokens[row_id] - num_matched)
+            scores[row_id] = score + (1.0 if self.texts[row_id] == text else 0.0)
+        return scores
+
+    def _tokenize(self, text: str) -> Set[str]:
+        if self.search_function == "search":
+            return set(_tokenize_fulltext(text))
+        return _tokenize_ngrams(text)
+
+    def _is_match(
+        self, text: str, tokens: Set[str], row_id: int, num_matched: int
+    ) -> bool:
+        if self.search_function == "search":
+            return num_matched == len(tokens)
+        if self.search_function == "search_substring":
+            row_text = (self.texts[row_id] or "").casefold()
+            return all(word in row_text for word in _tokenize_fulltext(text))
+        return num_matched >= min(2, len(tokens))
+
+
+class _LocalIndexState(object):
+    __slots__ = ("canonical_values", "partition_values", "inverted_indexes")
+
+    def __init__(
+        self,
+        canonical_values: List[Tuple[Any, ...]],
+        partition_values: List[Tuple[Any, ...]],
+        inverted_indexes: List[_InvertedIndex],
+    ):
+        self.canonical_values = canonical_values
+        self.partition_values = partition_values
+        self.inverted_indexes = inverted_indexes
+
+
+class LocalSearchIndex(object):
+    """Serves full text searches of a small table from memory.
+
+    The rows are loaded by `loader`, which must return at most
+    `max_rows + 1` rows. Tables with more than `max_rows` rows are not served
+    locally. The rows are reloaded in background once they are older than
+    `refresh_interval` seconds, while searches keep using the loaded rows.
+
+    `search` returns rows in the same shape as the search query: the canonical
+    reference columns, a `_score_{i}` column per search criteria and the
+    `_reference_index`.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Optional[Snapshot]], List[Dict[str, Any]]],
+        # (tokenized column alias, search function) of each search criteria.
+        search_criterias: List[Tuple[str, str]],
+        partition_aliases: List[str],
+        canonical_aliases: List[str],
+        max_rows: int,
+        top_k: int,
+        refresh_interval: Optional[float] = None,
+    ):
+        self.loader = loader
+        self.search_criterias = search_criterias
+        self.partition_aliases = partition_aliases
+        self.canonical_aliases = canonical_aliases
+        self.max_rows = max_rows
+        self.top_k = top_k
+        self.refresh_interval = refresh_interval
+        self._state: Optional[_LocalIndexState] = None
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self._state is not None
+
+    def load(self, snapshot: Optional[Snapshot] = None) -> bool:
+        """(Re)loads the rows, returns whether the index is available."""
+        self._loaded_at = time.monotonic()
+        try:
+            rows = self.loader(snapshot)
+        except Exception as e:
+            logger.warning(f"Failed to load local search index: {e}")
+            return self.available
+        if len(rows) > self.max_rows:
+            logger.info(
+                f"Table exceeds {self.max_rows} rows, local search index disabled"
+            )
+            self._state = None
+            return False
+        self._state = _LocalIndexState(
+            [tuple(row[alias] for alias in self.canonical_aliases) for row in rows],
+            [tuple(row[alias] for alias in self.partition_aliases) for row in rows],
+            [
+                _InvertedIndex(search_function, [row[alias] for row in rows])
+                for alias, search_function in self.search_criterias
+            ],
+        )
+        logger.debug(f"Loaded local search index with {len(rows)} rows")
+        return True
+
+    def search(
+        self, references: List[Dict[str, Any]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Searches the references, or returns None if the index is unavailable."""
+        self._maybe_refresh()
+        state = self._state
+        if state is None:
+            return None
+        values: List[Dict[str, Any]] = []
+        for i, reference in enumerate(references):
+            values.extend(
+                dict(value, _reference_index=i)
+                for value in self._search(state, reference)
+            )
+        return values
+
+    def _search(
+        self, state: _LocalIndexState, reference: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        scores_by_row: Optional[Dict[int, List[float]]] = None
+        for (alias, _), inverted_index in zip(
+            self.search_criterias, state.inverted_indexes
+        ):
+            scores = inverted_index.search(reference.get(alias))
+            if scores_by_row is None:
+                scores_by_row = {row_id: [score] for row_id, score in scores.items()}
+            else:
+                scores_by_row = {
+                    row_id: row_scores + [scores[row_id]]
+                    for row_id, row_scores in scores_by_row.items()
+                    if row_id in scores
+                }
+        if not scores_by_row:
+            return []
+
+        partition = tuple(reference.get(alias) for alias in self.partition_aliases)
+        matches = sorted(
+            (
+                (row_scores, row_id)
+                for row_id, row_scores in scores_by_row.items()
+                if state.partition_values[row_id] == partition
+            ),
+            key=lambda match: ([-score for score in match[0]], match[1]),
+        )[: self.top_k]
+        return [
+            {
+                **dict(zip(self.canonical_aliases, state.canonical_values[row_id])),
+                **{f"_score_{i}": score for i, score in enumerate(row_scores)},
+            }
+            for row_scores, row_id in matches
+        ]
+
+    def _maybe_refresh(self):
+        if self.refresh_interval is None:
+            return
+        if time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        try:
+            threading.Thread(target=self._refresh, daemon=True).start()
+        except Exception as e:
+            logger.warning(f"Failed to start a refresh: {e}")
+            self._refreshing = False
+
+    def _refresh(self):
+        try:
+            self.load()
+        finally:
+            self._refreshing = False
@@ -0,0 +1,58 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+from typing import Any, Dict, Optional
+
+REFERENCE_MAPPINGS_KEY = "temp:reference_mappings"
+
+
+class ReferenceMappingStore(object):
+    """Reference mappings resolved in a session, kept in the session state.
+
+    Mappings are json-friendly dicts keyed by (label, reference), where label
+    identifies the resolution tool. Once more than `max_size` mappings are
+    stored, the least recently used ones are evicted.
+    """
+
+    def __init__(self, state: Any, max_size: int = 256):
+        self.state = state
+        self.max_size = max(max_size, 1)
+        mappings = state.get(REFERENCE_MAPPINGS_KEY) if state is not None else None
+        # Sessions may still hold the list of mappings of older versions.
+        self.mappings: Dict[str, Dict[str, Any]] = (
+            dict(mappings) if isinstance(mappings, dict) else {}
+        )
+
+    def get(self, label: str, reference: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        key = self._get_key(label, reference)
+        mapping = self.mappings.pop(key, None)
+        if mapping is not None:
+            self.mappings[key] = mapping
+        return mapping
+
+    def put(self, label: str, reference: Dict[str, Any], mapping: Dict[str, Any]):
+        key = self._get_key(label, reference)
+        self.mappings.pop(key, None)
+        self.mappings[key] = mapping
+        while len(self.mappings) > self.max_size:
+            self.mappings.pop(next(iter(self.mappings)))
+
+    def save(self):
+        # Assigns the mappings so that the state records the change.
+        if self.state is not None:
+            self.state[REFERENCE_MAPPINGS_KEY] = self.mappings
+
+    def _get_key(self, label: str, reference: Dict[str, Any]) -> str:
+        return json.dumps([label, reference], sort_keys=True, default=str)
@@ -0,0 +1,184 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.tools import FunctionTool, ToolContext
+from pydantic import BaseModel, Field
+
+from graph_agents.tools.entity_resolution.full_text_search import (
+    SpannerFullTextSearchTool,
+)
+from graph_agents.tools.entity_resolution.session_store import ReferenceMappingStore
+
+logger = logging.getLogger("graph_agents." + __name__)
+
+# Label of the unified reference mappings in the session state.
+_UNIFIED_LABEL = "*"
+
+
+def _get_text_field(tool: SpannerFullTextSearchTool) -> Optional[str]:
+    # Only tools resolving a single string, e.g. a name, can take a plain
+    # reference from the user query.
+    reference_model = tool.reference_model
+    if reference_model is None:
+        return None
+    if len(reference_model.model_fields) != 1:
+        return None
+    name, field = next(iter(reference_model.model_fields.items()))
+    return name if field.annotation is str else None
+
+
+def _normalize_score(score: float) -> float:
+    # Maps unbounded scores of different indexes to [0, 1).
+    return score / (1.0 + score) if score > 0 else 0.0
+
+
+def _rank_matches(matches: List[Any], max_matches: int) -> List[Any]:
+    # An entity may be matched by several indexes of its label.
+    best_matches: Dict[str, Any] = {}
+    for match in sorted(matches, key=lambda m: m.score, reverse=True):
+        match_key = json.dumps(
+            [match.label, match.canonical_reference], sort_keys=True, default=str
+        )
+        best_matches.setdefault(match_key, match)
+    return list(best_matches.values())[:max_matches]
+
+
+def build_unified_entity_resolution_tool(
+    tools: List[SpannerFullTextSearchTool],
+    max_matches: int = 10,
+    max_session_mappings: int = 256,
+) -> Optional[FunctionTool]:
+    """Builds a tool resolving references across all full text search tools.
+
+    Each reference is searched concurrently by every tool whose reference is a
+    single string, and the matches are merged by their normalized scores.
+    """
+    searchable_tools: List[Tuple[SpannerFullTextSearchTool, str, str]] = []
+    for tool in tools:
+        label = tool.label
+        text_field = _get_text_field(tool)
+        if label is not None and text_field is not None:
+            searchable_tools.append((tool, label, text_field))
+    if not searchable_tools:
+        return None
+    labels = sorted({label for _, label, _ in searchable_tools})
+
+    class EntityMatch(BaseModel):
+        label: str = Field(description="Node or edge type of the entity")
+        canonical_reference: Dict[str, Any] = Field(
+            description="Canonical reference of the entity in the knowledge graph"
+        )
+        score: float = Field(
+            description="Match score between 0 and 1, higher is better"
+        )
+
+    class UnifiedReferenceMapping(BaseModel):
+        reference_in_user_query: str = Field(
+            description="A reference from user input query"
+        )
+        matches: List[EntityMatch] = Field(
+            description="Possible entities of any type, best match first"
+        )
+
+    async def search(
+        references: List[str],
+    ) -> Tuple[List[List[EntityMatch]], List[bool]]:
+        # Returns the matches of each reference and whether any of its
+        # searches failed, in which case the matches of the healthy tools are
+        # kept.
+        results_by_tool = await asyncio.gather(
+            *[
+                tool.resolve_async(
+                    [{text_field: reference} for reference in references]
+                )
+                for tool, _, text_field in searchable_tools
+            ],
+            return_exceptions=True,
+        )
+        matches_by_reference: List[List[EntityMatch]] = [[] for _ in references]
+        failed = [False for _ in references]
+        for (_, label, _), tool_results in zip(searchable_tools, results_by_tool):
+            if isinstance(tool_results, BaseException):
+                logger.error(f"Failed to resolve `{label}`: {tool_results}")
+                failed = [True for _ in references]
+                continue
+            for i, scored_refs in enumerate(tool_results):
+                if scored_refs is None:
+                    failed[i] = True
+                    continue
+                matches_by_reference[i].extend(
+                    EntityMatch(
+                        label=label,
+                        canonical_reference=ref.model_dump(mode="json"),
+                        score=_normalize_score(score),
+                    )
+                    for ref, score in scored_refs
+                )
+        return [
+            _rank_matches(matches, max_matches) for matches in matches_by_reference
+        ], failed
+
+    async def resolve_entities(
+        references: List[str],
+        tool_context: ToolContext,
+    ) -> List[UnifiedReferenceMapping]:
+        logger.debug(f"Resolving: {references}...")
+        store = ReferenceMappingStore(tool_context.state, max_session_mappings)
+        try:
+            references = [" ".join(reference.split()) for reference in references]
+            # References resolved earlier in the session are not searched again.
+            mappings = [
+                store.get(_UNIFIED_LABEL, {"reference": reference})
+                for reference in references
+            ]
+            missed = [i for i, mapping in enumerate(mappings) if mapping is None]
+            matches_by_reference, failed = await search([references[i] for i in missed])
+            for i, matches, has_failed in zip(missed, matches_by_reference, failed):
+                mapping = UnifiedReferenceMapping(
+                    reference_in_user_query=references[i], matches=matches
+                ).model_dump(mode="json")
+                mappings[i] = mapping
+                # Partial matches are searched again by later calls.
+                if not has_failed:
+                    store.put(_UNIFIED_LABEL, {"reference": references[i]}, mapping)
+            results = [
+                UnifiedReferenceMapping(**mapping)
+                for mapping in mappings
+                if mapping and mapping["matches"]
+            ]
+        except Exception as e:
+            logger.error("Failed to find relevant entities: %s" % e)
+            results = []
+        store.save()
+        logger.debug(f"Resolved reference_mappings: {results}")
+        return results
+
+    resolve_entities.__doc__ = f"""
+    Resolves entities of unknown type to their canonical references.
+
+    Input: a list of references (names, descriptions, titles, etc.) in the
+    original query, e.g. ["Acme", "John Smith"];
+    Output: for each reference, the matching entities of any of the types
+    {labels}, with the type (label), the canonical reference and a score.
+
+    Use this tool when the type of a reference is unclear instead of calling
+    several type-specific resolution tools. The canonical references must be
+    used in subsequent queries to the knowledge graph.
+  """
+    return FunctionTool(resolve_entities)
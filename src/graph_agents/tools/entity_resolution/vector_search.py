@@ -0,0 +1,557 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import math
+import zlib
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from google.cloud import spanner
+from google.cloud.spanner_v1.database import Database
+from google.cloud.spanner_v1.snapshot import Snapshot
+from langchain_core.embeddings import Embeddings
+
+from graph_agents.tools.entity_resolution.full_text_search import (
+    ColumnWithAlias,
+    SpannerFullTextSearchTool,
+    _build_column_with_aliases,
+    _build_full_text_search_function_description,
+    _build_resolve_function,
+    _create_model,
+    _FullTextResolver,
+    _FullTextSearcher,
+    _get_alias,
+    _get_example_reference,
+    _get_reference_param_prefix,
+    _read,
+)
+from graph_agents.utils.cache import TTLCache
+from graph_agents.utils.database_context import Column, Index
+from graph_agents.utils.schema_snapshot import JsonStore
+
+logger = logging.getLogger("graph_agents." + __name__)
+
+EmbeddingFunction = Callable[[List[str]], List[List[float]]]
+
+# Distance type => (distance function, whether larger is closer)
+_DISTANCE_FUNCTIONS = {
+    "COSINE": ("APPROX_COSINE_DISTANCE", False),
+    "EUCLIDEAN": ("APPROX_EUCLIDEAN_DISTANCE", False),
+    "DOT_PRODUCT": ("APPROX_DOT_PRODUCT", True),
+}
+
+# Suffixes of embedding columns named after their source column, e.g.
+# `name_embedding` for `name`.
+_EMBEDDING_COLUMN_SUFFIXES = ["_embedding", "embedding", "_vector", "_emb"]
+
+
+def _get_similarity(distance_type: str, distance: float) -> float:
+    # Maps distances to similarities, higher is better. Cosine distances are
+    # in [0, 2] and mapped to [0, 1]. Dot products may still be negative.
+    if distance_type == "COSINE":
+        return (2.0 - distance) / 2.0
+    if distance_type == "EUCLIDEAN":
+        return 1.0 / (1.0 + distance)
+    return distance
+
+
+def _get_embedding_param_type(embedding_column: Column):
+    # E.g. ARRAY<FLOAT32>(vector_length=>768)
+    if "FLOAT32" in embedding_column.type:
+        return spanner.param_types.Array(spanner.param_types.FLOAT32)
+    return spanner.param_types.Array(spanner.param_types.FLOAT64)
+
+
+def _get_embed_function(
+    embedding: Union[Embeddings, EmbeddingFunction],
+) -> EmbeddingFunction:
+    if hasattr(embedding, "embed_documents"):
+        return embedding.embed_documents
+    return embedding
+
+
+def _infer_source_column(
+    embedding_column: Column, table_cols: Dict[str, Column]
+) -> Optional[Column]:
+    name = embedding_column.name.casefold()
+    for suffix in _EMBEDDING_COLUMN_SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix):
+            column = table_cols.get(name[: -len(suffix)])
+            if column is not None and column.type.startswith("STRING"):
+                return column
+    return None
+
+
+class HashingEmbedding(object):
+    """A deterministic embedding of character trigrams.
+
+    Needs no model or network, e.g. for tests and benchmarks. Similar
+    spellings get similar embeddings, but meanings are not captured.
+    """
+
+    def __init__(self, dimension: int = 64):
+        self.dimension = dimension
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        text = f" {' '.join(text.casefold().split())} "
+        for i in range(max(len(text) - 2, 1)):
+            h = zlib.crc32(text[i : i + 3].encode("utf-8"))
+            vector[h % self.dimension] += 1.0 if h & 0x80000000 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+
+def _build_vector_search_query(
+    table_name: str,
+    index_name: str,
+    embedding_column: Column,
+    source_column: ColumnWithAlias,
+    index_filter_expr: Optional[str],
+    canonical_reference_columns: List[ColumnWithAlias],
+    top_k: int,
+    distance_type: str = "COSINE",
+    num_leaves_to_search: Optional[int] = None,
+    num_references: int = 1,
+) -> str:
+    """Builds a query that finds the nearest neighbors of many references.
+
+    Params of the i-th reference are prefixed, e.g. `@r0_name` and
+    `@r0__embedding`. Results are ordered by `_reference_index` and then by
+    the `_distance` of each neighbor.
+    """
+    distance_function, descending = _DISTANCE_FUNCTIONS[distance_type]
+    order = "DESC" if descending else "ASC"
+    options_expr = ""
+    if num_leaves_to_search is not None:
+        options = json.dumps({"num_leaves_to_search": num_leaves_to_search})
+        options_expr = f", options => JSON '{options}'"
+    canonical_reference_aliases = ", ".join(
+        (col.build() for col in canonical_reference_columns)
+    )
+    # Vector indexes are usually filtered by the same condition.
+    filter_conditions = [f"{embedding_column.name} IS NOT NULL"]
+    if index_filter_expr and index_filter_expr.casefold() != (
+        filter_conditions[0].casefold()
+    ):
+        filter_conditions.append(index_filter_expr)
+    filter_expr = " AND ".join(filter_conditions)
+    pieces = []
+    for i in range(num_references):
+        param_prefix = _get_reference_param_prefix(i)
+        # E.g. APPROX_COSINE_DISTANCE(name_embedding, @r0__embedding)
+        distance_expr = (
+            f"{distance_function}({embedding_column.name},"
+            f" @{param_prefix}_embedding{options_expr})"
+        )
+        exact_match_expr = (
+            f"IF({source_column.column.name} = @{param_prefix}{source_column.alias},"
+            " 1., 0.)"
+        )
+        pieces.append(
+            f"""
+      SELECT {i} AS _reference_index, *
+      FROM (
+        SELECT {canonical_reference_aliases},
+               {distance_expr} AS _distance,
+               {exact_match_expr} AS _exact_match
+        FROM {table_name}@{{FORCE_INDEX={index_name}}}
+        WHERE {filter_expr}
+        ORDER BY {distance_expr} {order}
+        LIMIT {top_k}
+      )"""
+        )
+    union_expr = "\n      UNION ALL".join(pieces)
+    return f"""
+    SELECT *
+    FROM ({union_expr}
+    )
+    ORDER BY _reference_index, _distance {order}
+  """
+
+
+def _build_vector_example_query(
+    table_name: str,
+    embedding_column: Column,
+    source_column: ColumnWithAlias,
+    index_filter_expr: Optional[str],
+    canonical_reference_columns: List[ColumnWithAlias],
+) -> str:
+    example_aliases = ", ".join(
+        [col.build() for col in canonical_reference_columns + [source_column]]
+    )
+    filter_conditions = [
+        f"{embedding_column.name} IS NOT NULL",
+        f"{source_column.column.name} IS NOT NULL",
+    ]
+    if index_filter_expr:
+        filter_conditions.append(index_filter_expr)
+    filter_expr = " AND ".join(filter_conditions)
+    return f"""
+    SELECT {example_aliases}
+    FROM {table_name}
+    TABLESAMPLE RESERVOIR (1 ROWS)
+    WHERE {filter_expr}
+  """
+
+
+class _VectorSearcher(_FullTextSearcher):
+    """Resolves a batch of references by their nearest neighbors.
+
+    References are embedded once per chunk, and each chunk is searched in a
+    single query. Matching rows carry a single `_score_0`: the similarity of
+    the neighbor, plus 1 for an exact match of the source column.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        table_name: str,
+        index_name: str,
+        embedding_column: Column,
+        source_column: ColumnWithAlias,
+        index_filter_expr: Optional[str],
+        canonical_reference_columns: List[ColumnWithAlias],
+        top_k: int,
+        embed: EmbeddingFunction,
+        distance_type: str = "COSINE",
+        num_leaves_to_search: Optional[int] = None,
+        result_cache: Optional[TTLCache] = None,
+        snapshot_options: Optional[Dict[str, Any]] = None,
+    ):
+        super().__init__(
+            database,
+            table_name=table_name,
+            search_criterias=[],
+            partition_columns=[],
+            index_filter_expr=index_filter_expr,
+            canonical_reference_columns=canonical_reference_columns,
+            top_k=top_k,
+            result_cache=result_cache,
+            snapshot_options=snapshot_options,
+        )
+        self.index_name = index_name
+        self.embedding_column = embedding_column
+        self.source_column = source_column
+        self.embed = embed
+        self.distance_type = distance_type
+        self.num_leaves_to_search = num_leaves_to_search
+        self.embedding_param_type = _get_embedding_param_type(embedding_column)
+
+    @property
+    def num_scores(self) -> int:
+        return 1
+
+    def get_search_query(self, num_references: int) -> str:
+        search_query = self._search_queries.get(num_references)
+        if search_query is None:
+            search_query = _build_vector_search_query(
+                table_name=self.table_name,
+                index_name=self.index_name,
+                embedding_column=self.embedding_column,
+                source_column=self.source_column,
+                index_filter_expr=self.index_filter_expr,
+                canonical_reference_columns=self.canonical_reference_columns,
+                top_k=self.top_k,
+                distance_type=self.distance_type,
+                num_leaves_to_search=self.num_leaves_to_search,
+                num_references=num_references,
+            )
+            logger.debug(f"Built vector search query:\n\n{search_query}\n\n")
+            self._search_queries[num_references] = search_query
+        return search_query
+
+    def _search_chunk(
+        self, chunk: List[Dict[str, Any]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        # Returns None on failures, which are not cached.
+        alias = self.source_column.alias
+        params: Dict[str, Any] = {}
+        param_types: Dict[str, Any] = {}
+        try:
+            texts = [reference[alias] for reference in chunk]
+            for i, (text, embedding) in enumerate(zip(texts, self.embed(texts))):
+                param_prefix = _get_reference_param_prefix(i)
+                params[param_prefix + alias] = text
+                param_types[param_prefix + alias] = spanner.param_types.STRING
+                params[param_prefix + "_embedding"] = [float(v) for v in embedding]
+                param_types[param_prefix + "_embedding"] = self.embedding_param_type
+            values = _read(
+                self.database,
+                self.get_search_query(len(chunk)),
+                params,
+                param_types,
+                snapshot_options=self.snapshot_options,
+            )
+        except Exception as e:
+            logger.error(f"Vector search failed: `{e}`")
+            return None
+        for value in values:
+            value["_score_0"] = _get_similarity(
+                self.distance_type, value.pop("_distance")
+            ) + value.pop("_exact_match")
+        return values
+
+
+def _build_vector_search_function(
+    database: Database,
+    index: Index,
+    embedding: Union[Embeddings, EmbeddingFunction],
+    top_k: int,
+    source_column: Optional[str] = None,
+    distance_type: str = "COSINE",
+    num_leaves_to_search: Optional[int] = None,
+    include_all_index_fields: bool = False,
+    include_examples: bool = False,
+    table_alias: Optional[str] = None,
+    column_aliases: Optional[Dict[str, str]] = None,
+    snapshot: Optional[Snapshot] = None,
+    is_async: bool = False,
+    executor: Optional[Executor] = None,
+    result_cache: Optional[TTLCache] = None,
+    min_score: Optional[float] = None,
+    relative_score_cutoff: Optional[float] = None,
+    example_store: Optional[JsonStore] = None,
+    max_session_mappings: int = 256,
+    snapshot_options: Optional[Dict[str, Any]] = None,
+) -> Optional[Tuple[Callable[..., Any], _FullTextResolver]]:
+
+    table_alias = table_alias or index.table.name
+    distance_type = distance_type.upper()
+    if distance_type not in _DISTANCE_FUNCTIONS:
+        logger.warning(f"Distance type `{distance_type}` is not supported")
+        return None
+    table_cols = {col.name.casefold(): col for col in index.table.columns}
+    embedding_columns = [col for col in index.columns if col.type.startswith("ARRAY")]
+    if len(embedding_columns) != 1:
+        logger.debug("Embedding column is not supported: `%s`" % index)
+        return None
+    embedding_column = embedding_columns[0]
+
+    source = (
+        table_cols.get(source_column.casefold())
+        if source_column
+        else _infer_source_column(embedding_column, table_cols)
+    )
+    if source is None:
+        logger.debug(f"No source column found for `{embedding_column.name}`")
+        return None
+    source_alias = _get_alias(source.name, column_aliases)
+    if source_alias is None:
+        logger.debug(f"No alias found for `{source.name}` of `{table_alias}")
+        return None
+    source_with_alias = ColumnWithAlias(column=source, alias=source_alias)
+
+    key_column_with_aliases = _build_column_with_aliases(
+        table_alias, index.table.key_columns, table_cols, column_aliases
+    )
+    if key_column_with_aliases is None:
+        logger.debug("Unable to build key column aliases: `%s`" % index)
+        return None
+
+    Reference = _create_model(
+        f"UserProvided{table_alias}Reference", [source_with_alias]
+    )
+    if Reference is None:
+        logger.warning(f"Unable to build UserProvided{table_alias}Reference data model")
+        return None
+
+    canonical_reference_fields = key_column_with_aliases
+    if include_all_index_fields:
+        for col in index.columns:
+            if col.name == embedding_column.name:
+                continue
+            alias = _get_alias(col.name, column_aliases)
+            if alias is None:
+                continue
+            canonical_reference_fields.append(ColumnWithAlias(column=col, alias=alias))
+    canonical_reference_fields = [
+        field
+        for field in canonical_reference_fields
+        if field.alias not in Reference.model_fields
+    ]
+    CanonicalReference = _create_model(
+        f"Canonical{table_alias}Reference", canonical_reference_fields
+    )
+    if CanonicalReference is None:
+        logger.warning(f"Unable to build {table_alias}CanonicalReference data model")
+        return None
+
+    searcher = _VectorSearcher(
+        database,
+        table_name=index.table.name,
+        index_name=index.name,
+        embedding_column=embedding_column,
+        source_column=source_with_alias,
+        index_filter_expr=index.filter,
+        canonical_reference_columns=canonical_reference_fields,
+        top_k=max(top_k, 1),
+        embed=_get_embed_function(embedding),
+        distance_type=distance_type,
+        num_leaves_to_search=num_leaves_to_search,
+        result_cache=result_cache,
+        snapshot_options=snapshot_options,
+    )
+    resolver = _FullTextResolver(
+        searcher,
+        label=table_alias,
+        reference_model=Reference,
+        canonical_reference_model=CanonicalReference,
+        min_score=min_score,
+        relative_score_cutoff=relative_score_cutoff,
+        executor=executor,
+    )
+
+    function = _build_resolve_function(resolver, is_async, max_session_mappings)
+
+    example_reference, example_canonical_references = None, None
+    if include_examples:
+        example_query = _build_vector_example_query(
+            table_name=index.table.name,
+            embedding_column=embedding_column,
+            source_column=source_with_alias,
+            index_filter_expr=index.filter,
+            canonical_reference_columns=canonical_reference_fields,
+        )
+        logger.debug(f"Built example query:\n\n{example_query}\n\n")
+        example_reference, example_canonical_references = _get_example_reference(
+            database,
+            example_query,
+            Reference,
+            CanonicalReference,
+            snapshot=snapshot,
+            example_store=example_store,
+            snapshot_options=snapshot_options,
+        )
+    function_name, doc = _build_full_text_search_function_description(
+        table_alias,
+        Reference,
+        CanonicalReference,
+        example_reference,
+        example_canonical_references,
+    )
+    # Distinct from the name of a full text search tool of the same label.
+    function.__name__ = function_name + "_by_similarity"
+    function.__doc__ = (
+        doc
+        + """
+    References are matched by the similarity of their meaning, so that
+    descriptive, misspelled or translated references can be resolved.
+  """
+    )
+    return function, resolver
+
+
+class SpannerVectorSearchTool(SpannerFullTextSearchTool):
+    """Resolves references by an approximate nearest neighbor search.
+
+    Built from a vector index, whose embedding column is expected to embed a
+    string column of the same table with `embedding`. Provides the same
+    interface as `SpannerFullTextSearchTool`.
+    """
+
+    is_async: bool = False
+
+    @classmethod
+    def build_from_index(
+        cls,
+        database: Database,
+        index: Index,
+        include_all_index_fields: bool = False,
+        include_examples: bool = True,
+        top_k: int = 10,
+        # Alias table name to `table_alias`.
+        table_alias: Optional[str] = None,
+        # Alias column name to `column_aliases[column_name]`.
+        column_aliases: Optional[Dict[str, str]] = None,
+        # Read-only snapshot to sample examples from, if any.
+        snapshot: Optional[Snapshot] = None,
+        # Executor to run blocking reads of the async variant.
+        executor: Optional[Executor] = None,
+        # Cache of lookup results, which may be shared by tools.
+        result_cache: Optional[TTLCache] = None,
+        # Not supported, vector searches always read Spanner.
+        local_index_max_rows: int = 0,
+        local_index_refresh_interval: Optional[float] = None,
+        # Drop canonical references scored below `min_score`.
+        min_score: Optional[float] = None,
+        # Drop canonical references scored below `relative_score_cutoff` times
+        # the best score of the same reference, e.g. 0.5.
+        relative_score_cutoff: Optional[float] = None,
+        # Persists sampled examples across restarts.
+        example_store: Optional[JsonStore] = None,
+        # Max number of reference mappings kept in the session state.
+        max_session_mappings: int = 256,
+        # Keyword arguments of `Database.snapshot` for reads, e.g.
+        # `{"max_staleness": timedelta(seconds=10)}`, strong reads if None.
+        snapshot_options: Optional[Dict[str, Any]] = None,
+        *,
+        # Embeds the references, e.g. `VertexAIEmbeddings` or `HashingEmbedding`.
+        embedding: Optional[Union[Embeddings, EmbeddingFunction]] = None,
+        # Column embedded by the embedding column, inferred from their names,
+        # e.g. `name` for `name_embedding`, if None.
+        source_column: Optional[str] = None,
+        # Distance type of the index: COSINE, EUCLIDEAN or DOT_PRODUCT.
+        distance_type: str = "COSINE",
+        # Leaves of the index to search, the Spanner default if None.
+        num_leaves_to_search: Optional[int] = None,
+    ) -> Optional[SpannerFullTextSearchTool]:
+        if embedding is None:
+            logger.warning(f"No embedding given for the vector index `{index.name}`")
+            return None
+        built = _build_vector_search_function(
+            database,
+            index,
+            embedding,
+            top_k=top_k,
+            source_column=source_column,
+            distance_type=distance_type,
+            num_leaves_to_search=num_leaves_to_search,
+            include_all_index_fields=include_all_index_fields,
+            include_examples=include_examples,
+            table_alias=table_alias,
+            column_aliases=column_aliases,
+            snapshot=snapshot,
+            is_async=cls.is_async,
+            executor=executor,
+            result_cache=result_cache,
+            min_score=min_score,
+            relative_score_cutoff=relative_score_cutoff,
+            example_store=example_store,
+            max_session_mappings=max_session_mappings,
+            snapshot_options=snapshot_options,
+        )
+        if built is None:
+            return None
+        function, resolver = built
+        return cls(
+            database, index, function, result_cache=result_cache, resolver=resolver
+        )
+
+
+class AsyncSpannerVectorSearchTool(SpannerVectorSearchTool):
+    """A `SpannerVectorSearchTool` that does not block the event loop.
+
+    Embeddings and Spanner reads run in an executor.
+    """
+
+    is_async: bool = True
@@ -0,0 +1,286 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from google.cloud.spanner_v1.database import Database
+from langchain_core.embeddings import Embeddings
+from langchain_core.example_selectors.base import BaseExampleSelector
+from langchain_core.example_selectors.semantic_similarity import sorted_values
+
+logger = logging.getLogger("graph_agents." + __name__)
+
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return embeddings / np.where(norms > 0, norms, 1.0)
+
+
+def maximal_marginal_relevance(
+    query_embedding: np.ndarray,
+    embeddings: np.ndarray,
+    k: int,
+    fetch_k: int = 20,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """Returns the rows of `embeddings` selected by maximal marginal relevance.
+
+    Embeddings must be normalized. The `fetch_k` rows most similar to the
+    query are the candidates, of which `k` are selected one at a time to
+    maximize `lambda_mult * similarity to the query - (1 - lambda_mult) * max
+    similarity to the selected rows`.
+    """
+    if k <= 0 or len(embeddings) == 0:
+        return []
+    similarities = embeddings @ query_embedding
+    fetch_k = min(max(fetch_k, k), len(embeddings))
+    candidates = np.argpartition(-similarities, fetch_k - 1)[:fetch_k]
+    candidates = candidates[np.argsort(-similarities[candidates], kind="stable")]
+    relevance = similarities[candidates]
+    redundancy = embeddings[candidates] @ embeddings[candidates].T
+
+    selected = [0]
+    max_redundancy = redundancy[0].copy()
+    is_selected = np.zeros(len(candidates), dtype=bool)
+    is_selected[0] = True
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_redundancy
+        scores[is_selected] = -np.inf
+        i = int(np.argmax(scores))
+        selected.append(i)
+        is_selected[i] = True
+        np.maximum(max_redundancy, redundancy[i], out=max_redundancy)
+    return [int(candidates[i]) for i in selected]
+
+
+class _ExampleMirrorState(object):
+    __slots__ = ("embeddings", "examples")
+
+    def __init__(self, embeddings: np.ndarray, examples: List[Dict[str, Any]]):
+        self.embeddings = embeddings
+        self.examples = examples
+
+
+class LocalExampleMirror(object):
+    """Mirrors a table of GQL examples into memory.
+
+    Reads the examples and their embeddings stored by a `SpannerVectorStore`
+    into a normalized float32 matrix, so that examples are selected without
+    reading Spanner. Tables with more than `max_rows` examples are not
+    mirrored. The examples are reloaded in background once they are older
+    than `refresh_interval` seconds, while selections keep using the loaded
+    examples.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        table_name: str,
+        max_rows: int,
+        refresh_interval: Optional[float] = None,
+        content_column: str = "user_query",
+        embedding_column: str = "embedding",
+        metadata_json_column: str = "example",
+        snapshot_options: Optional[Dict[str, Any]] = None,
+    ):
+        self.database = database
+        self.table_name = table_name
+        self.max_rows = max_rows
+        self.refresh_interval = refresh_interval
+        self.content_column = content_column
+        self.embedding_column = embedding_column
+        self.metadata_json_column = metadata_json_column
+        self.snapshot_options = snapshot_options
+        self._state: Optional[_ExampleMirrorState] = None
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self._state is not None
+
+    def __len__(self) -> int:
+        state = self._state
+        return len(state.examples) if state is not None else 0
+
+    def load(self) -> bool:
+        """(Re)loads the examples, returns whether the mirror is available."""
+        self._loaded_at = time.monotonic()
+        try:
+            rows = self._read()
+        except Exception as e:
+            logger.warning(f"Failed to load GQL examples: {e}")
+            return self.available
+        if len(rows) > self.max_rows:
+            logger.info(
+                f"Table exceeds {self.max_rows} rows, local GQL examples disabled"
+            )
+            self._state = None
+            return False
+        examples = []
+        embeddings = []
+        for content, embedding, example in rows:
+            if not embedding:
+                continue
+            examples.append(self._to_example(content, example))
+            embeddings.append(embedding)
+        state = _ExampleMirrorState(
+            (
+                _normalize(np.asarray(embeddings, dtype=np.float32))
+                if embeddings
+                else np.zeros((0, 0), dtype=np.float32)
+            ),
+            examples,
+        )
+        with self._lock:
+            self._state = state
+        logger.debug(f"Loaded {len(examples)} GQL examples")
+        return True
+
+    def add(self, content: str, example: Dict[str, Any], embedding: Sequence[float]):
+        """Adds an example written to the table, until the next reload."""
+        normalized: np.ndarray = _normalize(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            state = self._state
+            if state is None:
+                return
+            embeddings = (
+                np.vstack([state.embeddings, normalized])
+                if len(state.examples)
+                else normalized.reshape(1, -1)
+            )
+            self._state = _ExampleMirrorState(
+                embeddings, state.examples + [self._to_example(content, example)]
+            )
+
+    def select(
+        self,
+        query_embedding: Sequence[float],
+        k: int,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Selects examples by MMR, or returns None if the mirror is unavailable."""
+        state = self._state
+        if state is None:
+            return None
+        rows = maximal_marginal_relevance(
+            _normalize(np.asarray(query_embedding, dtype=np.float32)),
+            state.embeddings,
+            k,
+            fetch_k=fetch_k,
+            lambda_mult=lambda_mult,
+        )
+        return [dict(state.examples[row]) for row in rows]
+
+    def _read(self) -> List[Any]:
+        query = f"""
+        SELECT {self.content_column}, {self.embedding_column},
+               {self.metadata_json_column}
+        FROM {self.table_name}
+        LIMIT {self.max_rows + 1}
+        """
+        with self.database.snapshot(**(self.snapshot_options or {})) as snapshot:
+            return list(snapshot.execute_sql(query))
+
+    def _to_example(self, content: str, example: Any) -> Dict[str, Any]:
+        # Mirrors `SpannerVectorStore`, whose documents are the JSON metadata.
+        if not example:
+            return {self.content_column: content}
+        return dict(example)
+
+    def maybe_refresh(self):
+        """Reloads the examples in background if they are stale."""
+        if self.refresh_interval is None:
+            return
+        if time.monotonic() - self._loaded_at < self.refresh_interval:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        try:
+            threading.Thread(target=self._refresh, daemon=True).start()
+        except Exception as e:
+            logger.warning(f"Failed to start a refresh: {e}")
+            self._refreshing = False
+
+    def _refresh(self):
+        try:
+            self.load()
+        finally:
+            self._refreshing = False
+
+
+class LocalExampleSelector(BaseExampleSelector):
+    """Selects examples from a `LocalExampleMirror` by MMR.
+
+    Selects the same examples as `MaxMarginalRelevanceExampleSelector` over
+    the mirrored table, except that candidates are ranked by cosine
+    similarity. Only the input is embedded per selection. Uses `fallback`
+    while the mirror is unavailable, e.g. if the table grew too large.
+    """
+
+    def __init__(
+        self,
+        mirror: LocalExampleMirror,
+        embedding: Embeddings,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        input_keys: Optional[List[str]] = None,
+        fallback: Optional[BaseExampleSelector] = None,
+    ):
+        self.mirror = mirror
+        self.embedding = embedding
+        self.k = k
+        self.fetch_k = fetch_k
+        self.lambda_mult = lambda_mult
+        self.input_keys = input_keys
+        self.fallback = fallback
+
+    def add_example(self, example: Dict[str, str]) -> Any:
+        if self.fallback is not None:
+            self.fallback.add_example(example)
+        self.add_mirrored_example(self._get_text(example), example)
+
+    def add_mirrored_example(self, text: str, example: Dict[str, Any]):
+        """Mirrors an example already written to the table as `text`."""
+        self.mirror.add(text, example, self.embedding.embed_documents([text])[0])
+
+    def select_examples(self, input_variables: Dict[str, str]) -> List[dict]:
+        self.mirror.maybe_refresh()
+        examples = None
+        if self.mirror.available:
+            examples = self.mirror.select(
+                self.embedding.embed_query(self._get_text(input_variables)),
+                self.k,
+                fetch_k=self.fetch_k,
+                lambda_mult=self.lambda_mult,
+            )
+        if examples is None:
+            if self.fallback is None:
+                return []
+            return self.fallback.select_examples(input_variables)
+        return examples
+
+    def _get_text(self, variables: Dict[str, str]) -> str:
+        if self.input_keys:
+            variables = {key: variables[key] for key in self.input_keys}
+        return " ".join(sorted_values(variables))
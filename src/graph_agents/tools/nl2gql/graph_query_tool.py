@@ -12,15 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import functools
+import hashlib
 import logging
-from typing import Any, Optional, Union
+import re
+from typing import Any, List, Optional, Union
 
 from google.adk.tools import BaseTool, ToolContext
 from google.cloud import spanner
 from google.cloud.spanner_v1.database import Database
 from google.genai import types
-from langchain_community.graphs.graph_store import GraphStore
 from langchain_core.embeddings import Embeddings
+from langchain_core.example_selectors.base import BaseExampleSelector
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.vectorstores import VectorStore
 from langchain_google_spanner import (
@@ -38,9 +42,55 @@ from graph_agents.instructions.query.prompts import (
     DEFAULT_GQL_GENERATION_WITH_EXAMPLE_PREFIX,
     DEFAULT_GQL_TEMPLATE_PART1,
 )
+from graph_agents.tools.nl2gql.example_mirror import (
+    LocalExampleMirror,
+    LocalExampleSelector,
+)
+from graph_agents.tools.nl2gql.spanner_impl import StaleReadSpannerImpl, estimate_size
+from graph_agents.utils.cache import TTLCache
+from graph_agents.utils.semantic_cache import SemanticCache
+from graph_agents.utils.single_flight import AsyncSingleFlight
+from graph_agents.utils.staleness import get_snapshot_options
 
 logger = logging.getLogger("graph_agents." + __name__)
 
+# Trailing characters that do not change the meaning of a question.
+_QUERY_TRAILING_CHARS = " ?.!"
+
+
+def _normalize_user_query(user_query: str) -> str:
+    # E.g. "Who works at  Acme?" and "Who works at Acme" share a GQL. Case is
+    # kept, as entities in the GQL are matched case-sensitively.
+    return " ".join(user_query.split()).rstrip(_QUERY_TRAILING_CHARS)
+
+
+def _get_numbers(text: str) -> List[str]:
+    return sorted(re.findall(r"\d+(?:\.\d+)?", text))
+
+
+def _is_gql_applicable(gql: str, user_query: str, similar_query: str) -> bool:
+    # A similar question may ask about other entities or numbers, e.g. "who
+    # works at Acme" and "who works at Globex", or "top 5 accounts in 2023"
+    # and "top 10 accounts in 2024". So string literals of the GQL must be
+    # found in the question, and both questions must have the same numbers.
+    if _get_numbers(user_query) != _get_numbers(similar_query):
+        return False
+    user_query = user_query.casefold()
+    return all(
+        literal.casefold() in user_query
+        for match in re.findall(r"'([^']*)'|\"([^\"]*)\"", gql)
+        for literal in match
+        if literal
+    )
+
+
+def _get_final_gql(intermediate_steps: Optional[List[Any]]) -> Optional[str]:
+    # Failed queries are recorded as `query_failed_{i}` instead.
+    for step in reversed(intermediate_steps or []):
+        if isinstance(step, dict) and step.get("generated_query"):
+            return step["generated_query"]
+    return None
+
 
 class SpannerGraphQueryQATool(BaseTool):
 
@@ -58,20 +108,46 @@ class SpannerGraphQueryQATool(BaseTool):
         )
         config = tool_config.copy()
         config["database"] = database
+        self.result_cache = self.get_result_cache(config)
         self.graph_store = SpannerGraphStore(
             instance_id=database._instance.instance_id,
             database_id=database.database_id,
             graph_name=graph_id,
             client=database._instance._client,
+            impl=StaleReadSpannerImpl(
+                database,
+                snapshot_options=get_snapshot_options(
+                    config.get("exact_staleness"), config.get("max_staleness")
+                ),
+                result_cache=self.result_cache,
+            ),
         )
         self.llm = self.get_llm(llm, config)
         self.example_store = self.get_example_store(config)
+        self.example_selector = self.get_example_selector(self.example_store, config)
+        # Caches the GQL executed for a normalized question, which skips the
+        # GQL generation of the same question until the schema changes.
+        self.gql_cache = (
+            TTLCache(max_size=config["gql_cache_size"], ttl=config.get("gql_cache_ttl"))
+            if config.get("gql_cache_size", 0) > 0
+            else None
+        )
+        self.schema_fingerprint = hashlib.sha256(
+            self.graph_store.get_schema.encode("utf-8")
+        ).hexdigest()
+        self.semantic_cache = self.get_semantic_cache(config)
+        self.return_intermediate_steps = config.get("return_intermediate_steps", False)
+        if self.gql_cache is not None or self.semantic_cache is not None:
+            # The executed GQL is only found in the intermediate steps.
+            config["return_intermediate_steps"] = True
         self.qa_chain = self.get_qa_chain(
             self.graph_store,
             self.llm,
             self.example_store,
             config,
+            example_selector=self.example_selector,
         )
+        self.single_flight = AsyncSingleFlight()
 
     @staticmethod
     def get_llm(
@@ -92,10 +168,60 @@ class SpannerGraphQueryQATool(BaseTool):
         if isinstance(embedding, str):
             from langchain_google_vertexai.embeddings import VertexAIEmbeddings
 
-            return VertexAIEmbeddings(model_name=embedding)
+            return VertexAIEmbeddings(model=embedding)
 
         return embedding
 
+    @staticmethod
+    def get_result_cache(
+        tool_config: dict[str, Any] = {},
+    ) -> Optional[TTLCache]:
+        max_bytes = tool_config.get("gql_result_cache_max_bytes", 0)
+        # Results are as stale as the reads may be, unless a TTL is given.
+        ttl = tool_config.get("gql_result_cache_ttl")
+        if ttl is None:
+            ttl = tool_config.get("exact_staleness")
+        if ttl is None:
+            ttl = tool_config.get("max_staleness")
+        if not max_bytes or max_bytes <= 0 or not ttl:
+            return None
+        return TTLCache(
+            max_size=tool_config.get("gql_result_cache_size", 1024),
+            ttl=ttl,
+            weigher=estimate_size,
+            max_weight=max_bytes,
+        )
+
+    @staticmethod
+    def get_semantic_cache(
+        tool_config: dict[str, Any] = {},
+    ) -> Optional[SemanticCache]:
+        max_size = tool_config.get("semantic_cache_size", 0)
+        if not max_size or max_size <= 0:
+            return None
+        # An `Embeddings` or a function embedding a list of texts.
+        embedding: Any = tool_config.get("semantic_cache_embedding")
+        if embedding is None:
+            embedding = SpannerGraphQueryQATool.get_embedding_service(
+                {
+                    "embedding_model": tool_config.get("semantic_cache_embedding_model")
+                    or tool_config.get("embedding_model")
+                }
+            )
+        if embedding is None:
+            logger.warning("No embedding found, semantic cache disabled")
+            return None
+        return SemanticCache(
+            (
+                embedding.embed_query
+                if hasattr(embedding, "embed_query")
+                else lambda text: embedding([text])[0]
+            ),
+            max_size=max_size,
+            threshold=tool_config.get("semantic_cache_threshold", 0.95),
+            ttl=tool_config.get("gql_cache_ttl"),
+        )
+
     @staticmethod
     def get_example_store(
         tool_config: dict[str, Any] = {},
@@ -117,39 +243,74 @@ class SpannerGraphQueryQATool(BaseTool):
                     TableColumn(name="example", type="JSON"),
                 ],
             )
+            embedding_service = SpannerGraphQueryQATool.get_embedding_service(
+                tool_config
+            )
+            if embedding_service is None:
+                raise ValueError("An embedding_model is required by example_table")
             return SpannerVectorStore(
                 instance_id,
                 database_id,
                 table_name=spanner_example_table,
                 content_column="user_query",
-                embedding_service=SpannerGraphQueryQATool.get_embedding_service(
-                    tool_config
-                ),
+                embedding_service=embedding_service,
                 metadata_json_column="example",
                 client=client,
             )
         return None
 
+    @staticmethod
+    def get_example_selector(
+        example_store: Optional[VectorStore],
+        tool_config: dict[str, Any] = {},
+    ) -> Optional[BaseExampleSelector]:
+        if example_store is None:
+            return None
+        from langchain_core.example_selectors import MaxMarginalRelevanceExampleSelector
+
+        k = tool_config.get("num_gql_examples", 3)
+        example_selector = MaxMarginalRelevanceExampleSelector(
+            vectorstore=example_store, k=k
+        )
+        max_rows = tool_config.get("example_mirror_max_rows", 0)
+        if not max_rows or max_rows <= 0:
+            return example_selector
+        embedding = SpannerGraphQueryQATool.get_embedding_service(tool_config)
+        if embedding is None:
+            logger.warning("No embedding found, local GQL examples disabled")
+            return example_selector
+        # Selects examples from memory instead of a Spanner vector query per
+        # question, using the vector store while the mirror is unavailable.
+        mirror = LocalExampleMirror(
+            tool_config["database"],
+            tool_config["example_table"],
+            max_rows=max_rows,
+            refresh_interval=tool_config.get("example_mirror_refresh_interval"),
+            snapshot_options=get_snapshot_options(
+                tool_config.get("exact_staleness"), tool_config.get("max_staleness")
+            ),
+        )
+        mirror.load()
+        return LocalExampleSelector(mirror, embedding, k=k, fallback=example_selector)
+
     @staticmethod
     def get_qa_chain(
-        graph_store: GraphStore,
+        graph_store: SpannerGraphStore,
         llm: BaseLanguageModel,
         example_store: Optional[VectorStore],
         tool_config: dict[str, Any],
+        example_selector: Optional[BaseExampleSelector] = None,
     ):
         gql_prompt = None
         gql_fix_prompt = None
         if example_store is not None:
-            from langchain_core.example_selectors import (
-                MaxMarginalRelevanceExampleSelector,
-            )
             from langchain_core.prompts import FewShotPromptTemplate
             from langchain_core.prompts.prompt import PromptTemplate
 
-            example_selector = MaxMarginalRelevanceExampleSelector(
-                vectorstore=example_store,
-                k=tool_config.get("num_gql_examples", 3),
-            )
+            if example_selector is None:
+                example_selector = SpannerGraphQueryQATool.get_example_selector(
+                    example_store, tool_config
+                )
 
             gql_generation_instruction_prompt = DEFAULT_GQL_TEMPLATE_PART1
             gql_fix_instruction_prompt = DEFAULT_GQL_FIX_TEMPLATE_PART2
@@ -196,17 +357,109 @@ class SpannerGraphQueryQATool(BaseTool):
     ) -> Any:
         try:
             user_query = args["user_query"]
-            chain_input = {self.qa_chain.input_key: user_query}
-            logger.debug(f"Input query: `{user_query}`")
-            results = await self.qa_chain.ainvoke(chain_input)
-            if self.qa_chain.output_key != "result":
-                results["result"] = results[self.qa_chain.output_key]
-                del results[self.qa_chain.output_key]
-            return results
+            # Identical questions asked concurrently share one invocation.
+            return await self.single_flight.do(
+                " ".join(user_query.split()),
+                functools.partial(self._invoke_qa_chain, user_query),
+            )
         except Exception as e:
             logger.error(f"Failed QA chain invocation: {e}")
             return {"result": f"I don't know due to the following error: `{e}`"}
 
+    async def _invoke_qa_chain(self, user_query: str) -> dict[str, Any]:
+        logger.debug(f"Input query: `{user_query}`")
+        cache_key = (self.schema_fingerprint, _normalize_user_query(user_query))
+        gql_cache = self.gql_cache
+        gql = gql_cache.get(cache_key) if gql_cache is not None else None
+        if gql_cache is not None and gql is not None:
+            cached_results = await self._answer_with_gql(user_query, gql)
+            if cached_results is not None:
+                return cached_results
+            gql_cache.pop(cache_key)
+
+        semantic_cache = self.semantic_cache
+        embedding = None
+        if semantic_cache is not None:
+            normalized_query = cache_key[1]
+            try:
+                embedding = await asyncio.to_thread(
+                    semantic_cache.embed, normalized_query
+                )
+            except Exception as e:
+                logger.warning(f"Failed to embed `{normalized_query}`: {e}")
+            match = (
+                semantic_cache.get(normalized_query, embedding)
+                if embedding is not None
+                else None
+            )
+            if match is not None and _is_gql_applicable(match[1], user_query, match[0]):
+                logger.debug(f"Reusing the gql of a similar question: `{match[0]}`")
+                cached_results = await self._answer_with_gql(user_query, match[1])
+                if cached_results is not None:
+                    return cached_results
+                semantic_cache.pop(match[0])
+
+        chain_input = {self.qa_chain.input_key: user_query}
+        results = await self.qa_chain.ainvoke(chain_input)
+        if self.qa_chain.output_key != "result":
+            results["result"] = results[self.qa_chain.output_key]
+            del results[self.qa_chain.output_key]
+        if gql_cache is not None or semantic_cache is not None:
+            gql = _get_final_gql(results.get("intermediate_steps"))
+            if gql is not None and gql_cache is not None:
+                gql_cache.put(cache_key, gql)
+            if gql is not None and semantic_cache is not None and embedding is not None:
+                semantic_cache.put(cache_key[1], gql, embedding)
+            if not self.return_intermediate_steps:
+                results.pop("intermediate_steps", None)
+        return results
+
+    async def _answer_with_gql(
+        self, user_query: str, gql: str
+    ) -> Optional[dict[str, Any]]:
+        """Answers with a cached GQL, or returns None if the GQL fails."""
+        logger.debug(f"Reusing cached gql: `{gql}`")
+        try:
+            context = (await asyncio.to_thread(self.graph_store.query, gql))[
+                : self.qa_chain.top_k
+            ]
+        except Exception as e:
+            logger.warning(f"Cached gql failed, regenerating: {e}")
+            return None
+        result = await self.qa_chain.qa_chain.ainvoke(
+            {
+                "question": user_query,
+                "graph_schema": self.graph_store.get_schema,
+                "graph_query": gql,
+                "context": str(context),
+            }
+        )
+        results: dict[str, Any] = {"result": result}
+        if self.return_intermediate_steps:
+            results["intermediate_steps"] = [
+                {"generated_query": gql},
+                {"context": context},
+            ]
+        return results
+
+    def stats(self) -> dict[str, int]:
+        """Returns the counters of invocations coalesced by `run_async`.
+
+        Also returns the `gql_cache_*`, `semantic_cache_*` and
+        `result_cache_*` counters, e.g. hits and misses, of the enabled caches.
+        """
+        stats = self.single_flight.stats()
+        for prefix, cache in [
+            ("gql_cache", self.gql_cache),
+            ("semantic_cache", self.semantic_cache),
+            ("result_cache", self.result_cache),
+        ]:
+            if cache is not None:
+                stats.update(
+                    {f"{prefix}_{name}": value for name, value in cache.stats().items()}
+                )
+        return stats
+
     def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
         return types.FunctionDeclaration(
             parameters=types.Schema(
@@ -236,13 +489,11 @@ class SpannerGraphQueryQATool(BaseTool):
         if self.example_store is None:
             raise ValueError("No example store configured")
 
-        self.example_store.add_texts(
-            texts=[user_query],
-            metadatas=[
-                {
-                    "question": user_query,
-                    "gql": gql.replace("{", "{{").replace("}", "}}"),
-                    "schema": schema,
-                }
-            ],
-        )
+        example = {
+            "question": user_query,
+            "gql": gql.replace("{", "{{").replace("}", "}}"),
+            "schema": schema,
+        }
+        self.example_store.add_texts(texts=[user_query], metadatas=[example])
+        if isinstance(self.example_selector, LocalExampleSelector):
+            self.example_selector.add_mirrored_example(user_query, example)
@@ -0,0 +1,96 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+from typing import Any, Dict, List, Optional
+
+from google.cloud.spanner_v1.database import Database
+from langchain_google_spanner.graph_store import SpannerImpl, TypeUtility
+
+from graph_agents.utils.cache import TTLCache
+
+
+def estimate_size(value: Any) -> int:
+    """Estimates the memory of a query result in bytes."""
+    size, values = 0, [value]
+    while values:
+        value = values.pop()
+        size += sys.getsizeof(value)
+        if isinstance(value, dict):
+            values.extend(value.keys())
+            values.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            values.extend(value)
+    return size
+
+
+class StaleReadSpannerImpl(SpannerImpl):
+    """A `SpannerImpl` whose queries read with the given snapshot options.
+
+    E.g. `{"max_staleness": timedelta(seconds=10)}` lets queries be served by
+    the nearest replica. Queries are strong reads if no option is given.
+
+    When a `result_cache` is given, results are cached by the query and its
+    params. Its TTL should not exceed the staleness tolerated by the reads.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        snapshot_options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        result_cache: Optional[TTLCache] = None,
+    ):
+        super().__init__(
+            database._instance.instance_id,
+            database.database_id,
+            client=database._instance._client,
+            timeout=timeout,
+        )
+        self.database = database
+        self.snapshot_options = snapshot_options or {}
+        self.result_cache = result_cache
+
+    def query(self, query: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        if self.result_cache is None:
+            return self._query(query, params)
+        key = (
+            query,
+            tuple(
+                sorted((name, repr(value)) for name, value in (params or {}).items())
+            ),
+        )
+        rows = self.result_cache.get(key)
+        if rows is None:
+            rows = self._query(query, params)
+            self.result_cache.put(key, rows)
+        # Callers may modify the rows.
+        return [dict(row) for row in rows]
+
+    def _query(self, query: str, params: Optional[dict] = None) -> List[Dict[str, Any]]:
+        params = params or {}
+        param_types = {k: TypeUtility.value_to_param_type(v) for k, v in params.items()}
+        with self.database.snapshot(**self.snapshot_options) as snapshot:
+            rows = snapshot.execute_sql(
+                query, params=params, param_types=param_types, timeout=self.timeout
+            )
+            return [
+                {
+                    column: value
+                    for column, value in zip(
+                        [column.name for column in rows.fields], row
+                    )
+                }
+                for row in rows
+            ]
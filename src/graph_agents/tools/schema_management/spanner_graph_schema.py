@@ -15,14 +15,19 @@
 import functools
 import json
 
+from graph_agents.utils.cache import TTLCache
 from graph_agents.utils.information_schema import InformationSchema, PropertyGraph
 
 
 def build_schema_inspection_tools(
     info_schema: InformationSchema,
     property_graph: PropertyGraph,
+    max_memoized_results: int = 1024,
 ):
 
+    # (function name, args) => (graph lookups, serialized result)
+    memoized_results = TTLCache(max_size=max_memoized_results)
+
     def to_json(f):
 
         @functools.wraps(f)
@@ -32,16 +37,41 @@ def build_schema_inspection_tools(
 
         return wrapper
 
+    def memoized(f):
+        """Memoizes results that only depend on the property graph."""
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            key = (f.__name__, args, tuple(sorted(kwargs.items())))
+            try:
+                entry = memoized_results.get(key)
+            except TypeError:
+                # Unhashable arguments.
+                return f(*args, **kwargs)
+            # Lookups are rebuilt when the graph changes, which invalidates
+            # all results memoized before the change.
+            lookups = property_graph.lookups
+            if entry is not None and entry[0] is lookups:
+                return entry[1]
+            result = f(*args, **kwargs)
+            memoized_results.put(key, (lookups, result))
+            return result
+
+        return wrapper
+
+    @memoized
     @to_json
     def list_node_types():
         """List all node types in the knowledge graph."""
         return property_graph.get_node_labels()
 
+    @memoized
     @to_json
     def list_edge_types():
         """List all edge types in the knowledge graph."""
         return property_graph.get_edge_labels()
 
+    @memoized
     @to_json
     def list_triplet_types():
         """List all tripet types in the knowledge graph.
@@ -50,6 +80,7 @@ def build_schema_inspection_tools(
         """
         return property_graph.get_triplet_labels()
 
+    @memoized
     @to_json
     def list_node_type_details(node_type: str):
         """Show detailed schema about a node type.
@@ -58,6 +89,7 @@ def build_schema_inspection_tools(
         """
         return property_graph.get_node_details(node_type)
 
+    @memoized
     @to_json
     def list_edge_type_details(edge_type: str):
         """Show detailed schema about an edge type.
@@ -66,6 +98,7 @@ def build_schema_inspection_tools(
         """
         return property_graph.get_edge_details(edge_type)
 
+    @memoized
     @to_json
     def list_triplet_type_details(
         src_node_type: str, edge_type: str, dst_node_type: str
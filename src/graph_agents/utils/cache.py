@@ -0,0 +1,111 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache(object):
+    """A thread-safe LRU cache whose entries expire after `ttl` seconds.
+
+    Once `max_size` entries are cached, the least recently used entry is
+    evicted. Entries never expire when `ttl` is None.
+
+    When a `weigher` is given, e.g. the size of a value in bytes, least
+    recently used entries are also evicted until the total weight is at most
+    `max_weight`, and values heavier than `max_weight` are not cached.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        weigher: Optional[Callable[[Any], int]] = None,
+        max_weight: Optional[int] = None,
+    ):
+        self.max_size = max(max_size, 1)
+        self.ttl = ttl
+        self.weigher = weigher
+        self.max_weight = max_weight
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.weight = 0
+        # key => (created at, value, weight)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_expired(entry):
+                del self._entries[key]
+                self.weight -= entry[2]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        weight = self.weigher(value) if self.weigher is not None else 0
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.weight -= entry[2]
+            if self.max_weight is not None and weight > self.max_weight:
+                return
+            self._entries[key] = (time.monotonic(), value, weight)
+            self.weight += weight
+            while len(self._entries) > self.max_size or (
+                self.max_weight is not None and self.weight > self.max_weight
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self.weight -= evicted[2]
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.weight -= entry[2]
+            return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.weight = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+            if self.weigher is not None:
+                stats["weight"] = self.weight
+            return stats
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _is_expired(self, entry: Tuple[float, Any, int]) -> bool:
+        return self.ttl is not None and time.monotonic() - entry[0] > self.ttl
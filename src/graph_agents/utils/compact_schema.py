@@ -0,0 +1,331 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+from pydantic_core import core_schema
+
+from graph_agents.utils.database_context import (
+    GraphElement,
+    Label,
+    NodeReference,
+    PropertyDeclaration,
+    PropertyDefinition,
+    PropertyGraph,
+    PropertyGraphLookups,
+    PropertyGraphMixin,
+)
+
+
+def _intern(name: str) -> str:
+    return sys.intern(name)
+
+
+def _freeze(mapping: Dict[str, Any]) -> Mapping[str, Any]:
+    return MappingProxyType(mapping)
+
+
+class _CompactObject(object):
+    """An immutable object whose state is stored in `__slots__`."""
+
+    __slots__: Tuple[str, ...] = ()
+
+    def __init__(self, *values: Any):
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other: Any) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__
+            if not name.startswith("_")
+        )
+
+    def __repr__(self) -> str:
+        return "%s(%s)" % (
+            type(self).__name__,
+            ", ".join(
+                f"{name}={getattr(self, name)!r}"
+                for name in self.__slots__
+                if not name.startswith("_")
+            ),
+        )
+
+
+class CompactPropertyDeclaration(_CompactObject):
+    __slots__ = ("name", "type")
+    name: str
+    type: str
+
+
+class CompactLabel(_CompactObject):
+    __slots__ = ("name", "property_declaration_names")
+    name: str
+    property_declaration_names: FrozenSet[str]
+
+
+class CompactPropertyDefinition(_CompactObject):
+    __slots__ = ("name", "expr")
+    name: str
+    expr: str
+
+
+class CompactNodeReference(_CompactObject):
+    __slots__ = ("node_name",)
+    node_name: str
+
+
+class CompactGraphElement(_CompactObject):
+    __slots__ = (
+        "name",
+        "table_name",
+        "key_column_names",
+        "label_names",
+        "property_definitions",
+        "source_node_reference",
+        "dest_node_reference",
+    )
+    name: str
+    table_name: str
+    key_column_names: Tuple[str, ...]
+    label_names: Tuple[str, ...]
+    property_definitions: Mapping[str, CompactPropertyDefinition]
+    source_node_reference: Optional[CompactNodeReference]
+    dest_node_reference: Optional[CompactNodeReference]
+
+
+class CompactPropertyGraph(PropertyGraphMixin, _CompactObject):
+    """A compact, immutable alternative to `PropertyGraph`.
+
+    Names are interned so that labels and properties shared by many elements
+    are stored once, and every object uses `__slots__` instead of a pydantic
+    model. It answers the same schema queries as `PropertyGraph`; use
+    `to_property_graph` when a pydantic model is needed.
+    """
+
+    __slots__ = (
+        "name",
+        "nodes",
+        "edges",
+        "labels",
+        "property_declarations",
+        "_lookups_cache",
+    )
+    name: str
+    nodes: Mapping[str, CompactGraphElement]
+    edges: Mapping[str, CompactGraphElement]
+    labels: Mapping[str, CompactLabel]
+    property_declarations: Mapping[str, CompactPropertyDeclaration]
+    _lookups_cache: Optional[PropertyGraphLookups]
+
+    def __init__(
+        self,
+        name: str,
+        nodes: Mapping[str, CompactGraphElement],
+        edges: Mapping[str, CompactGraphElement],
+        labels: Mapping[str, CompactLabel],
+        property_declarations: Mapping[str, CompactPropertyDeclaration],
+    ):
+        super().__init__(name, nodes, edges, labels, property_declarations, None)
+
+    @property
+    def _lookups(self) -> PropertyGraphLookups:
+        lookups = self._lookups_cache
+        if lookups is None:
+            lookups = PropertyGraphLookups(
+                self.nodes, self.edges, self.labels  # type: ignore[arg-type]
+            )
+            object.__setattr__(self, "_lookups_cache", lookups)
+        return lookups
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any):
+        # Allows pydantic models (e.g. schema snapshots) to hold a compact graph,
+        # which is serialized as a regular `PropertyGraph`.
+        return core_schema.is_instance_schema(
+            cls,
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda graph: graph.to_property_graph().model_dump(),
+            ),
+        )
+
+    @staticmethod
+    def from_metadata_json(graph_json: Dict[str, Any]) -> "CompactPropertyGraph":
+        """Builds from `INFORMATION_SCHEMA.PROPERTY_GRAPHS` metadata json."""
+        return CompactPropertyGraph(
+            _intern(graph_json["name"]),
+            _freeze(
+                {
+                    _intern(node["name"].casefold()): _build_element(node)
+                    for node in graph_json.get("nodeTables", [])
+                }
+            ),
+            _freeze(
+                {
+                    _intern(edge["name"].casefold()): _build_element(edge)
+                    for edge in graph_json.get("edgeTables", [])
+                }
+            ),
+            _freeze(
+                {
+                    _intern(label["name"].casefold()): CompactLabel(
+                        _intern(label["name"]),
+                        frozenset(
+                            _intern(name.casefold())
+                            for name in label["propertyDeclarationNames"]
+                        ),
+                    )
+                    for label in graph_json.get("labels", [])
+                }
+            ),
+            _freeze(
+                {
+                    _intern(decl["name"].casefold()): CompactPropertyDeclaration(
+                        _intern(decl["name"]), _intern(decl["type"])
+                    )
+                    for decl in graph_json.get("propertyDeclarations", [])
+                }
+            ),
+        )
+
+    @staticmethod
+    def from_property_graph(graph: PropertyGraph) -> "CompactPropertyGraph":
+        def build_element(element: GraphElement) -> CompactGraphElement:
+            return CompactGraphElement(
+                _intern(element.name),
+                _intern(element.table_name),
+                tuple(_intern(name) for name in element.key_column_names),
+                tuple(_intern(name) for name in element.label_names),
+                _freeze(
+                    {
+                        _intern(pname): CompactPropertyDefinition(
+                            _intern(pdef.name), _intern(pdef.expr)
+                        )
+                        for pname, pdef in element.property_definitions.items()
+                    }
+                ),
+                _build_node_reference(element.source_node_reference),
+                _build_node_reference(element.dest_node_reference),
+            )
+
+        return CompactPropertyGraph(
+            _intern(graph.name),
+            _freeze(
+                {_intern(k): build_element(node) for k, node in graph.nodes.items()}
+            ),
+            _freeze(
+                {_intern(k): build_element(edge) for k, edge in graph.edges.items()}
+            ),
+            _freeze(
+                {
+                    _intern(k): CompactLabel(
+                        _intern(label.name),
+                        frozenset(
+                            _intern(name) for name in label.property_declaration_names
+                        ),
+                    )
+                    for k, label in graph.labels.items()
+                }
+            ),
+            _freeze(
+                {
+                    _intern(k): CompactPropertyDeclaration(
+                        _intern(decl.name), _intern(decl.type)
+                    )
+                    for k, decl in graph.property_declarations.items()
+                }
+            ),
+        )
+
+    def to_property_graph(self) -> PropertyGraph:
+        def to_element(element: CompactGraphElement) -> GraphElement:
+            return GraphElement(
+                name=element.name,
+                table_name=element.table_name,
+                key_column_names=list(element.key_column_names),
+                label_names=list(element.label_names),
+                property_definitions={
+                    pname: PropertyDefinition(name=pdef.name, expr=pdef.expr)
+                    for pname, pdef in element.property_definitions.items()
+                },
+                source_node_reference=(
+                    NodeReference(node_name=element.source_node_reference.node_name)
+                    if element.source_node_reference is not None
+                    else None
+                ),
+                dest_node_reference=(
+                    NodeReference(node_name=element.dest_node_reference.node_name)
+                    if element.dest_node_reference is not None
+                    else None
+                ),
+            )
+
+        return PropertyGraph(
+            name=self.name,
+            nodes={k: to_element(node) for k, node in self.nodes.items()},
+            edges={k: to_element(edge) for k, edge in self.edges.items()},
+            labels={
+                k: Label(
+                    name=label.name,
+                    property_declaration_names=set(label.property_declaration_names),
+                )
+                for k, label in self.labels.items()
+            },
+            property_declarations={
+                k: PropertyDeclaration(name=decl.name, type=decl.type)
+                for k, decl in self.property_declarations.items()
+            },
+        )
+
+
+def _build_node_reference(
+    reference: Optional[NodeReference],
+) -> Optional[CompactNodeReference]:
+    if reference is None:
+        return None
+    return CompactNodeReference(_intern(reference.node_name))
+
+
+def _build_element(element_json: Dict[str, Any]) -> CompactGraphElement:
+    source, dest = (
+        element_json.get("sourceNodeTable"),
+        element_json.get("destinationNodeTable"),
+    )
+    return CompactGraphElement(
+        _intern(element_json["name"]),
+        _intern(element_json["baseTableName"]),
+        tuple(_intern(name) for name in element_json["keyColumns"]),
+        tuple(_intern(name.casefold()) for name in element_json["labelNames"]),
+        _freeze(
+            {
+                _intern(pdef["propertyDeclarationName"].casefold()): (
+                    CompactPropertyDefinition(
+                        _intern(pdef["propertyDeclarationName"]),
+                        _intern(pdef["valueExpressionSql"]),
+                    )
+                )
+                for pdef in element_json.get("propertyDefinitions", [])
+            }
+        ),
+        CompactNodeReference(_intern(source["nodeTableName"])) if source else None,
+        CompactNodeReference(_intern(dest["nodeTableName"])) if dest else None,
+    )
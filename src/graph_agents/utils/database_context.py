@@ -13,7 +13,18 @@
 # limitations under the License.
 
 import itertools
-from typing import Dict, List, Optional, Set
+from functools import cached_property
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 from pydantic import BaseModel
 
@@ -80,114 +91,182 @@ class GraphElement(BaseModel):
     dest_node_reference: Optional[NodeReference] = None
 
 
-class PropertyGraph(BaseModel):
-    name: str
-    nodes: Dict[str, GraphElement]
-    edges: Dict[str, GraphElement]
-    labels: Dict[str, Label]
-    property_declarations: Dict[str, PropertyDeclaration]
+def _get_node_label_names(
+    nodes: Mapping[str, GraphElement], reference: Optional[NodeReference]
+) -> Sequence[str]:
+    # Edges always reference their source and destination nodes.
+    assert reference is not None
+    return nodes[reference.node_name.casefold()].label_names
+
+
+class PropertyGraphLookups(object):
+    """Lookup indexes precomputed from a property graph."""
+
+    def __init__(
+        self,
+        nodes: Mapping[str, GraphElement],
+        edges: Mapping[str, GraphElement],
+        labels: Mapping[str, Label],
+    ):
+        # Dicts are used as insertion-ordered sets to keep outputs stable.
+        self.node_labels = list(
+            dict.fromkeys(
+                label for node in nodes.values() for label in node.label_names
+            )
+        )
+        self.edge_labels = list(
+            dict.fromkeys(
+                label for edge in edges.values() for label in edge.label_names
+            )
+        )
+        self.triplets = list(
+            dict.fromkeys(
+                (src_node_label, edge_label, dst_node_label)
+                for edge in edges.values()
+                for edge_label in edge.label_names
+                for src_node_label in _get_node_label_names(
+                    nodes, edge.source_node_reference
+                )
+                for dst_node_label in _get_node_label_names(
+                    nodes, edge.dest_node_reference
+                )
+            )
+        )
+        self.triplet_set = set(self.triplets)
+        self.triplets_by_edge_label: Dict[str, List[Tuple[str, str, str]]] = {}
+        for triplet in self.triplets:
+            self.triplets_by_edge_label.setdefault(triplet[1], []).append(triplet)
+
+        self.elements_by_label: Dict[str, List[GraphElement]] = {}
+        self.elements_by_table: Dict[str, List[GraphElement]] = {}
+        self.label_and_properties_by_table: Dict[
+            str, List[Tuple[str, Dict[str, str]]]
+        ] = {}
+        for element in itertools.chain(nodes.values(), edges.values()):
+            table_name = element.table_name.casefold()
+            self.elements_by_table.setdefault(table_name, []).append(element)
+            for lname in element.label_names:
+                self.elements_by_label.setdefault(lname, []).append(element)
+                self.label_and_properties_by_table.setdefault(table_name, []).append(
+                    (
+                        lname,
+                        {
+                            pdef.expr.casefold(): pdef.name
+                            for pdef in element.property_definitions.values()
+                            if pdef.name.casefold()
+                            in labels[lname].property_declaration_names
+                        },
+                    )
+                )
+
+
+class PropertyGraphMixin(object):
+    """Schema queries shared by all property graph representations.
+
+    Subclasses provide `labels`, `property_declarations` and `_lookups`.
+    """
+
+    __slots__ = ()
+    if TYPE_CHECKING:
+        # Not annotated at runtime, so that pydantic keeps the field order.
+        labels: Mapping[str, Any]
+        property_declarations: Mapping[str, Any]
+
+    @property
+    def _lookups(self) -> PropertyGraphLookups:
+        raise NotImplementedError()
+
+    @property
+    def lookups(self) -> PropertyGraphLookups:
+        """Precomputed lookups, rebuilt as a new object when the graph changes."""
+        return self._lookups
+
+    def _get_properties(self, label: str):
+        # Sorted so that outputs are identical across processes.
+        return [
+            {
+                "name": pname,
+                "type": self.property_declarations[pname].type,
+            }
+            for pname in sorted(self.labels[label].property_declaration_names)
+        ]
 
     def get_node_details(self, label: str):
         label = label.casefold()
-        return {
-            "Properties": [
-                {
-                    "name": pname,
-                    "type": self.property_declarations[pname].type,
-                }
-                for pname in self.labels[label].property_declaration_names
-            ]
-        }
+        return {"Properties": self._get_properties(label)}
 
     def get_edge_details(self, label: str):
         label = label.casefold()
-        details = []
-        triplet_labels = self.get_triplet_labels()
-        for src_node_label, edge_label, dst_node_label in triplet_labels:
-            if label == edge_label.casefold():
-                details.append(
-                    {
-                        "Source node type": src_node_label,
-                        "Target node type": dst_node_label,
-                        "Properties": [
-                            {
-                                "name": pname,
-                                "type": self.property_declarations[pname].type,
-                            }
-                            for pname in self.labels[label].property_declaration_names
-                        ],
-                    }
-                )
-        return details
+        triplets = self._lookups.triplets_by_edge_label.get(label, [])
+        return [
+            {
+                "Source node type": src_node_label,
+                "Target node type": dst_node_label,
+                "Properties": self._get_properties(label),
+            }
+            for src_node_label, _, dst_node_label in triplets
+        ]
 
     def get_triplet_details(
         self, src_node_label: str, edge_label: str, dst_node_label: str
     ):
-        src_node_label = src_node_label.casefold()
-        edge_label = edge_label.casefold()
-        dst_node_label = dst_node_label.casefold()
-        details = []
-        triplet_labels = self.get_triplet_labels()
-        for snl, el, dnl in triplet_labels:
-            if (
-                snl == src_node_label.casefold()
-                and el == edge_label.casefold()
-                and dnl == dst_node_label.casefold()
-            ):
-                details.append(
-                    {
-                        "Source node type": src_node_label,
-                        "Edge type": edge_label,
-                        "Target node type": dst_node_label,
-                        "Properties": [
-                            {
-                                "name": pname,
-                                "type": self.property_declarations[pname].type,
-                            }
-                            for pname in self.labels[el].property_declaration_names
-                        ],
-                    }
-                )
-        return details
+        triplet = (
+            src_node_label.casefold(),
+            edge_label.casefold(),
+            dst_node_label.casefold(),
+        )
+        if triplet not in self._lookups.triplet_set:
+            return []
+        return [
+            {
+                "Source node type": triplet[0],
+                "Edge type": triplet[1],
+                "Target node type": triplet[2],
+                "Properties": self._get_properties(triplet[1]),
+            }
+        ]
 
     def get_node_labels(self):
-        return list(
-            {label for node in self.nodes.values() for label in node.label_names}
-        )
+        return list(self._lookups.node_labels)
 
     def get_edge_labels(self):
-        return list(
-            {label for edge in self.edges.values() for label in edge.label_names}
-        )
+        return list(self._lookups.edge_labels)
 
     def get_triplet_labels(self):
-        node_labels = {name: node.label_names for name, node in self.nodes.items()}
+        return list(self._lookups.triplets)
+
+    def get_label_elements(self, label: str) -> List[GraphElement]:
+        return list(self._lookups.elements_by_label.get(label.casefold(), []))
+
+    def get_table_elements(self, table_name: str) -> List[GraphElement]:
+        return list(self._lookups.elements_by_table.get(table_name.casefold(), []))
+
+    def get_label_and_properties(self, table_name: str):
         return list(
-            {
-                (src_node_label, edge_label, dst_node_label)
-                for edge in self.edges.values()
-                for edge_label in edge.label_names
-                for src_node_label in node_labels[
-                    edge.source_node_reference.node_name.casefold()
-                ]
-                for dst_node_label in node_labels[
-                    edge.dest_node_reference.node_name.casefold()
-                ]
-            }
+            self._lookups.label_and_properties_by_table.get(table_name.casefold(), [])
         )
 
-    def get_label_and_properties(self, table_name: str):
-        return [
-            (
-                lname,
-                {
-                    pdef.expr.casefold(): pdef.name
-                    for pdef in element.property_definitions.values()
-                    if pdef.name.casefold()
-                    in self.labels[lname].property_declaration_names
-                },
-            )
-            for element in itertools.chain(self.nodes.values(), self.edges.values())
-            if element.table_name.casefold() == table_name.casefold()
-            for lname in element.label_names
-        ]
+
+class PropertyGraph(PropertyGraphMixin, BaseModel):
+    name: str
+    nodes: Dict[str, GraphElement]
+    edges: Dict[str, GraphElement]
+    labels: Dict[str, Label]
+    property_declarations: Dict[str, PropertyDeclaration]
+
+    @cached_property
+    def _lookups(self) -> PropertyGraphLookups:
+        return PropertyGraphLookups(self.nodes, self.edges, self.labels)
+
+    def invalidate_lookups(self):
+        """Drops the precomputed lookups.
+
+        Lookups are invalidated automatically when a field is reassigned, but
+        must be invalidated explicitly after mutating a field in place.
+        """
+        self.__dict__.pop("_lookups", None)
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        if name in type(self).model_fields:
+            self.invalidate_lookups()
@@ -58,9 +58,17 @@ class Dataset(object):
         templates.yaml
     """
 
-    def __init__(self, path, delimiter: str = ","):
+    def __init__(
+        self,
+        path,
+        delimiter: str = ",",
+        snapshot_options: Optional[Dict[str, Any]] = None,
+    ):
         self.path = path
         self.delimiter = delimiter
+        # Keyword arguments of `Database.snapshot` to read reference answers,
+        # the staleness of the evaluated agent if None.
+        self.snapshot_options = snapshot_options
         self._is_compressed = self.path.endswith(".tar.gz")
         self._temp_dir: Optional[str] = None
         self.parameter_providers: Dict[str, Callable[[], Tuple[Any, Any]]] = {}
@@ -225,6 +233,17 @@ class Dataset(object):
             with open(os.path.join(self.path, file_path), "r") as f:
                 return yaml.safe_load(f)
 
+    def get_snapshot_options(self, agent: BaseAgent) -> Dict[str, Any]:
+        """Returns the snapshot options to read the reference answers with.
+
+        Unless given, reference answers are read at the staleness of the
+        agent, e.g. `SpannerGraphQueryAgent.get_snapshot_options`.
+        """
+        if self.snapshot_options is not None:
+            return self.snapshot_options
+        get_snapshot_options = getattr(agent, "get_snapshot_options", None)
+        return get_snapshot_options() if callable(get_snapshot_options) else {}
+
     async def get_agent_answer(self, agent: BaseAgent, question: str) -> str:
         with AgentSession(agent, user_id="evalution") as session:
             event = await session.ainvoke(question)
@@ -239,12 +258,15 @@ class Dataset(object):
         answer_query_template: Optional[str],
         params: Dict[str, Any],
         param_types: Dict[str, Any],
+        snapshot_options: Optional[Dict[str, Any]] = None,
     ) -> Any:
         if not answer_query_template:
             return []
+        if snapshot_options is None:
+            snapshot_options = self.snapshot_options or {}
 
         def _query():
-            with database.snapshot() as snapshot:
+            with database.snapshot(**snapshot_options) as snapshot:
                 rows = snapshot.execute_sql(
                     answer_query_template,
                     params=params,
@@ -272,7 +294,11 @@ class Dataset(object):
         params, param_types = self.instantiate_parameters(question_templates[0])
         questions = [q.format_map(params) for q in question_templates]
         reference_answer = await self.get_answer(
-            database, answer_query_template, params, param_types
+            database,
+            answer_query_template,
+            params,
+            param_types,
+            snapshot_options=self.get_snapshot_options(agent),
         )
         for question in questions:
             result = {
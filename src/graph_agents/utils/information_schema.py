@@ -13,12 +13,19 @@
 # limitations under the License.
 
 import asyncio
+import contextlib
+import hashlib
+import json
 import logging
 import re
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple, Union, overload
 
+from google.cloud.spanner_v1 import param_types
 from google.cloud.spanner_v1.database import Database
+from google.cloud.spanner_v1.snapshot import Snapshot
 
+from graph_agents.utils.cache import TTLCache
+from graph_agents.utils.compact_schema import CompactPropertyGraph
 from graph_agents.utils.database_context import (
     Column,
     GraphElement,
@@ -32,43 +39,97 @@ from graph_agents.utils.database_context import (
     PropertyGraph,
     Table,
 )
+from graph_agents.utils.staleness import get_multi_use_snapshot_options
 
 logger = logging.getLogger("graph_agents." + __name__)
 
+_STRING_ARRAY = param_types.Array(param_types.STRING)
+
+# Maximum number of json properties sampled by a single UNION ALL query.
+_MAX_JSON_SCHEMA_SAMPLES_PER_QUERY = 64
+
 
 class InformationSchema(object):
 
     def __init__(
         self,
         database: Database,
+        json_schema_cache: Optional[TTLCache] = None,
+        snapshot: Optional[Snapshot] = None,
+        snapshot_options: Optional[Dict[str, Any]] = None,
     ):
         self.database = database
+        # Caches sampled json schemas keyed by (graph, label, property).
+        self.json_schema_cache = json_schema_cache
+        # When set, all queries are served by this multi-use snapshot.
+        self.snapshot = snapshot
+        # Keyword arguments of `Database.snapshot`, e.g. a staleness.
+        self.snapshot_options = snapshot_options or {}
+
+    @contextlib.contextmanager
+    def read_only_snapshot(self) -> Iterator["InformationSchema"]:
+        """Runs introspection within a single multi-use read-only snapshot.
+
+        Yields an InformationSchema bound to the snapshot, so that all queries
+        reuse one session and observe the schema at the same read timestamp.
+        """
+        with self.database.snapshot(
+            multi_use=True, **get_multi_use_snapshot_options(self.snapshot_options)
+        ) as snapshot:
+            # Begin the read-only transaction eagerly so that concurrent reads
+            # all share the same transaction.
+            snapshot.begin()
+            yield InformationSchema(
+                self.database,
+                json_schema_cache=self.json_schema_cache,
+                snapshot=snapshot,
+                snapshot_options=self.snapshot_options,
+            )
 
     def get_table(self, name: str) -> Optional[Table]:
-        results = self._query(self._get_table_query(name))
-        if len(results) == 0:
-            return None
-        table = results[0]
-        return Table(
-            name=table["name"],
-            key_columns=table["key_columns"],
-            columns=[Column(name=name, type=type) for (name, type) in table["columns"]],
-        )
+        return self.get_tables([name]).get(name)
+
+    def get_tables(self, names: List[str]) -> Dict[str, Table]:
+        """Fetches the tables with the given names in a single query.
+
+        Tables that are not found are absent from the returned mapping.
+        """
+        if not names:
+            return {}
+        return {
+            table["name"]: Table(
+                name=table["name"],
+                key_columns=table["key_columns"],
+                columns=[
+                    Column(name=name, type=type) for (name, type) in table["columns"]
+                ],
+            )
+            for table in self._query(
+                self._get_table_query(),
+                params={"table_names": sorted(set(names))},
+                param_types={"table_names": _STRING_ARRAY},
+            )
+        }
 
     def get_indexes(
         self,
         enabled_indexes: Optional[List[str]] = None,
         enabled_types: Optional[List[str]] = None,
     ) -> List[Index]:
+        params, types = self._get_index_filter_params(enabled_indexes, enabled_types)
+        index_configs = self._query(
+            self._get_index_query(), params=params, param_types=types
+        )
+        tables = self.get_tables(
+            [index_config["table_name"] for index_config in index_configs]
+        )
         indexes = []
-        for index_config in self._query(
-            self._get_index_query(enabled_indexes, enabled_types)
-        ):
+        for index_config in index_configs:
             columns = [
                 Column(name=name, type=type, expr=expr)
                 for (name, type, expr) in index_config["columns"]
             ]
-            table = self.get_table(index_config["table_name"])
+            table = tables.get(index_config["table_name"])
             del index_config["columns"]
             index = Index(
                 name=index_config["name"],
@@ -80,11 +141,66 @@ class InformationSchema(object):
             indexes.append(index)
         return indexes
 
-    def get_property_graph(self, name: str) -> Optional[PropertyGraph]:
-        results = self._query(self._get_property_graph_query(name))
+    def get_schema_fingerprint(
+        self,
+        graph_name: str,
+        enabled_indexes: Optional[List[str]] = None,
+        enabled_types: Optional[List[str]] = None,
+    ) -> Optional[str]:
+        """Computes a cheap fingerprint of the graph and index definitions.
+
+        The fingerprint changes whenever the property graph metadata, the set
+        of enabled indexes, their columns or the columns of their tables, e.g.
+        the source column of a tokenlist or an embedding, change. Returns None
+        if the graph does not exist.
+        """
+        params, types = self._get_index_filter_params(enabled_indexes, enabled_types)
+        results = self._query(
+            self._get_schema_fingerprint_query(),
+            params={"graph_name": graph_name, **params},
+            param_types={"graph_name": param_types.STRING, **types},
+        )
+        if len(results) == 0 or results[0]["property_graph_metadata_json"] is None:
+            return None
+        fingerprint = hashlib.sha256()
+        fingerprint.update(results[0]["property_graph_metadata_json"].encode())
+        for key in ("indexes", "index_columns", "columns"):
+            fingerprint.update(json.dumps(results[0][key]).encode())
+        return fingerprint.hexdigest()
+
+    @overload
+    def get_property_graph(
+        self, name: str, compact: Literal[False] = False
+    ) -> Optional[PropertyGraph]: ...
+
+    @overload
+    def get_property_graph(
+        self, name: str, compact: Literal[True]
+    ) -> Optional[CompactPropertyGraph]: ...
+
+    @overload
+    def get_property_graph(
+        self, name: str, compact: bool
+    ) -> Optional[Union[PropertyGraph, CompactPropertyGraph]]: ...
+
+    def get_property_graph(
+        self, name: str, compact: bool = False
+    ) -> Optional[Union[PropertyGraph, CompactPropertyGraph]]:
+        """Introspects the property graph with the given name.
+
+        When `compact` is set, returns a `CompactPropertyGraph` which is built
+        directly from the graph metadata without any pydantic models.
+        """
+        results = self._query(
+            self._get_property_graph_query(),
+            params={"graph_name": name},
+            param_types={"graph_name": param_types.STRING},
+        )
         if len(results) == 0:
             return None
         graph_json = results[0]["property_graph_metadata_json"]
+        if compact:
+            return CompactPropertyGraph.from_metadata_json(graph_json)
 
         property_declarations = {
             decl["name"].casefold(): PropertyDeclaration(
@@ -149,15 +265,66 @@ class InformationSchema(object):
             property_declarations=property_declarations,
         )
 
-    def _get_property_graph_query(self, graph_name):
-        return f"""
+    def _get_property_graph_query(self):
+        return """
     SELECT property_graph_metadata_json
     FROM INFORMATION_SCHEMA.PROPERTY_GRAPHS
-    WHERE property_graph_name = '{graph_name}'
+    WHERE property_graph_name = @graph_name
+    """
+
+    def _get_schema_fingerprint_query(self):
+        return """
+    SELECT (
+             SELECT TO_JSON_STRING(property_graph_metadata_json)
+             FROM INFORMATION_SCHEMA.PROPERTY_GRAPHS
+             WHERE property_graph_name = @graph_name
+           ) AS property_graph_metadata_json,
+           ARRAY(
+             SELECT CONCAT(index.TABLE_NAME, '.', index.INDEX_NAME, ':',
+                           index.INDEX_TYPE, ':', IFNULL(index.FILTER, ''), ':',
+                           IFNULL(index.SEARCH_PARTITION_BY, ''), ':',
+                           IFNULL(index.SEARCH_ORDER_BY, ''))
+             FROM INFORMATION_SCHEMA.INDEXES AS index
+             WHERE (@enabled_types IS NULL
+                    OR index.index_type IN UNNEST(@enabled_types))
+               AND (@enabled_indexes IS NULL
+                    OR index.index_name IN UNNEST(@enabled_indexes))
+             ORDER BY index.TABLE_NAME, index.INDEX_NAME
+           ) AS indexes,
+           ARRAY(
+             SELECT CONCAT(index_column.TABLE_NAME, '.',
+                           index_column.INDEX_NAME, '.',
+                           index_column.COLUMN_NAME, ':',
+                           IFNULL(index_column.SPANNER_TYPE, ''))
+             FROM INFORMATION_SCHEMA.INDEX_COLUMNS AS index_column
+             JOIN INFORMATION_SCHEMA.INDEXES AS index
+               ON index.TABLE_NAME = index_column.TABLE_NAME
+              AND index.INDEX_NAME = index_column.INDEX_NAME
+             WHERE (@enabled_types IS NULL
+                    OR index.index_type IN UNNEST(@enabled_types))
+               AND (@enabled_indexes IS NULL
+                    OR index.index_name IN UNNEST(@enabled_indexes))
+             ORDER BY index_column.TABLE_NAME, index_column.INDEX_NAME,
+                      index_column.ORDINAL_POSITION
+           ) AS index_columns,
+           ARRAY(
+             SELECT CONCAT(column.TABLE_NAME, '.', column.COLUMN_NAME, ':',
+                           IFNULL(column.SPANNER_TYPE, ''), ':',
+                           IFNULL(column.GENERATION_EXPRESSION, ''))
+             FROM INFORMATION_SCHEMA.COLUMNS AS column
+             WHERE column.TABLE_NAME IN (
+                     SELECT index.TABLE_NAME
+                     FROM INFORMATION_SCHEMA.INDEXES AS index
+                     WHERE (@enabled_types IS NULL
+                            OR index.index_type IN UNNEST(@enabled_types))
+                       AND (@enabled_indexes IS NULL
+                            OR index.index_name IN UNNEST(@enabled_indexes)))
+             ORDER BY column.TABLE_NAME, column.ORDINAL_POSITION
+           ) AS columns
     """
 
-    def _get_table_query(self, table_name):
-        return f"""
+    def _get_table_query(self):
+        return """
     SELECT TABLE_NAME AS name,
            ARRAY(
              SELECT COLUMN_NAME
@@ -172,14 +339,10 @@ class InformationSchema(object):
              WHERE column.TABLE_NAME = table.TABLE_NAME
            ) AS columns
     FROM INFORMATION_SCHEMA.TABLES AS table
-    WHERE table.TABLE_NAME = '{table_name}'
+    WHERE table.TABLE_NAME IN UNNEST(@table_names)
     """
 
-    def _get_index_query(
-        self,
-        enabled_indexes: Optional[List[str]] = None,
-        enabled_types: Optional[List[str]] = None,
-    ):
+    def _get_index_query(self):
         return """
   SELECT INDEX_NAME AS name,
          INDEX_TYPE AS type,
@@ -202,32 +365,53 @@ class InformationSchema(object):
                      "search_partition_by", index.SEARCH_PARTITION_BY,
                      "search_order_by", index.SEARCH_ORDER_BY) AS details
   FROM INFORMATION_SCHEMA.INDEXES AS index
-  WHERE TRUE
-    AND %s
-    AND %s """ % (
-            (
-                f"index.index_type IN UNNEST({enabled_types})"
-                if enabled_types is not None
-                else "TRUE"
-            ),
-            (
-                f"index.index_name IN UNNEST({enabled_indexes})"
-                if enabled_indexes is not None
-                else "TRUE"
-            ),
+  WHERE (@enabled_types IS NULL OR index.index_type IN UNNEST(@enabled_types))
+    AND (@enabled_indexes IS NULL OR index.index_name IN UNNEST(@enabled_indexes))
+  """
+
+    def _get_index_filter_params(
+        self,
+        enabled_indexes: Optional[List[str]] = None,
+        enabled_types: Optional[List[str]] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        return (
+            {"enabled_indexes": enabled_indexes, "enabled_types": enabled_types},
+            {"enabled_indexes": _STRING_ARRAY, "enabled_types": _STRING_ARRAY},
         )
 
-    def _get_json_schema_query(self, table_name: str, json_expr: str):
-        return f"""
-        SELECT key, JSON_TYPE(j[key]) AS type
+    def _get_json_schema_query(self, samples: List[Tuple[str, str]], offset: int = 0):
+        return "\n    UNION ALL\n".join(
+            f"""
+        SELECT {offset + i} AS sample_id, key, JSON_TYPE(j[key]) AS type
         FROM (
           SELECT ({json_expr}) AS j
           FROM {table_name}
           WHERE ({json_expr}) IS NOT NULL
           -- Ideally we should do TABLESAMPLE RESERVOIR (1 ROWS), but it can be slow
           LIMIT 1
-        ) AS t, UNNEST(JSON_KEYS(j)) AS key
-    """
+        ) AS t, UNNEST(JSON_KEYS(j)) AS key"""
+            for i, (table_name, json_expr) in enumerate(samples)
+        )
+
+    def _sample_json_fields(
+        self, samples: List[Tuple[str, str]]
+    ) -> List[List[JsonField]]:
+        """Samples the json fields of each (table_name, json_expr) pair.
+
+        All pairs are fused into UNION ALL queries so that the sampling takes a
+        single round trip for most graphs.
+        """
+        json_fields: List[List[JsonField]] = [[] for _ in samples]
+        for offset in range(0, len(samples), _MAX_JSON_SCHEMA_SAMPLES_PER_QUERY):
+            query = self._get_json_schema_query(
+                samples[offset : offset + _MAX_JSON_SCHEMA_SAMPLES_PER_QUERY],
+                offset=offset,
+            )
+            for row in self._query(query):
+                json_fields[row["sample_id"]].append(
+                    JsonField(key=row["key"], type=row["type"])
+                )
+        return json_fields
 
     def get_json_property_schema_in_property_graph(
         self,
@@ -250,59 +434,108 @@ class InformationSchema(object):
             for pname in label.property_declaration_names
             if included_properties is None or pname in included_properties
         }
-        results = []
-        for node in graph.nodes.values():
-            if label_name in node.label_names:
-                for pname, ptype in property_types.items():
-                    if ptype != "JSON":
-                        continue
-                    results.append(
-                        JsonSchema(
-                            schema_object_name=label_name,
-                            json_object_name=pname,
-                            json_fields=[
-                                JsonField(**row)
-                                for row in self._query(
-                                    self._get_json_schema_query(
-                                        node.table_name,
-                                        node.property_definitions[pname].expr,
-                                    )
-                                )
-                            ],
-                        )
-                    )
+        json_schemas = self._get_json_schemas(
+            graph,
+            [
+                (label_name, pname)
+                for pname, ptype in property_types.items()
+                if ptype == "JSON"
+            ],
+        )
+        return [
+            json_schema
+            for json_schemas_of_property in json_schemas.values()
+            for json_schema in json_schemas_of_property
+        ]
 
-        for edge in graph.edges.values():
-            if label_name in edge.label_names:
-                for pname, ptype in property_types.items():
-                    if ptype != "JSON":
-                        continue
-                    results.append(
-                        JsonSchema(
-                            schema_object_name=label_name,
-                            json_object_name=pname,
-                            json_fields=[
-                                JsonField(**row)
-                                for row in self._query(
-                                    self._get_json_schema_query(
-                                        edge.table_name,
-                                        edge.property_definitions[pname].expr,
-                                    )
-                                )
-                            ],
-                        )
-                    )
+    def warm_up_json_property_schemas(self, graph: PropertyGraph):
+        """Samples the schemas of all json properties in the graph.
+
+        Sampled schemas are kept in `json_schema_cache` so that subsequent
+        lookups are served without querying the database.
+        """
+        if self.json_schema_cache is None:
+            return
+        properties = [
+            (label_name, pname)
+            for label_name, label in graph.labels.items()
+            for pname in label.property_declaration_names
+            if graph.property_declarations[pname].type == "JSON"
+        ]
+        try:
+            self._get_json_schemas(graph, properties)
+            logger.info(f"Warmed up {len(properties)} json property schemas")
+        except Exception as e:
+            logger.warning(f"Failed to warm up json property schemas: {e}")
+
+    def _get_json_schemas(
+        self, graph: PropertyGraph, properties: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], List[JsonSchema]]:
+        results: Dict[Tuple[str, str], List[JsonSchema]] = {}
+        missing = []
+        for label_name, pname in properties:
+            cached = (
+                self.json_schema_cache.get((graph.name, label_name, pname))
+                if self.json_schema_cache is not None
+                else None
+            )
+            if cached is not None:
+                results[(label_name, pname)] = cached
+            else:
+                results[(label_name, pname)] = []
+                missing.append((label_name, pname))
+
+        samples = [
+            (
+                label_name,
+                pname,
+                element.table_name,
+                element.property_definitions[pname].expr,
+            )
+            for label_name, pname in missing
+            for element in graph.get_label_elements(label_name)
+        ]
+        json_fields = self._sample_json_fields(
+            [(table_name, json_expr) for _, _, table_name, json_expr in samples]
+        )
+        for (label_name, pname, _, _), fields in zip(samples, json_fields):
+            results[(label_name, pname)].append(
+                JsonSchema(
+                    schema_object_name=label_name,
+                    json_object_name=pname,
+                    json_fields=fields,
+                )
+            )
+        if self.json_schema_cache is not None:
+            for label_name, pname in missing:
+                self.json_schema_cache.put(
+                    (graph.name, label_name, pname), results[(label_name, pname)]
+                )
         return results
 
-    def _query(self, q: str):
-        with self.database.snapshot() as snapshot:
-            rows = snapshot.execute_sql(q)
-            return [
-                {
-                    column: value
-                    for column, value in zip(
-                        [column.name for column in rows.fields], row
-                    )
-                }
-                for row in rows
-            ]
+    def _query(
+        self,
+        q: str,
+        params: Optional[Dict[str, Any]] = None,
+        param_types: Optional[Dict[str, Any]] = None,
+    ):
+        if self.snapshot is not None:
+            return self._execute_sql(self.snapshot, q, params, param_types)
+        with self.database.snapshot(**self.snapshot_options) as snapshot:
+            return self._execute_sql(snapshot, q, params, param_types)
+
+    def _execute_sql(
+        self,
+        snapshot: Snapshot,
+        q: str,
+        params: Optional[Dict[str, Any]] = None,
+        param_types: Optional[Dict[str, Any]] = None,
+    ):
+        rows = snapshot.execute_sql(q, params=params, param_types=param_types)
+        return [
+            {
+                column: value
+                for column, value in zip([column.name for column in rows.fields], row)
+            }
+            for row in rows
+        ]
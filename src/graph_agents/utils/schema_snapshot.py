@@ -0,0 +1,116 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, List, Optional, Union
+
+from pydantic import BaseModel
+
+from graph_agents.utils.compact_schema import CompactPropertyGraph
+from graph_agents.utils.database_context import Index, PropertyGraph
+
+logger = logging.getLogger("graph_agents." + __name__)
+
+
+class SchemaSnapshot(BaseModel):
+    fingerprint: str
+    property_graph: Union[PropertyGraph, CompactPropertyGraph]
+    indexes: List[Index]
+
+
+class SchemaSnapshotStore(object):
+    """Persists introspected schemas as json files in a local directory.
+
+    Each snapshot is stored under a caller-provided key (e.g. the database and
+    graph identifier) together with the schema fingerprint it was built from.
+    A snapshot is only served back if its fingerprint still matches.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def load(self, key: str, fingerprint: str) -> Optional[SchemaSnapshot]:
+        path = self._get_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                snapshot = SchemaSnapshot.model_validate_json(f.read())
+        except Exception as e:
+            logger.warning(f"Failed to load schema snapshot `{path}`: {e}")
+            return None
+        if snapshot.fingerprint != fingerprint:
+            logger.debug(f"Schema snapshot `{path}` is outdated")
+            return None
+        return snapshot
+
+    def save(self, key: str, snapshot: SchemaSnapshot):
+        path = self._get_path(key)
+        try:
+            _write_atomically(self.directory, path, snapshot.model_dump_json())
+        except Exception as e:
+            logger.warning(f"Failed to save schema snapshot `{path}`: {e}")
+
+    def _get_path(self, key: str) -> str:
+        return _get_path(self.directory, "schema", key)
+
+
+class JsonStore(object):
+    """Persists json values in a local directory, e.g. sampled examples.
+
+    Values are stored under a caller-provided key, which should identify
+    everything the value depends on.
+    """
+
+    def __init__(self, directory: str, prefix: str):
+        self.directory = directory
+        self.prefix = prefix
+
+    def load(self, key: str) -> Optional[Any]:
+        path = _get_path(self.directory, self.prefix, key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load `{path}`: {e}")
+            return None
+
+    def save(self, key: str, value: Any):
+        path = _get_path(self.directory, self.prefix, key)
+        try:
+            _write_atomically(self.directory, path, json.dumps(value))
+        except Exception as e:
+            logger.warning(f"Failed to save `{path}`: {e}")
+
+
+def _get_path(directory: str, prefix: str, key: str) -> str:
+    return os.path.join(
+        directory, "%s-%s.json" % (prefix, hashlib.sha256(key.encode()).hexdigest())
+    )
+
+
+def _write_atomically(directory: str, path: str, content: str):
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file first so that concurrent workers never observe
+    # a partially written file.
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(content)
+    os.replace(temp_path, path)
@@ -0,0 +1,156 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SemanticCache(object):
+    """A thread-safe cache looked up by the most similar text.
+
+    Texts are embedded by `embed`, and a lookup hits the cached text with the
+    highest cosine similarity if it is at least `threshold`. Embeddings are
+    kept in a float32 matrix of `max_size` rows, so that a lookup is a single
+    matrix-vector product and memory is bounded. Once full, the least
+    recently used entry is evicted. Entries expire after `ttl` seconds,
+    never if None.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], Sequence[float]],
+        max_size: int = 1024,
+        threshold: float = 0.95,
+        ttl: Optional[float] = None,
+    ):
+        self.embed_function = embed
+        self.max_size = max(max_size, 1)
+        self.threshold = threshold
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Allocated on the first put, once the dimension is known.
+        self._embeddings: Optional[np.ndarray] = None
+        self._used = np.zeros(self.max_size, dtype=bool)
+        self._created_at = np.zeros(self.max_size)
+        self._last_used_at = np.zeros(self.max_size)
+        self._texts: List[Optional[str]] = [None] * self.max_size
+        self._values: List[Any] = [None] * self.max_size
+        self._slots: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embeds and normalizes a text, e.g. to share it by `get` and `put`."""
+        embedding = np.asarray(self.embed_function(text), dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def get(
+        self, text: str, embedding: Optional[np.ndarray] = None
+    ) -> Optional[Tuple[str, Any, float]]:
+        """Returns the (text, value, similarity) of the most similar entry."""
+        if embedding is None:
+            embedding = self.embed(text)
+        with self._lock:
+            self._expire()
+            if self._embeddings is None or not self._used.any():
+                self.misses += 1
+                return None
+            similarities = self._embeddings @ embedding
+            similarities[~self._used] = -np.inf
+            slot = int(np.argmax(similarities))
+            similarity = float(similarities[slot])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._last_used_at[slot] = time.monotonic()
+            similar_text = self._texts[slot]
+            assert similar_text is not None  # Used slots always hold their text.
+            return similar_text, self._values[slot], similarity
+
+    def put(self, text: str, value: Any, embedding: Optional[np.ndarray] = None):
+        if embedding is None:
+            embedding = self.embed(text)
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = np.zeros(
+                    (self.max_size, len(embedding)), dtype=np.float32
+                )
+            slot = self._slots.get(text)
+            if slot is None:
+                slot = self._get_free_slot()
+            now = time.monotonic()
+            self._embeddings[slot] = embedding
+            self._used[slot] = True
+            self._created_at[slot] = now
+            self._last_used_at[slot] = now
+            self._texts[slot] = text
+            self._values[slot] = value
+            self._slots[text] = slot
+
+    def pop(self, text: str, default: Any = None) -> Any:
+        with self._lock:
+            slot = self._slots.get(text)
+            if slot is None:
+                return default
+            value = self._values[slot]
+            self._free(slot)
+            return value
+
+    def clear(self):
+        with self._lock:
+            for slot in list(self._slots.values()):
+                self._free(slot)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._slots),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _get_free_slot(self) -> int:
+        free_slots = np.flatnonzero(~self._used)
+        if len(free_slots):
+            return int(free_slots[0])
+        last_used_at = np.where(self._used, self._last_used_at, np.inf)
+        slot = int(np.argmin(last_used_at))
+        self._free(slot)
+        self.evictions += 1
+        return slot
+
+    def _free(self, slot: int):
+        text = self._texts[slot]
+        assert text is not None
+        del self._slots[text]
+        self._used[slot] = False
+        self._texts[slot] = None
+        self._values[slot] = None
+
+    def _expire(self):
+        if self.ttl is None:
+            return
+        expired = self._used & (time.monotonic() - self._created_at > self.ttl)
+        for slot in np.flatnonzero(expired):
+            self._free(int(slot))
@@ -0,0 +1,49 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+from typing import Any, Dict, Optional
+
+
+def get_snapshot_options(
+    exact_staleness: Optional[float] = None,
+    max_staleness: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Returns the keyword arguments of `Database.snapshot` for a staleness.
+
+    Stalenesses are in seconds, and `exact_staleness` takes precedence. Reads
+    are strong if neither is set.
+    """
+    if exact_staleness is not None:
+        return {"exact_staleness": datetime.timedelta(seconds=exact_staleness)}
+    if max_staleness is not None:
+        return {"max_staleness": datetime.timedelta(seconds=max_staleness)}
+    return {}
+
+
+def get_multi_use_snapshot_options(
+    snapshot_options: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Adapts snapshot options to multi-use snapshots.
+
+    Multi-use snapshots do not support bounded staleness, so they read at
+    the bound instead, e.g. exactly 10 seconds stale for a max staleness of
+    10 seconds.
+    """
+    options = dict(snapshot_options or {})
+    if "max_staleness" in options:
+        options["exact_staleness"] = options.pop("max_staleness")
+    if "min_read_timestamp" in options:
+        options["read_timestamp"] = options.pop("min_read_timestamp")
+    return options
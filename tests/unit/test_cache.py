@@ -0,0 +1,114 @@
+import pytest
+
+from graph_agents.utils import cache
+from graph_agents.utils.cache import TTLCache
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_get_and_put():
+    ttl_cache = TTLCache(max_size=2)
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.get("a", "default") == "default"
+    ttl_cache.put("a", 1)
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.stats() == {"size": 1, "hits": 1, "misses": 2, "evictions": 0}
+
+
+def test_evicts_least_recently_used():
+    ttl_cache = TTLCache(max_size=2)
+    ttl_cache.put("a", 1)
+    ttl_cache.put("b", 2)
+    assert ttl_cache.get("a") == 1
+    ttl_cache.put("c", 3)
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.get("c") == 3
+    assert ttl_cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    ttl_cache = TTLCache(ttl=10)
+    ttl_cache.put("a", 1)
+    clock.now = 10
+    assert ttl_cache.get("a") == 1
+    clock.now = 10.5
+    assert ttl_cache.get("a") is None
+    assert len(ttl_cache) == 0
+
+
+def test_entries_never_expire_without_ttl(clock):
+    ttl_cache = TTLCache()
+    ttl_cache.put("a", 1)
+    clock.now = 1e9
+    assert ttl_cache.get("a") == 1
+
+
+def test_put_refreshes_expiry(clock):
+    ttl_cache = TTLCache(ttl=10)
+    ttl_cache.put("a", 1)
+    clock.now = 8
+    ttl_cache.put("a", 2)
+    clock.now = 15
+    assert ttl_cache.get("a") == 2
+
+
+def test_evicts_until_weight_is_bounded():
+    ttl_cache = TTLCache(max_size=10, weigher=len, max_weight=10)
+    ttl_cache.put("a", "xxxx")
+    ttl_cache.put("b", "xxxx")
+    assert ttl_cache.stats()["weight"] == 8
+    ttl_cache.get("a")
+    ttl_cache.put("c", "xxxx")
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("a") == "xxxx"
+    assert ttl_cache.get("c") == "xxxx"
+    assert ttl_cache.stats()["weight"] == 8
+    assert ttl_cache.stats()["evictions"] == 1
+
+
+def test_does_not_cache_values_heavier_than_max_weight():
+    ttl_cache = TTLCache(weigher=len, max_weight=4)
+    ttl_cache.put("a", "xx")
+    ttl_cache.put("b", "xxxxx")
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("a") == "xx"
+    # Replacing a value by a too heavy one drops the old value.
+    ttl_cache.put("a", "xxxxx")
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.stats()["weight"] == 0
+
+
+def test_weight_is_updated_by_pop_replace_and_expiry(clock):
+    ttl_cache = TTLCache(ttl=10, weigher=len, max_weight=100)
+    ttl_cache.put("a", "xxx")
+    ttl_cache.put("a", "x")
+    ttl_cache.put("b", "xx")
+    assert ttl_cache.stats()["weight"] == 3
+    assert ttl_cache.pop("b") == "xx"
+    assert ttl_cache.stats()["weight"] == 1
+    clock.now = 11
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.stats()["weight"] == 0
+
+
+def test_clear():
+    ttl_cache = TTLCache(weigher=len, max_weight=100)
+    ttl_cache.put("a", "xx")
+    ttl_cache.clear()
+    assert len(ttl_cache) == 0
+    assert ttl_cache.stats()["weight"] == 0
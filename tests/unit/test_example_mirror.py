@@ -0,0 +1,211 @@
+import time
+
+import numpy as np
+import pytest
+from langchain_core.vectorstores.utils import (
+    maximal_marginal_relevance as langchain_maximal_marginal_relevance,
+)
+
+from graph_agents.tools.entity_resolution.vector_search import HashingEmbedding
+from graph_agents.tools.nl2gql import example_mirror
+from graph_agents.tools.nl2gql.example_mirror import (
+    LocalExampleMirror,
+    LocalExampleSelector,
+    maximal_marginal_relevance,
+)
+
+EMBEDDING = HashingEmbedding(dimension=32)
+
+QUESTIONS = [
+    "who works at acme",
+    "who works at globex",
+    "list the accounts of alice",
+    "transfers over 100 dollars",
+    "people who know bob",
+]
+
+
+def normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=-1, keepdims=True)
+
+
+# Rows 0 and 1 are near duplicates, row 2 is diverse.
+EMBEDDINGS = normalize(
+    [
+        [1.0, 0.1, 0.0, 0.0],
+        [1.0, 0.12, 0.0, 0.01],
+        [0.6, 0.0, 0.8, 0.0],
+        [0.0, 1.0, 0.0, 0.0],
+        [0.0, 0.0, 0.0, 1.0],
+        [0.7, 0.7, 0.1, 0.0],
+    ]
+)
+QUERY = normalize([1.0, 0.2, 0.3, 0.0])
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 6])
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.5, 1.0])
+def test_matches_langchain_maximal_marginal_relevance(k, lambda_mult):
+    expected = langchain_maximal_marginal_relevance(
+        QUERY, list(EMBEDDINGS), lambda_mult=lambda_mult, k=k
+    )
+    assert (
+        maximal_marginal_relevance(QUERY, EMBEDDINGS, k, lambda_mult=lambda_mult)
+        == expected
+    )
+
+
+def test_selects_candidates_among_fetch_k_most_similar():
+    similarities = EMBEDDINGS @ QUERY
+    candidates = list(np.argsort(-similarities)[:3])
+    expected = [
+        int(candidates[i])
+        for i in langchain_maximal_marginal_relevance(
+            QUERY, list(EMBEDDINGS[candidates]), k=2
+        )
+    ]
+    assert maximal_marginal_relevance(QUERY, EMBEDDINGS, 2, fetch_k=3) == expected
+
+
+def test_prefers_diverse_examples():
+    # Rows 0 and 1 are the most similar, but near duplicates.
+    most_similar = maximal_marginal_relevance(QUERY, EMBEDDINGS, 2, lambda_mult=1.0)
+    assert sorted(most_similar) == [0, 1]
+    diverse = maximal_marginal_relevance(QUERY, EMBEDDINGS, 2)
+    assert diverse[0] == most_similar[0]
+    assert diverse[1] not in most_similar
+
+
+def test_empty_matrix():
+    assert maximal_marginal_relevance(QUERY, np.zeros((0, 0)), 3) == []
+
+
+class FakeDatabase(object):
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.snapshot_options = []
+
+    def snapshot(self, **snapshot_options):
+        self.snapshot_options.append(snapshot_options)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute_sql(self, query):
+        self.queries.append(query)
+        if self.rows is None:
+            raise RuntimeError("unavailable")
+        return iter(self.rows)
+
+
+def example_rows(questions=QUESTIONS):
+    return [
+        (
+            question,
+            EMBEDDING.embed_query(question),
+            {"question": question, "gql": f"gql {i}", "schema": ""},
+        )
+        for i, question in enumerate(questions)
+    ]
+
+
+class FakeSelector(object):
+
+    def __init__(self):
+        self.examples = []
+
+    def add_example(self, example):
+        self.examples.append(example)
+
+    def select_examples(self, input_variables):
+        return [{"question": "fallback"}]
+
+
+def build_selector(database, **kwargs):
+    mirror = LocalExampleMirror(
+        database,
+        "gql_examples",
+        max_rows=kwargs.pop("max_rows", 10),
+        snapshot_options={"max_staleness": 10},
+        **kwargs,
+    )
+    mirror.load()
+    return LocalExampleSelector(mirror, EMBEDDING, k=2, fallback=FakeSelector())
+
+
+def test_loads_and_selects_examples():
+    database = FakeDatabase(example_rows())
+    selector = build_selector(database)
+    assert len(selector.mirror) == len(QUESTIONS)
+    assert "LIMIT 11" in database.queries[0]
+    assert database.snapshot_options == [{"max_staleness": 10}]
+    examples = selector.select_examples({"question": "who works at acme"})
+    assert examples[0] == {"question": QUESTIONS[0], "gql": "gql 0", "schema": ""}
+    assert len(examples) == 2
+    # Selections are served from memory.
+    assert len(database.queries) == 1
+
+
+def test_selected_examples_are_copies():
+    selector = build_selector(FakeDatabase(example_rows()))
+    selector.select_examples({"question": "who works at acme"})[0]["gql"] = "x"
+    assert selector.select_examples({"question": "who works at acme"})[0] == {
+        "question": QUESTIONS[0],
+        "gql": "gql 0",
+        "schema": "",
+    }
+
+
+def test_tables_larger_than_max_rows_use_the_fallback():
+    selector = build_selector(FakeDatabase(example_rows()), max_rows=2)
+    assert not selector.mirror.available
+    assert selector.select_examples({"question": "who"}) == [{"question": "fallback"}]
+
+
+def test_failed_reload_keeps_loaded_examples():
+    database = FakeDatabase(example_rows())
+    selector = build_selector(database)
+    database.rows = None
+    assert selector.mirror.load()
+    assert len(selector.mirror) == len(QUESTIONS)
+
+
+def test_added_examples_are_selected():
+    selector = build_selector(FakeDatabase(example_rows([])))
+    assert selector.select_examples({"question": "loans of acme"}) == []
+    example = {"question": "loans of acme", "gql": "gql", "schema": ""}
+    selector.add_example(example)
+    assert selector.fallback.examples == [example]
+    assert selector.select_examples({"question": "loans of acme"}) == [example]
+
+
+def test_reloads_stale_examples_in_background():
+    database = FakeDatabase(example_rows())
+    selector = build_selector(database, refresh_interval=0)
+    selector.select_examples({"question": "who"})
+    for _ in range(100):
+        if len(database.queries) > 1 and not selector.mirror._refreshing:
+            break
+        time.sleep(0.01)
+    assert len(database.queries) > 1
+
+
+def test_failed_refresh_start_can_be_retried(monkeypatch):
+    class FailingThread(object):
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def start(self):
+            raise RuntimeError("can't start new thread")
+
+    selector = build_selector(FakeDatabase(example_rows()), refresh_interval=0)
+    monkeypatch.setattr(example_mirror.threading, "Thread", FailingThread)
+    selector.mirror.maybe_refresh()
+    assert not selector.mirror._refreshing
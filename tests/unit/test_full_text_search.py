@@ -0,0 +1,258 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from graph_agents.tools.entity_resolution.full_text_search import (
+    ColumnWithAlias,
+    SearchCriteria,
+    _build_full_text_search_query,
+    _filter_by_score,
+    _FullTextSearcher,
+)
+from graph_agents.utils.database_context import Column
+
+NAMES = ["Alex Smith", "Alexandra Smithers", "Bob Jones", "Dana Adams"]
+
+NAME = ColumnWithAlias(column=Column(name="name", type="STRING(MAX)"), alias="name")
+
+SEARCH_CRITERIA = SearchCriteria(
+    tokenlist_column=Column(name="name_token", type="TOKENLIST"),
+    tokenized_column=NAME,
+    search_function="SEARCH",
+    score_function="SCORE",
+)
+
+
+class Field(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Rows(list):
+
+    def __init__(self, fields, rows):
+        super().__init__(rows)
+        self.fields = [Field(field) for field in fields]
+
+
+class FakeSearchDatabase(object):
+    """Serves full text search queries over `NAMES` by shared words."""
+
+    def __init__(self):
+        self.queries = []
+
+    def snapshot(self, **snapshot_options):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute_sql(self, query, params=None, param_types=None):
+        num_references = len(re.findall(r"AS _reference_index", query))
+        self.queries.append((query, num_references))
+        rows = []
+        for i in range(num_references):
+            reference = params[f"r{i}_name"]
+            words = set(reference.lower().split())
+            matches = []
+            for person_id, name in enumerate(NAMES):
+                shared_words = len(words & set(name.lower().split()))
+                if shared_words:
+                    score = shared_words + (1.0 if name == reference else 0.0)
+                    matches.append([i, person_id, name, score])
+            matches.sort(key=lambda row: -row[3])
+            rows.extend(matches)
+        return Rows(["_reference_index", "id", "name", "_score_0"], rows)
+
+
+def build_searcher(database, **kwargs):
+    kwargs.setdefault("top_k", 3)
+    return _FullTextSearcher(
+        database,
+        table_name="Person",
+        search_criterias=[SEARCH_CRITERIA],
+        partition_columns=[],
+        index_filter_expr=None,
+        canonical_reference_columns=[
+            ColumnWithAlias(column=Column(name="id", type="INT64"), alias="id"),
+            NAME,
+        ],
+        **kwargs,
+    )
+
+
+def build_references(num_references):
+    return [{"name": NAMES[i % len(NAMES)]} for i in range(num_references)]
+
+
+def get_ids(values):
+    return [value["id"] for value in values] if values is not None else None
+
+
+def test_search_query():
+    query = _build_full_text_search_query(
+        table_name="Person",
+        search_criterias=[SEARCH_CRITERIA],
+        partition_columns=[
+            ColumnWithAlias(
+                column=Column(name="country", type="STRING(MAX)"), alias="country"
+            )
+        ],
+        index_filter_expr="name IS NOT NULL",
+        canonical_reference_columns=[
+            ColumnWithAlias(column=Column(name="id", type="INT64"), alias="id")
+        ],
+        top_k=5,
+        num_references=2,
+    )
+    for i in range(2):
+        assert f"SELECT {i} AS _reference_index, *" in query
+        assert f"SEARCH(name_token, @r{i}_name)" in query
+        assert f"SCORE(name_token, @r{i}_name)" in query
+        assert f"IF(name = @r{i}_name, 1., 0.) AS _score_0" in query
+        assert f"country = @r{i}_country" in query
+    assert query.count("UNION ALL") == 1
+    assert query.count("LIMIT 5") == 2
+    assert query.count("WHERE") == 2
+    assert query.count("name IS NOT NULL") == 2
+    assert "ORDER BY _reference_index, _score_0 DESC" in query
+
+
+def test_search_query_orders_by_every_score():
+    query = _build_full_text_search_query(
+        table_name="Person",
+        search_criterias=[SEARCH_CRITERIA, SEARCH_CRITERIA],
+        partition_columns=[],
+        index_filter_expr=None,
+        canonical_reference_columns=[
+            ColumnWithAlias(column=Column(name="id", type="INT64"), alias="id")
+        ],
+        top_k=5,
+    )
+    assert "AS _score_0, " in query
+    assert "AS _score_1" in query
+    assert query.count("ORDER BY _score_0 DESC, _score_1 DESC") == 1
+    assert "ORDER BY _reference_index, _score_0 DESC, _score_1 DESC" in query
+
+
+def test_search_queries_are_built_once_per_number_of_references():
+    searcher = build_searcher(FakeSearchDatabase())
+    assert searcher.get_search_query(2) is searcher.get_search_query(2)
+    assert searcher.get_search_query(1) != searcher.get_search_query(2)
+
+
+def test_search_is_chunked_by_16_references():
+    database = FakeSearchDatabase()
+    searcher = build_searcher(database)
+    references = build_references(40)
+    results = searcher.search(references)
+    assert [num_references for _, num_references in database.queries] == [16, 16, 8]
+    assert len(results) == 40
+    assert [get_ids(values) for values in results] == [
+        [i % len(NAMES)] for i in range(40)
+    ]
+
+
+def test_search_merges_rows_by_reference_index():
+    searcher = build_searcher(FakeSearchDatabase())
+    results = searcher.search(
+        [{"name": "Dana Adams"}, {"name": "Nobody"}, {"name": "Bob Jones"}]
+    )
+    assert results == [
+        [{"id": 3, "name": "Dana Adams", "_score_0": 3.0}],
+        [],
+        [{"id": 2, "name": "Bob Jones", "_score_0": 3.0}],
+    ]
+
+
+def test_search_without_references():
+    database = FakeSearchDatabase()
+    assert build_searcher(database).search([]) == []
+    assert database.queries == []
+
+
+class FailingSearchDatabase(FakeSearchDatabase):
+    """Fails queries of `num_failed_references` references."""
+
+    def __init__(self, num_failed_references):
+        super().__init__()
+        self.num_failed_references = num_failed_references
+
+    def execute_sql(self, query, params=None, param_types=None):
+        if len(re.findall(r"AS _reference_index", query)) == (
+            self.num_failed_references
+        ):
+            raise RuntimeError("Deadline exceeded")
+        return super().execute_sql(query, params, param_types)
+
+
+async def test_search_async_matches_search():
+    references = build_references(40)
+    database = FakeSearchDatabase()
+    results = await build_searcher(database).search_async(references)
+    assert sorted(num_references for _, num_references in database.queries) == [
+        8,
+        16,
+        16,
+    ]
+    assert results == build_searcher(FakeSearchDatabase()).search(references)
+
+
+async def test_search_async_with_executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = await build_searcher(FakeSearchDatabase()).search_async(
+            build_references(20), executor
+        )
+    assert [get_ids(values) for values in results] == [
+        [i % len(NAMES)] for i in range(20)
+    ]
+
+
+async def test_search_async_fails_only_the_failed_chunk():
+    searcher = build_searcher(FailingSearchDatabase(num_failed_references=4))
+    results = await searcher.search_async(build_references(20))
+    assert [get_ids(values) for values in results[:16]] == [
+        [i % len(NAMES)] for i in range(16)
+    ]
+    assert results[16:] == [None] * 4
+
+
+def test_filter_by_score_sums_the_scores():
+    values = [{"id": 1, "_score_0": 1.5, "_score_1": 1.0}, {"id": 2, "_score_0": 0.5}]
+    assert _filter_by_score(values[:1], 2) == [(values[0], 2.5)]
+    assert _filter_by_score([], 1, min_score=1.0, relative_score_cutoff=0.5) == []
+
+
+def test_filter_by_min_score():
+    values = [{"id": i, "_score_0": score} for i, score in enumerate([3.0, 1.0, 0.5])]
+    scored_values = _filter_by_score(values, 1, min_score=1.0)
+    assert [(value["id"], score) for value, score in scored_values] == [
+        (0, 3.0),
+        (1, 1.0),
+    ]
+    assert _filter_by_score(values, 1, min_score=5.0) == []
+
+
+def test_filter_by_relative_score_cutoff():
+    values = [{"id": i, "_score_0": score} for i, score in enumerate([4.0, 2.0, 1.0])]
+    scored_values = _filter_by_score(values, 1, relative_score_cutoff=0.5)
+    assert [value["id"] for value, _ in scored_values] == [0, 1]
+    scored_values = _filter_by_score(
+        values, 1, min_score=3.0, relative_score_cutoff=0.5
+    )
+    assert [value["id"] for value, _ in scored_values] == [0]
+    assert len(_filter_by_score(values, 1)) == 3
+
+
+def test_resolved_references_are_filtered_by_score():
+    searcher = build_searcher(FakeSearchDatabase())
+    [values] = searcher.search([{"name": "Alex Smith Jones"}])
+    assert [(value["id"], value["_score_0"]) for value in values] == [
+        (0, 2.0),
+        (2, 1.0),
+    ]
+    scored_values = _filter_by_score(values, 1, relative_score_cutoff=0.75)
+    assert [value["id"] for value, _ in scored_values] == [0]
@@ -0,0 +1,32 @@
+from graph_agents.tools.nl2gql.graph_query_tool import (
+    _is_gql_applicable,
+    _normalize_user_query,
+)
+
+
+def test_normalize_user_query_collapses_whitespaces_and_punctuation():
+    assert _normalize_user_query("  Who works at   Acme ?! ") == "Who works at Acme"
+
+
+def test_normalize_user_query_keeps_case():
+    assert _normalize_user_query("Who works at PayPal?") != _normalize_user_query(
+        "Who works at Paypal?"
+    )
+
+
+def test_gql_with_string_literals_of_the_question_is_applicable():
+    gql = "GRAPH g MATCH (p:Person {name: 'Acme'}) RETURN p.id"
+    assert _is_gql_applicable(gql, "who works at acme?", "Who works at Acme")
+    assert not _is_gql_applicable(gql, "who works at Globex", "Who works at Acme")
+
+
+def test_gql_of_a_question_with_other_numbers_is_not_applicable():
+    gql = (
+        "GRAPH g MATCH (a:Account) WHERE a.year = 2023"
+        " RETURN a.id ORDER BY a.balance DESC LIMIT 5"
+    )
+    assert _is_gql_applicable(gql, "Top 5 accounts in 2023", "top 5 accounts of 2023")
+    assert not _is_gql_applicable(
+        gql, "top 10 accounts in 2024", "Top 5 accounts in 2023"
+    )
+    assert not _is_gql_applicable(gql, "top accounts", "Top 5 accounts in 2023")
@@ -0,0 +1,129 @@
+from graph_agents.tools.entity_resolution import local_index
+from graph_agents.tools.entity_resolution.local_index import (
+    LocalSearchIndex,
+    _InvertedIndex,
+)
+
+NAMES = ["Alex Smith", "Alexandra Smithers", "Bob Jones", "alex smith", None]
+
+
+def build_index(rows, search_function="search_ngrams", **kwargs):
+    kwargs.setdefault("max_rows", 100)
+    kwargs.setdefault("top_k", 10)
+    index = LocalSearchIndex(
+        lambda snapshot: rows,
+        search_criterias=[("name", search_function)],
+        partition_aliases=kwargs.pop("partition_aliases", []),
+        canonical_aliases=["id"],
+        **kwargs,
+    )
+    assert index.load()
+    return index
+
+
+def name_rows():
+    return [{"id": i, "name": name} for i, name in enumerate(NAMES)]
+
+
+def test_ngrams_rank_exact_match_first():
+    scores = _InvertedIndex("SEARCH_NGRAMS", NAMES).search("Alex Smith")
+    ranking = sorted(scores, key=lambda row_id: -scores[row_id])
+    # The exact match scores 1 more than the same name in another case.
+    assert ranking == [0, 3, 1]
+    assert scores[0] == 2.0
+    assert scores[3] == 1.0
+    assert 0 < scores[1] < 1
+
+
+def test_ngrams_tolerate_typos():
+    scores = _InvertedIndex("search_ngrams", NAMES).search("Alex Smth")
+    ranking = sorted(scores, key=lambda row_id: (-scores[row_id], row_id))
+    assert ranking[:2] == [0, 3]
+    assert 2 not in scores
+
+
+def test_full_text_search_requires_every_word():
+    scores = _InvertedIndex("search", NAMES).search("smith ALEX")
+    assert sorted(scores) == [0, 3]
+    assert _InvertedIndex("search", NAMES).search("alex jones") == {}
+
+
+def test_substring_search_requires_every_word_as_substring():
+    scores = _InvertedIndex("search_substring", NAMES).search("alexandra smithe")
+    assert list(scores) == [1]
+
+
+def test_empty_text_matches_nothing():
+    assert _InvertedIndex("search_ngrams", NAMES).search("") == {}
+    assert _InvertedIndex("search_ngrams", NAMES).search(None) == {}
+
+
+def test_search_returns_top_k_per_reference():
+    index = build_index(name_rows(), top_k=2)
+    values = index.search([{"name": "Alex Smith"}, {"name": "Bob Jones"}])
+    assert [(value["_reference_index"], value["id"]) for value in values] == [
+        (0, 0),
+        (0, 3),
+        (1, 2),
+    ]
+    assert values[0]["_score_0"] == 2.0
+
+
+def test_search_filters_by_partition():
+    rows = [
+        {"id": 1, "name": "Alex Smith", "country": "US"},
+        {"id": 2, "name": "Alex Smith", "country": "UK"},
+    ]
+    index = build_index(rows, partition_aliases=["country"])
+    values = index.search([{"name": "Alex Smith", "country": "UK"}])
+    assert [value["id"] for value in values] == [2]
+
+
+def test_tables_larger_than_max_rows_are_not_served():
+    index = LocalSearchIndex(
+        lambda snapshot: name_rows(),
+        search_criterias=[("name", "search_ngrams")],
+        partition_aliases=[],
+        canonical_aliases=["id"],
+        max_rows=2,
+        top_k=10,
+    )
+    assert not index.load()
+    assert not index.available
+    assert index.search([{"name": "Alex Smith"}]) is None
+
+
+def test_failed_reload_keeps_loaded_rows():
+    rows = name_rows()
+
+    def loader(snapshot):
+        if rows is None:
+            raise RuntimeError("unavailable")
+        return rows
+
+    index = LocalSearchIndex(
+        loader,
+        search_criterias=[("name", "search")],
+        partition_aliases=[],
+        canonical_aliases=["id"],
+        max_rows=100,
+        top_k=10,
+    )
+    assert index.load()
+    rows = None
+    assert index.load()
+    assert [value["id"] for value in index.search([{"name": "Bob"}])] == [2]
+
+
+def test_failed_refresh_start_can_be_retried(monkeypatch):
+    class FailingThread(object):
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def start(self):
+            raise RuntimeError("can't start new thread")
+
+    index = build_index(name_rows(), refresh_interval=0)
+    monkeypatch.setattr(local_index.threading, "Thread", FailingThread)
+    assert index.search([{"name": "Bob"}])
+    assert not index._refreshing
@@ -0,0 +1,116 @@
+import math
+
+import pytest
+
+from graph_agents.tools.entity_resolution.vector_search import HashingEmbedding
+from graph_agents.utils import semantic_cache
+from graph_agents.utils.semantic_cache import SemanticCache
+
+# Unit vectors at the given angles, i.e. cosine similarities by angle.
+VECTORS = {
+    "a": [1.0, 0.0],
+    "a'": [math.cos(0.1), math.sin(0.1)],
+    "b": [0.0, 1.0],
+    "c": [-1.0, 0.0],
+}
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(semantic_cache, "time", clock)
+    return clock
+
+
+def test_hits_the_most_similar_text_above_threshold():
+    cache = SemanticCache(VECTORS.get, threshold=0.99)
+    assert cache.get("a") is None
+    cache.put("a", "gql a")
+    cache.put("b", "gql b")
+    text, value, similarity = cache.get("a'")
+    assert (text, value) == ("a", "gql a")
+    assert similarity == pytest.approx(math.cos(0.1))
+    assert cache.stats() == {"size": 2, "hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_misses_below_threshold():
+    cache = SemanticCache(VECTORS.get, threshold=0.999)
+    cache.put("a", "gql a")
+    assert cache.get("a'") is None
+    assert cache.get("c") is None
+
+
+def test_embeddings_are_normalized():
+    cache = SemanticCache(lambda text: [3.0, 0.0] if text == "a" else [0.5, 0.0])
+    cache.put("a", "gql a")
+    assert cache.get("b")[2] == pytest.approx(1.0)
+
+
+def test_put_replaces_the_value_of_a_text():
+    cache = SemanticCache(VECTORS.get)
+    cache.put("a", "gql 1")
+    cache.put("a", "gql 2")
+    assert len(cache) == 1
+    assert cache.get("a")[1] == "gql 2"
+
+
+def test_evicts_least_recently_used(clock):
+    cache = SemanticCache(VECTORS.get, max_size=2)
+    cache.put("a", "gql a")
+    clock.now = 1
+    cache.put("b", "gql b")
+    clock.now = 2
+    assert cache.get("a") is not None
+    clock.now = 3
+    cache.put("c", "gql c")
+    assert cache.get("b") is None
+    assert cache.get("a")[1] == "gql a"
+    assert cache.get("c")[1] == "gql c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = SemanticCache(VECTORS.get, ttl=10)
+    cache.put("a", "gql a")
+    clock.now = 5
+    cache.put("b", "gql b")
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.get("b")[1] == "gql b"
+    assert len(cache) == 1
+
+
+def test_pop_and_clear():
+    cache = SemanticCache(VECTORS.get)
+    cache.put("a", "gql a")
+    cache.put("b", "gql b")
+    assert cache.pop("a") == "gql a"
+    assert cache.pop("a", "missing") == "missing"
+    assert cache.get("a'") is None
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get("b") is None
+
+
+def test_shares_embeddings_between_get_and_put():
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return HashingEmbedding().embed_query(text)
+
+    cache = SemanticCache(embed, threshold=0.9)
+    embedding = cache.embed("top accounts")
+    assert cache.get("top accounts", embedding) is None
+    cache.put("top accounts", "gql", embedding)
+    assert cache.get("top  accounts")[1] == "gql"
+    assert calls == ["top accounts", "top  accounts"]
@@ -0,0 +1,71 @@
+from graph_agents.tools.entity_resolution.session_store import (
+    REFERENCE_MAPPINGS_KEY,
+    ReferenceMappingStore,
+)
+
+
+def test_get_and_put():
+    store = ReferenceMappingStore({})
+    assert store.get("person", {"name": "Alex"}) is None
+    store.put("person", {"name": "Alex"}, {"id": 1})
+    assert store.get("person", {"name": "Alex"}) == {"id": 1}
+
+
+def test_keys_do_not_collide_across_labels():
+    store = ReferenceMappingStore({})
+    store.put("person", {"name": "Acme"}, {"id": 1})
+    store.put("company", {"name": "Acme"}, {"id": 2})
+    assert store.get("person", {"name": "Acme"}) == {"id": 1}
+    assert store.get("company", {"name": "Acme"}) == {"id": 2}
+    # Labels and references are not concatenated as plain strings.
+    store.put("a", {"b": "c"}, {"id": 3})
+    assert store.get("a{", {"b": "c"}) is None
+
+
+def test_keys_do_not_depend_on_field_order():
+    store = ReferenceMappingStore({})
+    store.put("person", {"name": "Alex", "city": "Paris"}, {"id": 1})
+    assert store.get("person", {"city": "Paris", "name": "Alex"}) == {"id": 1}
+
+
+def test_evicts_least_recently_used():
+    store = ReferenceMappingStore({}, max_size=2)
+    store.put("person", {"name": "a"}, {"id": 1})
+    store.put("person", {"name": "b"}, {"id": 2})
+    assert store.get("person", {"name": "a"}) == {"id": 1}
+    store.put("person", {"name": "c"}, {"id": 3})
+    assert store.get("person", {"name": "b"}) is None
+    assert store.get("person", {"name": "a"}) == {"id": 1}
+    assert store.get("person", {"name": "c"}) == {"id": 3}
+
+
+def test_put_replaces_and_refreshes_a_mapping():
+    store = ReferenceMappingStore({}, max_size=2)
+    store.put("person", {"name": "a"}, {"id": 1})
+    store.put("person", {"name": "b"}, {"id": 2})
+    store.put("person", {"name": "a"}, {"id": 3})
+    store.put("person", {"name": "c"}, {"id": 4})
+    assert store.get("person", {"name": "a"}) == {"id": 3}
+    assert store.get("person", {"name": "b"}) is None
+
+
+def test_save_persists_mappings_in_the_state():
+    state = {}
+    store = ReferenceMappingStore(state)
+    store.put("person", {"name": "Alex"}, {"id": 1})
+    assert REFERENCE_MAPPINGS_KEY not in state
+    store.save()
+    assert ReferenceMappingStore(state).get("person", {"name": "Alex"}) == {"id": 1}
+
+
+def test_ignores_mappings_of_older_versions():
+    state = {REFERENCE_MAPPINGS_KEY: [{"id": 1}]}
+    store = ReferenceMappingStore(state)
+    assert store.mappings == {}
+
+
+def test_without_state():
+    store = ReferenceMappingStore(None)
+    store.put("person", {"name": "Alex"}, {"id": 1})
+    store.save()
+    assert store.get("person", {"name": "Alex"}) == {"id": 1}
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from graph_agents.utils.single_flight import AsyncSingleFlight, SingleFlight
+
+NUM_CALLERS = 4
+
+
+def run_concurrently(single_flight, function, key="key"):
+    # Waiters join while the leader blocks on `release`.
+    release = threading.Event()
+    calls = []
+
+    def blocking_function():
+        calls.append(1)
+        release.wait(5)
+        return function()
+
+    with ThreadPoolExecutor(max_workers=NUM_CALLERS) as executor:
+        futures = [executor.submit(single_flight.do, key, blocking_function)]
+        while single_flight.stats()["in_flight"] == 0:
+            time.sleep(0.001)
+        futures += [
+            executor.submit(single_flight.do, key, blocking_function)
+            for _ in range(NUM_CALLERS - 1)
+        ]
+        while single_flight.stats()["coalesced"] < NUM_CALLERS - 1:
+            time.sleep(0.001)
+        release.set()
+    return futures, calls
+
+
+def test_coalesces_concurrent_calls():
+    single_flight = SingleFlight()
+    futures, calls = run_concurrently(single_flight, lambda: {"rows": [1]})
+    results = [future.result() for future in futures]
+    assert len(calls) == 1
+    assert results == [{"rows": [1]}] * NUM_CALLERS
+    # Each caller gets its own copy.
+    assert len({id(result) for result in results}) == NUM_CALLERS
+    assert single_flight.stats() == {
+        "calls": NUM_CALLERS,
+        "coalesced": NUM_CALLERS - 1,
+        "in_flight": 0,
+    }
+
+
+def test_propagates_the_leader_exception_to_waiters():
+    def fail():
+        raise ValueError("failed")
+
+    single_flight = SingleFlight()
+    futures, calls = run_concurrently(single_flight, fail)
+    assert len(calls) == 1
+    for future in futures:
+        with pytest.raises(ValueError, match="failed"):
+            future.result()
+    # Failures are not remembered.
+    assert single_flight.do("key", lambda: 1) == 1
+
+
+def test_does_not_coalesce_sequential_or_different_calls():
+    single_flight = SingleFlight()
+    assert single_flight.do("a", lambda: 1) == 1
+    assert single_flight.do("a", lambda: 2) == 2
+    assert single_flight.do("b", lambda x: x, 3) == 3
+    assert single_flight.stats()["coalesced"] == 0
+
+
+async def test_async_coalesces_concurrent_calls():
+    single_flight = AsyncSingleFlight()
+    calls = []
+
+    async def function():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"rows": [1]}
+
+    results = await asyncio.gather(
+        *[single_flight.do("key", function) for _ in range(NUM_CALLERS)]
+    )
+    assert len(calls) == 1
+    assert results == [{"rows": [1]}] * NUM_CALLERS
+    assert len({id(result) for result in results}) == NUM_CALLERS
+    assert single_flight.stats() == {
+        "calls": NUM_CALLERS,
+        "coalesced": NUM_CALLERS - 1,
+        "in_flight": 0,
+    }
+
+
+async def test_async_propagates_the_leader_exception_to_waiters():
+    single_flight = AsyncSingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("failed")
+
+    results = await asyncio.gather(
+        *[single_flight.do("key", fail) for _ in range(NUM_CALLERS)],
+        return_exceptions=True,
+    )
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert single_flight.stats()["in_flight"] == 0
+
+
+async def test_async_cancelled_waiter_does_not_cancel_the_leader():
+    single_flight = AsyncSingleFlight()
+
+    async def function():
+        await asyncio.sleep(0.01)
+        return 1
+
+    leader = asyncio.ensure_future(single_flight.do("key", function))
+    waiter = asyncio.ensure_future(single_flight.do("key", function))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    assert await leader == 1
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
@@ -0,0 +1,146 @@
+import datetime
+
+from graph_agents.tools.nl2gql.graph_query_tool import SpannerGraphQueryQATool
+from graph_agents.tools.nl2gql.spanner_impl import StaleReadSpannerImpl, estimate_size
+from graph_agents.utils.cache import TTLCache
+
+
+class Field(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Rows(list):
+
+    def __init__(self, fields, rows):
+        super().__init__(rows)
+        self.fields = [Field(field) for field in fields]
+
+
+class FakeClient(object):
+
+    def instance(self, instance_id):
+        return self
+
+    def database(self, database_id):
+        return None
+
+
+class FakeInstance(object):
+
+    def __init__(self):
+        self.instance_id = "instance"
+        self._client = FakeClient()
+
+
+class FakeDatabase(object):
+    """Returns the params of each query as a row."""
+
+    def __init__(self):
+        self.database_id = "database"
+        self._instance = FakeInstance()
+        self.queries = []
+        self.snapshot_options = []
+
+    def snapshot(self, **snapshot_options):
+        self.snapshot_options.append(snapshot_options)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute_sql(self, query, params=None, param_types=None, timeout=None):
+        self.queries.append((query, params))
+        names = sorted(params)
+        return Rows(["query"] + names, [[query] + [params[name] for name in names]])
+
+
+def build_impl(database, **kwargs):
+    return StaleReadSpannerImpl(
+        database,
+        snapshot_options={"max_staleness": datetime.timedelta(seconds=10)},
+        **kwargs,
+    )
+
+
+def test_reads_with_the_snapshot_options():
+    database = FakeDatabase()
+    impl = build_impl(database)
+    assert impl.query("GRAPH g RETURN @id", {"id": 1}) == [
+        {"query": "GRAPH g RETURN @id", "id": 1}
+    ]
+    impl.query("GRAPH g RETURN @id", {"id": 1})
+    assert len(database.queries) == 2
+    assert (
+        database.snapshot_options
+        == [{"max_staleness": datetime.timedelta(seconds=10)}] * 2
+    )
+
+
+def test_results_are_cached_by_query_and_params():
+    database = FakeDatabase()
+    impl = build_impl(database, result_cache=TTLCache())
+    impl.query("GRAPH g RETURN @a, @b", {"a": 1, "b": "x"})
+    impl.query("GRAPH g RETURN @a, @b", {"b": "x", "a": 1})
+    assert len(database.queries) == 1
+    impl.query("GRAPH g RETURN @a, @b", {"a": 2, "b": "x"})
+    impl.query("GRAPH g RETURN @a, @b", {"a": "1", "b": "x"})
+    impl.query("GRAPH g RETURN @a, @b ", {"a": 1, "b": "x"})
+    assert len(database.queries) == 4
+
+
+def test_cached_results_are_copied_on_read():
+    database = FakeDatabase()
+    impl = build_impl(database, result_cache=TTLCache())
+    rows = impl.query("GRAPH g RETURN @id", {"id": 1})
+    rows[0]["id"] = 2
+    rows.append({"id": 3})
+    assert impl.query("GRAPH g RETURN @id", {"id": 1}) == [
+        {"query": "GRAPH g RETURN @id", "id": 1}
+    ]
+    assert len(database.queries) == 1
+
+
+def test_results_are_evicted_by_size():
+    database = FakeDatabase()
+    rows = [{"query": "GRAPH g RETURN @id", "id": 1}]
+    result_cache = TTLCache(
+        weigher=estimate_size, max_weight=estimate_size(rows) * 3 // 2
+    )
+    impl = build_impl(database, result_cache=result_cache)
+    impl.query("GRAPH g RETURN @id", {"id": 1})
+    impl.query("GRAPH g RETURN @id", {"id": 2})
+    assert len(result_cache) == 1
+    assert result_cache.stats()["evictions"] == 1
+    impl.query("GRAPH g RETURN @id", {"id": 1})
+    assert len(database.queries) == 3
+
+
+def test_estimate_size_counts_nested_values():
+    rows = [{"name": "Alex", "ids": [1, 2]}]
+    assert estimate_size(rows) > estimate_size([{"name": "Alex"}])
+    assert estimate_size([{"name": "A" * 1000}]) > estimate_size([{"name": "A"}])
+
+
+def test_result_cache_ttl_defaults_to_the_read_staleness():
+    config = {"gql_result_cache_max_bytes": 1 << 20}
+    assert SpannerGraphQueryQATool.get_result_cache(config) is None
+    assert (
+        SpannerGraphQueryQATool.get_result_cache({**config, "exact_staleness": 15}).ttl
+        == 15
+    )
+    assert (
+        SpannerGraphQueryQATool.get_result_cache({**config, "max_staleness": 10}).ttl
+        == 10
+    )
+    assert (
+        SpannerGraphQueryQATool.get_result_cache(
+            {**config, "gql_result_cache_ttl": 5, "max_staleness": 10}
+        ).ttl
+        == 5
+    )
+    assert SpannerGraphQueryQATool.get_result_cache({"exact_staleness": 15}) is None
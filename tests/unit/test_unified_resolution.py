@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+from pydantic import BaseModel
+
+from graph_agents.tools.entity_resolution.session_store import REFERENCE_MAPPINGS_KEY
+from graph_agents.tools.entity_resolution.unified_resolution import (
+    build_unified_entity_resolution_tool,
+)
+
+
+class PersonReference(BaseModel):
+    name: str
+
+
+class CanonicalPersonReference(BaseModel):
+    id: int
+
+
+class FakeResolutionTool(object):
+
+    def __init__(self, label, results=None, error=None):
+        self.label = label
+        self.reference_model = PersonReference
+        self.results = results or {}
+        self.error = error
+
+    async def resolve_async(self, references):
+        if self.error is not None:
+            raise self.error
+        return [self.results.get(reference["name"], []) for reference in references]
+
+
+def tool_context():
+    return SimpleNamespace(state={})
+
+
+async def test_merges_matches_of_all_tools_by_score():
+    tool = build_unified_entity_resolution_tool(
+        [
+            FakeResolutionTool(
+                "person", {"Alex": [(CanonicalPersonReference(id=1), 1.0)]}
+            ),
+            FakeResolutionTool(
+                "company", {"Alex": [(CanonicalPersonReference(id=2), 3.0)]}
+            ),
+        ]
+    )
+    [mapping] = await tool.func(["Alex"], tool_context=tool_context())
+    assert [(match.label, match.score) for match in mapping.matches] == [
+        ("company", 0.75),
+        ("person", 0.5),
+    ]
+
+
+async def test_failed_tool_keeps_matches_of_healthy_tools():
+    tool = build_unified_entity_resolution_tool(
+        [
+            FakeResolutionTool("company", error=RuntimeError("index unavailable")),
+            FakeResolutionTool(
+                "person", {"Alex": [(CanonicalPersonReference(id=1), 1.0)]}
+            ),
+        ]
+    )
+    context = tool_context()
+    [mapping] = await tool.func(["Alex"], tool_context=context)
+    assert [match.canonical_reference for match in mapping.matches] == [{"id": 1}]
+    # Partial matches are not kept in the session.
+    assert context.state[REFERENCE_MAPPINGS_KEY] == {}
+
+
+async def test_failed_reference_keeps_matches_of_healthy_tools():
+    class PartiallyFailingTool(FakeResolutionTool):
+        async def resolve_async(self, references):
+            return [None for _ in references]
+
+    tool = build_unified_entity_resolution_tool(
+        [
+            PartiallyFailingTool("company"),
+            FakeResolutionTool(
+                "person", {"Alex": [(CanonicalPersonReference(id=1), 1.0)]}
+            ),
+        ]
+    )
+    [mapping] = await tool.func(["Alex"], tool_context=tool_context())
+    assert [match.label for match in mapping.matches] == ["person"]
+
+
+async def test_resolved_references_are_kept_in_the_session():
+    person_tool = FakeResolutionTool(
+        "person", {"Alex": [(CanonicalPersonReference(id=1), 1.0)]}
+    )
+    tool = build_unified_entity_resolution_tool([person_tool])
+    context = tool_context()
+    await tool.func(["Alex"], tool_context=context)
+    person_tool.error = RuntimeError("not searched again")
+    [mapping] = await tool.func([" Alex "], tool_context=context)
+    assert mapping.matches[0].canonical_reference == {"id": 1}
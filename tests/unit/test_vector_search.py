@@ -0,0 +1,169 @@
+import math
+import re
+
+import pytest
+
+from graph_agents.tools.entity_resolution.full_text_search import (
+    ColumnWithAlias,
+    _filter_by_score,
+)
+from graph_agents.tools.entity_resolution.vector_search import (
+    HashingEmbedding,
+    _get_similarity,
+    _VectorSearcher,
+)
+from graph_agents.utils.database_context import Column
+
+NAMES = ["Alex Smith", "Alexandra Smithers", "Bob Jones", "Dana Adams"]
+
+EMBEDDING = HashingEmbedding(dimension=64)
+
+
+class Field(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Rows(list):
+
+    def __init__(self, fields, rows):
+        super().__init__(rows)
+        self.fields = [Field(field) for field in fields]
+
+
+class FakeVectorDatabase(object):
+    """Serves vector search queries over `NAMES` by exact distances."""
+
+    def __init__(self):
+        self.queries = []
+        self.snapshot_options = []
+
+    def snapshot(self, **snapshot_options):
+        self.snapshot_options.append(snapshot_options)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute_sql(self, query, params=None, param_types=None):
+        self.queries.append(query)
+        function = re.search(r"(APPROX_\w+)\(", query).group(1)
+        top_k = int(re.search(r"LIMIT (\d+)", query).group(1))
+        rows = []
+        for i in range(len(re.findall(r"AS _reference_index", query))):
+            query_embedding = params[f"r{i}__embedding"]
+            neighbors = []
+            for person_id, name in enumerate(NAMES):
+                distance = self._distance(
+                    function, EMBEDDING.embed_query(name), query_embedding
+                )
+                exact_match = 1.0 if name == params[f"r{i}_name"] else 0.0
+                neighbors.append([i, person_id, distance, exact_match])
+            descending = function == "APPROX_DOT_PRODUCT"
+            neighbors.sort(key=lambda row: -row[2] if descending else row[2])
+            rows.extend(neighbors[:top_k])
+        return Rows(["_reference_index", "id", "_distance", "_exact_match"], rows)
+
+    def _distance(self, function, a, b):
+        dot = sum(x * y for x, y in zip(a, b))
+        if function == "APPROX_COSINE_DISTANCE":
+            return 1.0 - dot
+        if function == "APPROX_EUCLIDEAN_DISTANCE":
+            return math.sqrt(sum((x - y) ** 2 for x, y in zip(a, b)))
+        return dot
+
+
+def build_searcher(database, **kwargs):
+    kwargs.setdefault("top_k", 3)
+    return _VectorSearcher(
+        database,
+        table_name="Person",
+        index_name="PersonNameVector",
+        embedding_column=Column(
+            name="name_embedding", type="ARRAY<FLOAT32>(vector_length=>64)"
+        ),
+        source_column=ColumnWithAlias(
+            column=Column(name="name", type="STRING(MAX)"), alias="name"
+        ),
+        index_filter_expr="name_embedding IS NOT NULL",
+        canonical_reference_columns=[
+            ColumnWithAlias(column=Column(name="id", type="INT64"), alias="id")
+        ],
+        embed=EMBEDDING,
+        **kwargs,
+    )
+
+
+def test_hashing_embedding_is_normalized_and_deterministic():
+    [embedding] = EMBEDDING(["Alex Smith"])
+    assert embedding == EMBEDDING.embed_query("alex  SMITH")
+    assert len(embedding) == 64
+    assert math.isclose(sum(v * v for v in embedding), 1.0, rel_tol=1e-6)
+
+
+def test_search_query():
+    searcher = build_searcher(FakeVectorDatabase(), num_leaves_to_search=10)
+    query = searcher.get_search_query(2)
+    assert "FROM Person@{FORCE_INDEX=PersonNameVector}" in query
+    assert (
+        "APPROX_COSINE_DISTANCE(name_embedding, @r1__embedding,"
+        " options => JSON '{\"num_leaves_to_search\": 10}') ASC"
+    ) in query
+    assert "IF(name = @r0_name, 1., 0.) AS _exact_match" in query
+    assert "ORDER BY _reference_index, _distance ASC" in query
+    # The index filter is not repeated.
+    assert query.count("name_embedding IS NOT NULL") == 2
+    assert query.count("LIMIT 3") == 2
+
+
+def test_dot_product_orders_by_descending_distance():
+    searcher = build_searcher(FakeVectorDatabase(), distance_type="DOT_PRODUCT")
+    query = searcher.get_search_query(1)
+    assert "APPROX_DOT_PRODUCT(name_embedding, @r0__embedding) DESC" in query
+    assert "ORDER BY _reference_index, _distance DESC" in query
+
+
+@pytest.mark.parametrize("distance_type", ["COSINE", "EUCLIDEAN", "DOT_PRODUCT"])
+def test_search_scores_nearest_neighbors_first(distance_type):
+    database = FakeVectorDatabase()
+    searcher = build_searcher(database, distance_type=distance_type)
+    [exact, typo] = searcher.search([{"name": "Alex Smith"}, {"name": "Alex Smth"}])
+    assert len(database.queries) == 1
+    # The exact match scores 1 more than its similarity of 1.
+    assert exact[0]["id"] == 0
+    assert math.isclose(exact[0]["_score_0"], 2.0, rel_tol=1e-6)
+    assert typo[0]["id"] == 0
+    assert typo[0]["_score_0"] < 1.0
+    for values in [exact, typo]:
+        scores = [value["_score_0"] for value in values]
+        assert scores == sorted(scores, reverse=True)
+        assert len(values) == 3
+
+
+def test_search_failure_returns_none():
+    class FailingDatabase(FakeVectorDatabase):
+        def execute_sql(self, query, params=None, param_types=None):
+            raise RuntimeError("unavailable")
+
+    searcher = build_searcher(FailingDatabase())
+    assert searcher.search([{"name": "Alex Smith"}]) == [None]
+
+
+def test_cosine_similarities_are_not_negative():
+    assert _get_similarity("COSINE", 0.0) == 1.0
+    assert _get_similarity("COSINE", 1.5) == 0.25
+    assert _get_similarity("COSINE", 2.0) == 0.0
+
+
+def test_relative_cutoff_keeps_the_best_negative_similarity():
+    values = [{"id": 1, "_score_0": -0.2}, {"id": 2, "_score_0": -0.6}]
+    scored_values = _filter_by_score(values, 1, relative_score_cutoff=0.5)
+    assert [value["id"] for value, _ in scored_values] == [1, 2]
+    scored_values = _filter_by_score(
+        values, 1, min_score=-0.5, relative_score_cutoff=0.5
+    )
+    assert [value["id"] for value, _ in scored_values] == [1]